@@ -1,4 +1,5 @@
 from src.code.base_model.document import Document
+from src.code.base_model.tracing import tracing
 
 class BaseHandler:
     def query(self, documents, query):
@@ -9,12 +10,36 @@ class BaseStorage:
     def save_document(self, document):
         raise NotImplementedError()
 
+    def delete_document(self, id):
+        raise NotImplementedError()
+
     def get_all_documents(self):
         raise NotImplementedError()
 
     def get_all_raw_documents(self):
         raise NotImplementedError()
 
+    def get_index(self):
+        raise NotImplementedError()
+
+    def get_weight_index(self):
+        raise NotImplementedError()
+
+    def get_name(self):
+        raise NotImplementedError()
+
+    def get_version(self):
+        raise NotImplementedError()
+
+    def get_revision(self):
+        raise NotImplementedError()
+
+    def get_memory(self):
+        raise NotImplementedError()
+
+    def is_sharded(self):
+        return False
+
 
 class BaseTokenizer:
     def tokenize_document(self, document):
@@ -35,9 +60,66 @@ class BaseModel:
         self.storage = storage
         self.handler = handler
         self.tokenizer = tokenizer
+        self.result_cache = None
 
     def add_document(self, document: Document):
+        """
+        Tokeniza un documento una sola vez y lo agrega al almacenamiento, que actualiza sus índices en el lugar.
+
+        Args:
+            document (Document): El documento a agregar. Si ya existe uno con el mismo id, se reemplaza.
+        """
+        if document.tokens is None:
+            document.tokens = self.tokenizer.tokenize_document(document.content)
         self.storage.save_document(document)
 
+    def delete_document(self, id):
+        """
+        Elimina un documento del almacenamiento y de sus índices.
+
+        Args:
+            id (str): El identificador del documento.
+
+        Returns:
+            bool: True si el documento existía, False de lo contrario.
+        """
+        return self.storage.delete_document(id)
+
+    def cached_query(self, processed_query, parameters, compute):
+        """
+        Resuelve una consulta compilada a través de la caché de resultados, si el modelo tiene una.
+
+        Args:
+            processed_query (list): La consulta compilada en DNF.
+            parameters (dict): Los parámetros que afectan el resultado (tamaño, relajación, etc.).
+            compute (callable): Función que calcula el resultado si no está en la caché.
+
+        Returns:
+            list: El resultado de la consulta.
+        """
+        if self.result_cache is None:
+            return compute()
+
+        key = self.result_cache.key(type(self).__name__, self.storage, processed_query, parameters)
+        return self.result_cache.get_or_compute(key, compute)
+
+    def traced_query(self, query, profile=False, **parameters):
+        """
+        Realiza una consulta registrando el tiempo y los contadores de cada etapa.
+
+        Args:
+            query (str): La consulta a realizar.
+            profile (bool, opcional): Si es True la consulta también se perfila con cProfile. Por defecto es False.
+            **parameters: Los parámetros de query del modelo.
+
+        Returns:
+            tuple: El resultado de la consulta y el reporte de la traza (etapas, contadores y perfil).
+        """
+        with tracing(profile) as trace:
+            with trace.stage("total"):
+                result = self.query(query, **parameters)
+        trace.count("results", len(result))
+        return result, trace.report()
+
     def query(self, query):
         raise NotImplementedError()
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from src.code.base_model.positional_index import parse_positional
+
+
+def to_bitmap(positions, words):
+    """
+    Convierte posiciones en un mapa de bits.
+
+    Args:
+        positions (numpy.ndarray): Las posiciones de los bits encendidos.
+        words (int): La cantidad de palabras de 64 bits del mapa.
+
+    Returns:
+        numpy.ndarray: El mapa de bits como arreglo de uint64; el bit i del corpus es el bit i % 64 de la palabra i // 64.
+    """
+    bitmap = np.zeros(words, dtype=np.uint64)
+    positions = np.asarray(positions).astype(np.uint64, copy=False)
+    np.bitwise_or.at(bitmap, positions >> np.uint64(6), np.left_shift(np.uint64(1), positions & np.uint64(63)))
+    return bitmap
+
+
+def bit(position):
+    """
+    Args:
+        position (int): La posición de un documento.
+
+    Returns:
+        tuple: La palabra del mapa que contiene la posición y la máscara de su bit.
+    """
+    return position >> 6, np.uint64(1 << (position & 63))
+
+
+def to_positions(bitmap, size):
+    """
+    Obtiene las posiciones de los bits encendidos de un mapa de bits.
+
+    Args:
+        bitmap (numpy.ndarray): El mapa de bits.
+        size (int): La cantidad de posiciones válidas.
+
+    Returns:
+        numpy.ndarray: Las posiciones, en orden ascendente.
+    """
+    return np.flatnonzero(np.unpackbits(bitmap.view(np.uint8), count=size, bitorder="little"))
+
+
+class BitmapIndex:
+
+    def __init__(self, index, cache_size=256):
+        """
+        Mapas de bits de los términos de un índice invertido, sobre los que AND, OR y NOT son operaciones
+        bit a bit sobre palabras de 64 bits.
+
+        El mapa de un término se construye desde su lista de postings cuando se pide. Los términos frecuentes,
+        cuyo mapa ocupa menos que su lista, se guardan en una caché LRU cuyos mapas el índice actualiza bit a
+        bit al agregar o eliminar documentos; los raros se vuelven a construir, con un costo proporcional a su
+        lista y al tamaño del mapa. Los mapas tienen capacity palabras, que se duplican cuando el índice crece
+        más allá de ellas.
+
+        Args:
+            index (InvertedIndex): El índice invertido de los documentos.
+            cache_size (int, opcional): Cantidad máxima de mapas de términos frecuentes guardados. Por defecto es 256.
+        """
+        self.index = index
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.capacity = (index.size + 63) // 64
+        self.alive = None
+
+    def grow(self):
+        """
+        Duplica la capacidad de los mapas guardados si el índice ya no cabe en ellos.
+        """
+        words = (self.index.size + 63) // 64
+        if words <= self.capacity:
+            return
+        padding = np.zeros(max(words, 2 * self.capacity) - self.capacity, dtype=np.uint64)
+        self.capacity += len(padding)
+        if self.alive is not None:
+            self.alive = np.concatenate([self.alive, padding])
+        for term, bitmap in self.cache.items():
+            self.cache[term] = np.concatenate([bitmap, padding])
+
+    def add(self, position, terms):
+        """
+        Enciende el bit de un documento agregado al índice en los mapas guardados.
+
+        Args:
+            position (int): La posición del documento.
+            terms (set): Los lemas distintos del documento.
+        """
+        self.grow()
+        word, mask = bit(position)
+        if self.alive is not None:
+            self.alive[word] |= mask
+        for term in terms:
+            bitmap = self.cache.get(term)
+            if bitmap is not None:
+                bitmap[word] |= mask
+
+    def remove(self, position, terms):
+        """
+        Apaga el bit de un documento eliminado del índice en los mapas guardados.
+
+        Args:
+            position (int): La posición del documento.
+            terms (set): Los lemas distintos del documento.
+        """
+        word, mask = bit(position)
+        if self.alive is not None:
+            self.alive[word] &= ~mask
+        for term in terms:
+            bitmap = self.cache.get(term)
+            if bitmap is not None:
+                bitmap[word] &= ~mask
+
+    def all_documents(self):
+        """
+        Returns:
+            numpy.ndarray: El mapa de los documentos no eliminados.
+        """
+        if self.alive is None:
+            full, rest = divmod(self.index.size, 64)
+            alive = np.zeros(self.capacity, dtype=np.uint64)
+            alive[:full] = np.iinfo(np.uint64).max
+            if rest:
+                alive[full] = np.uint64((1 << rest) - 1)
+            if self.index.deleted:
+                deleted = np.fromiter(self.index.deleted, dtype=np.int64, count=len(self.index.deleted))
+                alive &= ~to_bitmap(deleted, self.capacity)
+            self.alive = alive
+        return self.alive
+
+    def bitmap(self, term):
+        """
+        Obtiene el mapa de los documentos que contienen un término.
+
+        Las frases y proximidades no se guardan en la caché: add y remove solo actualizan los mapas de los
+        lemas del documento.
+
+        Args:
+            term (str): El lema.
+
+        Returns:
+            numpy.ndarray: El mapa de bits del término; no debe modificarse.
+        """
+        bitmap = self.cache.get(term)
+        if bitmap is not None:
+            self.cache.move_to_end(term)
+            return bitmap
+
+        postings = self.index.get_postings_array(term)
+        bitmap = to_bitmap(postings, self.capacity)
+        if len(postings) * 64 >= self.index.size and parse_positional(term) is None:
+            self.cache[term] = bitmap
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return bitmap
+
+    def evaluate(self, conjunctions):
+        """
+        Evalúa una consulta en DNF con literales negados.
+
+        Cada conjunción parte del mapa de los documentos no eliminados, se intersecta con el mapa de cada
+        término y con el complemento del de cada término negado; la disyunción es el OR de las conjunciones.
+        El costo es de unas pocas operaciones vectoriales por literal, sin importar cuántos documentos coinciden.
+
+        Args:
+            conjunctions (list): Tuplas (términos, términos negados), los primeros de menor a mayor frecuencia.
+
+        Returns:
+            numpy.ndarray: Las posiciones de los documentos que satisfacen alguna conjunción, en orden ascendente.
+        """
+        alive = self.all_documents()
+        result = np.zeros(self.capacity, dtype=np.uint64)
+        for terms, negated in conjunctions:
+            bits = alive.copy()
+            for term in terms:
+                bits &= self.bitmap(term)
+                if not bits.any():
+                    break
+            else:
+                for term in negated:
+                    bits &= ~self.bitmap(term)
+                result |= bits
+        return to_positions(result, self.index.size)
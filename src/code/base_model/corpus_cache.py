@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.code.base_model.corpus_dictionary import CorpusDictionary
+from src.code.base_model.inverted_index import InvertedIndex
+from src.code.base_model.posting_list import CompactPostings
+from src.code.base_model.tokenized_documents import TokenizedDocuments
+from src.code.base_model.weight_index import WeightIndex
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 5
+
+
+def default_cache_dir():
+    """
+    Obtiene el directorio base de la caché, configurable con la variable de entorno SRI_CACHE_DIR.
+
+    Returns:
+        str: La ruta del directorio base de la caché.
+    """
+    return os.environ.get("SRI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "sri"))
+
+
+def cache_key(dataset, settings):
+    """
+    Calcula la clave de la caché a partir del conjunto de datos y la configuración del tokenizador.
+
+    Args:
+        dataset (str): El nombre del conjunto de datos de ir_datasets.
+        settings (dict): La configuración que determina los lemas y los índices (modelo de spaCy,
+            su versión, stopwords, parámetros del vocabulario, etc.).
+
+    Returns:
+        str: Un identificador hexadecimal que cambia si cambia cualquiera de las entradas.
+    """
+    payload = json.dumps({"version": CACHE_VERSION, "dataset": dataset, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def cache_path(dataset, settings, cache_dir=None):
+    """
+    Obtiene el directorio de la caché de un conjunto de datos.
+
+    Args:
+        dataset (str): El nombre del conjunto de datos de ir_datasets.
+        settings (dict): La configuración que determina los lemas y los índices.
+        cache_dir (str, opcional): El directorio base. Por defecto se usa default_cache_dir().
+
+    Returns:
+        str: La ruta del directorio de la caché.
+    """
+    name = dataset.replace("/", "_")
+    return os.path.join(cache_dir or default_cache_dir(), f"{name}-{cache_key(dataset, settings)}")
+
+
+def save(path, documents, documents_raw, index, weight_index):
+    """
+    Guarda en disco los documentos lematizados y los índices derivados.
+
+    La escritura se hace en un directorio temporal que luego se renombra, de modo que una caché
+    incompleta nunca se llega a leer. La caché es solo una optimización: si no se puede escribir (disco
+    lleno o de solo lectura, u otro proceso que terminó de guardar la misma caché antes del renombrado),
+    el error se registra, el directorio temporal se borra y los índices en memoria siguen siendo válidos.
+
+    Args:
+        path (str): El directorio de la caché.
+        documents (TokenizedDocuments): Los documentos lematizados.
+        documents_raw (list): Una lista de tuplas (id, título).
+        index (InvertedIndex): El índice invertido de los documentos.
+        weight_index (WeightIndex): El índice de pesos de los documentos.
+
+    Returns:
+        bool: True si la caché quedó guardada.
+    """
+    index.merge()
+    weight_index.merge()
+    tokens, token_offsets = documents.arrays()
+    dictionary = documents.dictionary
+
+    arrays = {
+        "tokens": tokens,
+        "token_offsets": token_offsets,
+        "term_blocks": index.compact.term_blocks,
+        "term_lengths": index.compact.term_lengths,
+        "block_first": index.compact.block_first,
+        "block_counts": index.compact.block_counts,
+        "block_offsets": index.compact.block_offsets,
+        "postings": index.compact.data,
+        "row_terms": weight_index.row_terms,
+        "row_counts": weight_index.row_counts,
+        "row_offsets": weight_index.row_offsets,
+        "document_frequency": np.array(dictionary.document_frequency, dtype=np.int64),
+        "collection_frequency": np.array(dictionary.collection_frequency, dtype=np.int64),
+        "document_lengths": np.array(weight_index.lengths, dtype=np.int64),
+    }
+
+    metadata = {
+        "version": CACHE_VERSION,
+        "terms": index.compact.terms,
+        "dictionary_terms": dictionary.terms,
+        "dictionary_documents": dictionary.documents,
+        "ids": documents.ids,
+        "documents_raw": documents_raw,
+        "no_below": dictionary.no_below,
+        "no_above": dictionary.no_above,
+        "keep_n": dictionary.keep_n,
+    }
+
+    parent = os.path.dirname(path)
+    directory = None
+    try:
+        os.makedirs(parent, exist_ok=True)
+        directory = tempfile.mkdtemp(dir=parent)
+        write(directory, arrays, metadata)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(directory, path)
+    except OSError as error:
+        logger.warning("No se pudo guardar la caché del corpus en %s: %s", path, error)
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+        return False
+    return True
+
+
+def write(directory, arrays, metadata):
+    """
+    Escribe los arreglos y los metadatos de la caché en un directorio.
+
+    Args:
+        directory (str): El directorio temporal de la caché.
+        arrays (dict): Los arreglos de NumPy por nombre.
+        metadata (dict): Los metadatos, serializables como JSON.
+    """
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    with open(os.path.join(directory, "metadata.json"), "w", encoding="utf-8") as file:
+        json.dump(metadata, file)
+
+
+def load(path):
+    """
+    Carga la caché de un conjunto de datos usando arreglos mapeados en memoria.
+
+    Args:
+        path (str): El directorio de la caché.
+
+    Returns:
+        tuple: Los documentos lematizados, los documentos originales, el índice invertido y el índice
+            de pesos, o None si la caché no existe o es de otra versión.
+    """
+    try:
+        with open(os.path.join(path, "metadata.json"), encoding="utf-8") as file:
+            metadata = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if metadata.get("version") != CACHE_VERSION:
+        return None
+
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in ["tokens", "token_offsets", "term_blocks", "term_lengths", "block_first", "block_counts",
+                     "block_offsets", "postings", "row_terms", "row_counts", "row_offsets", "document_frequency",
+                     "collection_frequency", "document_lengths"]
+    }
+
+    dictionary = CorpusDictionary(metadata["dictionary_terms"], arrays["document_frequency"],
+                                  arrays["collection_frequency"], metadata["dictionary_documents"],
+                                  no_below=metadata["no_below"], no_above=metadata["no_above"],
+                                  keep_n=metadata["keep_n"])
+    documents = TokenizedDocuments(dictionary, arrays["tokens"], arrays["token_offsets"], metadata["ids"])
+    documents_raw = [tuple(doc) for doc in metadata["documents_raw"]]
+
+    postings = CompactPostings(metadata["terms"], arrays["term_blocks"], arrays["term_lengths"],
+                               arrays["block_first"], arrays["block_counts"], arrays["block_offsets"],
+                               arrays["postings"])
+    index = InvertedIndex(postings, len(documents))
+
+    weight_index = WeightIndex.from_arrays(dictionary,
+                                           arrays["row_terms"],
+                                           arrays["row_counts"],
+                                           arrays["row_offsets"],
+                                           arrays["document_lengths"])
+
+    return documents, documents_raw, index, weight_index
@@ -0,0 +1,168 @@
+import math
+from array import array
+
+import numpy as np
+
+
+def inverse_frequencies(frequency, documents, no_below=5, no_above=0.5, keep_n=100000):
+    """
+    Selecciona el vocabulario como filter_extremes de gensim y calcula la frecuencia inversa de sus términos.
+
+    Args:
+        frequency (numpy.ndarray): La frecuencia de documento de cada término, en el orden en que aparecieron.
+        documents (int): La cantidad de documentos.
+        no_below (int, opcional): Frecuencia mínima de documento para incluir un término en el vocabulario.
+        no_above (float, opcional): Proporción máxima de documentos para incluir un término en el vocabulario.
+        keep_n (int, opcional): Cantidad máxima de términos del vocabulario.
+
+    Returns:
+        numpy.ndarray: La frecuencia inversa de cada término; 0 para los términos fuera del vocabulario.
+    """
+    frequency = np.asarray(frequency, dtype=np.int64)
+    good = np.flatnonzero((frequency >= no_below) & (frequency <= int(no_above * documents)))
+    if keep_n is not None and len(good) > keep_n:
+        good = np.sort(good[np.argsort(-frequency[good], kind="stable")[:keep_n]])
+
+    idf = np.zeros(len(frequency), dtype=np.float64)
+    idf[good] = [math.log(1 + documents / (df + 1)) for df in frequency[good].tolist()]
+    return idf
+
+
+class CorpusDictionary:
+
+    def __init__(self, terms=None, document_frequency=None, collection_frequency=None, documents=0,
+                 no_below=5, no_above=0.5, keep_n=100000):
+        """
+        Diccionario del corpus compartido por los documentos lematizados y los índices.
+
+        Cada lema se guarda una sola vez y recibe un identificador entero; los documentos y los índices solo
+        guardan esos identificadores. Para cada término se lleva la frecuencia de documento y la frecuencia
+        en la colección. El vocabulario que filtran no_below, no_above y keep_n se calcula una vez por cada
+        cambio del corpus, como una máscara sobre los identificadores, en lugar de reconstruirse en cada consulta.
+
+        Los lemas se registran al codificar un documento; las frecuencias las actualiza quien agrega o elimina
+        los documentos del corpus, que es el índice de pesos.
+
+        Args:
+            terms (list, opcional): Los lemas, en el orden de sus identificadores.
+            document_frequency (numpy.ndarray, opcional): La frecuencia de documento de cada término.
+            collection_frequency (numpy.ndarray, opcional): La cantidad de apariciones de cada término en el corpus.
+            documents (int, opcional): La cantidad de documentos contados en las frecuencias. Por defecto es 0.
+            no_below (int, opcional): Frecuencia mínima de documento para incluir un término en el vocabulario.
+            no_above (float, opcional): Proporción máxima de documentos para incluir un término en el vocabulario.
+            keep_n (int, opcional): Cantidad máxima de términos del vocabulario, como en gensim.
+        """
+        self.terms = list(terms) if terms is not None else []
+        self.term_to_id = {term: term_id for term_id, term in enumerate(self.terms)}
+        self.document_frequency = self.counters(document_frequency)
+        self.collection_frequency = self.counters(collection_frequency)
+        self.documents = documents
+        self.no_below = no_below
+        self.no_above = no_above
+        self.keep_n = keep_n
+        self.version = 0
+        self.cached = None
+
+    def counters(self, values):
+        if values is None:
+            return array("q", bytes(8 * len(self.terms)))
+        return array("q", np.asarray(values, dtype=np.int64).tobytes())
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term in self.term_to_id
+
+    def get(self, term):
+        """
+        Obtiene el identificador de un lema.
+
+        Args:
+            term (str): El lema.
+
+        Returns:
+            int: El identificador del lema, o None si no está en el diccionario.
+        """
+        return self.term_to_id.get(term)
+
+    def encode(self, lemmas):
+        """
+        Convierte los lemas de un documento en identificadores, registrando los lemas nuevos.
+
+        Los lemas nuevos de un documento se numeran en orden alfabético, que es el orden en que gensim
+        les asignaría identificadores; así el recorte a keep_n desempata igual que gensim.
+
+        Args:
+            lemmas (list): Los lemas del documento.
+
+        Returns:
+            list: Los identificadores de los lemas, en el orden del documento.
+        """
+        term_to_id = self.term_to_id
+        new = {term for term in lemmas if term not in term_to_id}
+        for term in sorted(new):
+            term_to_id[term] = len(self.terms)
+            self.terms.append(term)
+            self.document_frequency.append(0)
+            self.collection_frequency.append(0)
+        return [term_to_id[term] for term in lemmas]
+
+    def decode(self, term_ids):
+        terms = self.terms
+        return [terms[term_id] for term_id in term_ids]
+
+    def add(self, term_ids, counts):
+        """
+        Cuenta un documento en las frecuencias.
+
+        Args:
+            term_ids (list): Los identificadores distintos de los lemas del documento.
+            counts (list): La cantidad de apariciones de cada uno en el documento.
+        """
+        for term_id, count in zip(term_ids, counts):
+            self.document_frequency[term_id] += 1
+            self.collection_frequency[term_id] += count
+        self.documents += 1
+        self.version += 1
+
+    def remove(self, term_ids, counts):
+        """
+        Descuenta un documento de las frecuencias.
+
+        Args:
+            term_ids (list): Los identificadores distintos de los lemas del documento.
+            counts (list): La cantidad de apariciones de cada uno en el documento.
+        """
+        for term_id, count in zip(term_ids, counts):
+            self.document_frequency[term_id] -= 1
+            self.collection_frequency[term_id] -= count
+        self.documents -= 1
+        self.version += 1
+
+    def inverse_frequencies(self):
+        """
+        Obtiene la frecuencia inversa de cada término, recalculándola solo si el corpus cambió.
+
+        Returns:
+            numpy.ndarray: La frecuencia inversa de cada término; 0 para los términos fuera del vocabulario.
+        """
+        if self.cached is None or self.cached[0] != self.version or len(self.cached[1]) != len(self.terms):
+            idf = inverse_frequencies(self.document_frequency, self.documents, self.no_below, self.no_above,
+                                      self.keep_n)
+            self.cached = (self.version, idf, idf > 0)
+        return self.cached[1]
+
+    def vocabulary_mask(self):
+        """
+        Returns:
+            numpy.ndarray: Un arreglo booleano que indica qué términos forman parte del vocabulario.
+        """
+        self.inverse_frequencies()
+        return self.cached[2]
+
+    def copy_terms(self):
+        """
+        Obtiene un diccionario con los mismos identificadores y sin documentos contados, para otra parte del corpus.
+        """
+        return CorpusDictionary(self.terms, no_below=self.no_below, no_above=self.no_above, keep_n=self.keep_n)
@@ -1,7 +1,8 @@
 class Document:
-    def __init__(self, id, content):
+    def __init__(self, id, content, title=None):
         self.id = id
         self.content = content
+        self.title = title
         self.tokens = None
 
     def __str__(self):
@@ -0,0 +1,123 @@
+import logging
+import os
+import time
+from itertools import islice
+
+from src.code.base_model.nlp_registry import SPACY_MODEL, get_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionStats:
+    def __init__(self):
+        self.documents = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    @property
+    def docs_per_second(self):
+        return self.documents / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.documents} documentos, {self.tokens} lemas en {self.seconds:.2f}s "
+                f"({self.docs_per_second:.1f} docs/s)")
+
+
+def resident_memory():
+    """
+    Obtiene la memoria residente del proceso en bytes, o None si el sistema no la expone.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_documents(dataset, start=None, end=None):
+    """
+    Recorre una sola vez los documentos de un conjunto de datos de ir_datasets, o solo los de un rango.
+
+    Args:
+        dataset: El conjunto de datos cargado con ir_datasets.load.
+        start (int, opcional): La posición del primer documento del rango. Por defecto el primero.
+        end (int, opcional): La posición siguiente a la del último documento del rango. Por defecto el final.
+
+    Yields:
+        tuple: Tuplas (texto, (id, título)). Si el conjunto de datos no tiene títulos, el título es vacío.
+    """
+    docs = dataset.docs_iter()
+    if start is not None or end is not None:
+        docs = docs[start:end] if hasattr(docs, "__getitem__") else islice(docs, start, end)
+    for doc in docs:
+        yield doc.text, (doc.doc_id, getattr(doc, "title", ""))
+
+
+def load_lemmatizer(model=SPACY_MODEL):
+    """
+    Obtiene del registro del proceso un modelo de spaCy con solo los componentes que necesita la lematización.
+
+    Args:
+        model (str, opcional): El nombre del modelo de spaCy. Por defecto es en_core_web_sm.
+
+    Returns:
+        spacy.Language: El pipeline cargado.
+    """
+    return get_pipeline(model)
+
+
+def stop_words():
+    """
+    Obtiene las stopwords de spaCy para inglés, importándolas solo cuando se necesitan.
+
+    Returns:
+        set: Las stopwords.
+    """
+    from spacy.lang.en.stop_words import STOP_WORDS
+
+    return STOP_WORDS
+
+
+def reduce(doc, stopwords=None):
+    """
+    Reduce un documento procesado por spaCy a sus lemas, descartando ruido y stopwords.
+
+    Args:
+        doc (spacy.tokens.Doc): El documento procesado.
+        stopwords (set, opcional): Las stopwords a descartar. Por defecto las de spaCy para inglés.
+
+    Returns:
+        list: Los lemas del documento.
+    """
+    stopwords = stop_words() if stopwords is None else stopwords
+    return [token.lemma_ for token in doc if token.is_alpha and token.text not in stopwords]
+
+
+def lemmatize(nlp, documents, batch_size=256, n_process=1, stats=None):
+    """
+    Lematiza documentos en lotes con nlp.pipe, opcionalmente en varios procesos.
+
+    Es un generador: los documentos se leen a medida que se necesitan y cada Doc de spaCy se descarta
+    en cuanto se extraen sus lemas.
+
+    Args:
+        nlp (spacy.Language): El pipeline de spaCy.
+        documents (iterable): Tuplas (texto, contexto); el contexto suele ser el id del documento.
+        batch_size (int, opcional): Documentos por lote. Por defecto es 256.
+        n_process (int, opcional): Procesos de spaCy. Por defecto es 1.
+        stats (IngestionStats, opcional): Estadísticas a actualizar con los documentos procesados.
+
+    Yields:
+        tuple: Tuplas (lemas, contexto) en el mismo orden de entrada.
+    """
+    stats = stats if stats is not None else IngestionStats()
+    start = time.perf_counter()
+    for doc, context in nlp.pipe(documents, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        lemmas = reduce(doc)
+        del doc
+        stats.documents += 1
+        stats.tokens += len(lemmas)
+        stats.seconds = time.perf_counter() - start
+        yield lemmas, context
+
+    logger.info("Ingestión: %s", stats)
@@ -0,0 +1,386 @@
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+
+from src.code.base_model.bitmap_index import BitmapIndex
+from src.code.base_model.positional_index import parse_positional, verify_candidates
+from src.code.base_model.posting_list import CompactPostings, PostingIterator
+
+
+class InvertedIndex:
+
+    def __init__(self, postings=None, size=0, merge_ratio=0.25, min_merge=4096):
+        """
+        Índice invertido con las listas de postings codificadas en bloques varint.
+
+        Los documentos que se agregan después de construir el índice van a listas sin codificar, que se
+        fusionan con las codificadas cuando superan merge_ratio de sus postings. Los documentos eliminados
+        se saltan al recorrer las listas hasta que el almacenamiento reconstruya el índice.
+
+        Las frases y proximidades de la consulta (ver parse_positional) se tratan como términos cuyas listas
+        de postings se obtienen del índice posicional, si el almacenamiento lo construyó; sin él se verifican
+        uno a uno los documentos de la intersección de las listas de sus lemas, con los identificadores de
+        lemas guardados en documents.
+
+        Args:
+            postings (CompactPostings, opcional): Las listas de postings ya codificadas.
+            size (int, opcional): La cantidad de documentos de las listas codificadas.
+            merge_ratio (float, opcional): Proporción de postings sin codificar que provoca la fusión. Por defecto es 0.25.
+            min_merge (int, opcional): Cantidad mínima de postings sin codificar para fusionar. Por defecto es 4096.
+        """
+        self.compact = postings if postings is not None else CompactPostings.from_postings({})
+        self.size = size
+        self.tail = {}
+        self.tail_postings = 0
+        self.deleted = set()
+        self.removed = Counter()
+        self.merge_ratio = merge_ratio
+        self.min_merge = min_merge
+        self.version = 0
+        self.bitmaps = None
+        self.positional = None
+        self.documents = None
+        self.resolved = {}
+        self.resolved_version = None
+
+    @classmethod
+    def from_documents(cls, tokenized_docs):
+        """
+        Construye el índice invertido a partir de los documentos tokenizados.
+
+        Args:
+            tokenized_docs (list): Una lista de tuplas (lemas, id).
+
+        Returns:
+            InvertedIndex: El índice con una lista de postings por lema.
+        """
+        postings = {}
+        for position, (doc, id) in enumerate(tokenized_docs):
+            for term in set(doc):
+                postings.setdefault(term, []).append(position)
+        return cls(CompactPostings.from_postings(postings), len(tokenized_docs))
+
+    def add(self, document):
+        """
+        Agrega un documento al final del índice.
+
+        Las listas de postings guardan la posición del documento en el almacenamiento,
+        de modo que se mantienen ordenadas sin necesidad de reordenarlas.
+
+        Args:
+            document (list): Los lemas del documento.
+
+        Returns:
+            int: La posición asignada al documento.
+        """
+        position = self.size
+        terms = set(document)
+        for term in terms:
+            self.tail.setdefault(term, []).append(position)
+        self.tail_postings += len(terms)
+        self.size += 1
+        self.version += 1
+        if self.bitmaps is not None:
+            self.bitmaps.add(position, terms)
+
+        if self.tail_postings > max(self.min_merge, self.merge_ratio * self.compact.count):
+            self.merge()
+        return position
+
+    def remove(self, position, document):
+        """
+        Elimina un documento del índice.
+
+        La posición no se reutiliza: queda marcada como eliminada hasta que el almacenamiento se compacte.
+
+        Args:
+            position (int): La posición del documento.
+            document (list): Los lemas del documento.
+        """
+        if position in self.deleted:
+            return
+
+        terms = set(document)
+        for term in terms:
+            postings = self.tail.get(term, [])
+            i = bisect_left(postings, position)
+            if i < len(postings) and postings[i] == position:
+                del postings[i]
+                self.tail_postings -= 1
+                if not postings:
+                    del self.tail[term]
+            else:
+                self.removed[term] += 1
+        self.deleted.add(position)
+        self.version += 1
+        if self.bitmaps is not None:
+            self.bitmaps.remove(position, terms)
+
+    def merge(self):
+        """
+        Codifica las listas de postings agregadas desde la última fusión junto con las ya codificadas.
+        """
+        if not self.tail:
+            return
+
+        compact = self.compact
+        terms = sorted(set(compact.terms) | set(self.tail))
+        rank = {term: i for i, term in enumerate(terms)}
+
+        # Las posiciones sin codificar son posteriores a todas las codificadas, de modo que un orden
+        # estable por término deja cada lista ordenada sin decodificar término por término.
+        tail_terms = list(self.tail)
+        tail_lengths = np.array([len(self.tail[term]) for term in tail_terms], dtype=np.int64)
+        owners = np.concatenate([
+            np.repeat(np.array([rank[term] for term in compact.terms], dtype=np.int64), compact.term_lengths),
+            np.repeat(np.array([rank[term] for term in tail_terms], dtype=np.int64), tail_lengths),
+        ])
+        positions = np.concatenate([
+            compact.decode_blocks(0, len(compact.block_first)),
+            np.fromiter((position for term in tail_terms for position in self.tail[term]), dtype=np.int64,
+                        count=int(tail_lengths.sum())),
+        ])
+        order = np.argsort(owners, kind="stable")
+
+        self.compact = CompactPostings.from_arrays(terms, np.bincount(owners, minlength=len(terms)),
+                                                   positions[order])
+        self.tail = {}
+        self.tail_postings = 0
+
+    @property
+    def nbytes(self):
+        positional = self.positional.nbytes if self.positional is not None else 0
+        return self.compact.nbytes + 8 * self.tail_postings + positional
+
+    def bitmap_index(self):
+        """
+        Obtiene los mapas de bits de los términos, que se construyen a medida que se piden.
+
+        Returns:
+            BitmapIndex: Los mapas de bits del índice.
+        """
+        if self.bitmaps is None:
+            self.bitmaps = BitmapIndex(self)
+        return self.bitmaps
+
+    def all_positions(self):
+        """
+        Obtiene las posiciones de todos los documentos no eliminados.
+
+        Returns:
+            list: Las posiciones, en orden ascendente.
+        """
+        if not self.deleted:
+            return list(range(self.size))
+        return [position for position in range(self.size) if position not in self.deleted]
+
+    def resolve_positional(self, literal):
+        """
+        Obtiene la lista de postings de una frase o una proximidad, sin los documentos eliminados.
+
+        Las listas se guardan hasta que el índice cambia, porque el planificador, la intersección y el conteo
+        de una misma consulta las piden varias veces.
+
+        Args:
+            literal (str): El literal posicional.
+
+        Returns:
+            numpy.ndarray: Las posiciones de los documentos, en orden ascendente.
+
+        Raises:
+            ValueError: Si el índice no tiene ni índice posicional ni documentos con los que verificar el literal.
+        """
+        if self.resolved_version != self.version:
+            self.resolved = {}
+            self.resolved_version = self.version
+
+        postings = self.resolved.get(literal)
+        if postings is None:
+            if self.positional is not None:
+                postings = self.positional.postings(literal)
+                if self.deleted:
+                    deleted = np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+                    postings = postings[~np.isin(postings, deleted)]
+            elif self.documents is not None:
+                terms = parse_positional(literal)[1]
+                postings = self.get_postings_array(terms[0])
+                for term in terms[1:]:
+                    postings = np.intersect1d(postings, self.get_postings_array(term), assume_unique=True)
+                postings = verify_candidates(literal, postings, self.documents)
+            else:
+                raise ValueError(f"La consulta {literal} necesita el índice posicional o los documentos del índice")
+            self.resolved[literal] = postings
+        return postings
+
+    def iterator(self, term):
+        """
+        Obtiene un iterador sobre la lista de postings de un término, con saltos por bloques.
+
+        Args:
+            term (str): El lema a buscar.
+
+        Returns:
+            PostingIterator: El iterador de las posiciones, en orden ascendente.
+        """
+        if parse_positional(term) is not None:
+            return PostingIterator(None, term, self.resolve_positional(term).tolist())
+        return PostingIterator(self.compact, term, self.tail.get(term, []), self.deleted)
+
+    def get_postings(self, term):
+        """
+        Obtiene la lista ordenada de posiciones de documentos que contienen un término.
+
+        Args:
+            term (str): El lema a buscar.
+
+        Returns:
+            list: Las posiciones de los documentos, en orden ascendente.
+        """
+        if parse_positional(term) is not None:
+            return self.resolve_positional(term).tolist()
+        postings = self.compact.decode(term).tolist() + self.tail.get(term, [])
+        if self.deleted and self.removed[term]:
+            return [position for position in postings if position not in self.deleted]
+        return postings
+
+    def get_postings_array(self, term):
+        """
+        Obtiene la lista de postings de un término como un arreglo, sin convertirla en lista de Python.
+
+        Args:
+            term (str): El lema a buscar.
+
+        Returns:
+            numpy.ndarray: Las posiciones de los documentos, en orden ascendente.
+        """
+        if parse_positional(term) is not None:
+            return self.resolve_positional(term)
+        postings = self.compact.decode(term)
+        tail = self.tail.get(term)
+        if tail:
+            postings = np.concatenate([postings, np.array(tail, dtype=np.int64)])
+        if self.deleted and self.removed[term]:
+            deleted = np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+            postings = postings[~np.isin(postings, deleted)]
+        return postings
+
+    def document_frequency(self, term):
+        if parse_positional(term) is not None:
+            return len(self.resolve_positional(term))
+        return self.compact.document_frequency(term) + len(self.tail.get(term, [])) - self.removed[term]
+
+
+def intersect_iterators(iterators, limit=None):
+    """
+    Intersecta listas de postings avanzando cada iterador hasta la siguiente posición candidata.
+
+    Los iteradores saltan los bloques que no pueden contener la posición buscada, por lo que una lista
+    larga solo se decodifica cerca de las posiciones de las listas más cortas.
+
+    Args:
+        iterators (list): Iteradores de postings, preferentemente ordenados de la lista más corta a la más larga.
+        limit (int, opcional): Si se proporciona, la intersección se detiene al encontrar limit posiciones.
+
+    Returns:
+        list: Las posiciones presentes en todas las listas, ordenadas.
+    """
+    result = []
+    if not iterators or limit == 0:
+        return result
+
+    first, others = iterators[0], iterators[1:]
+    candidate = first.next_geq(0)
+    while candidate is not None:
+        for iterator in others:
+            position = iterator.next_geq(candidate)
+            if position is None:
+                return result
+            if position != candidate:
+                candidate = first.next_geq(position)
+                break
+        else:
+            result.append(candidate)
+            if len(result) == limit:
+                return result
+            candidate = first.next_geq(candidate + 1)
+    return result
+
+
+def scan_count(postings, weights, required):
+    """
+    Cuenta en cuántas listas de postings aparece cada posición, al estilo de ScanCount.
+
+    Las listas se mezclan en un solo arreglo y cada posición suma el peso de las listas que la contienen;
+    el costo depende de la cantidad de postings y no de la cantidad de documentos del corpus.
+
+    Args:
+        postings (list): Arreglos ordenados de posiciones, sin repeticiones dentro de cada uno.
+        weights (list): Lo que suma cada lista, p. ej. las veces que su término aparece en la conjunción.
+        required (float): La cuenta mínima de una posición para incluirla en el resultado.
+
+    Returns:
+        tuple: Dos arreglos con las posiciones ordenadas cuya cuenta alcanza required y sus cuentas.
+    """
+    lengths = [len(positions) for positions in postings]
+    if sum(lengths) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    positions, inverse = np.unique(np.concatenate(postings).astype(np.int64, copy=False), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.repeat(weights, lengths), minlength=len(positions)).astype(np.int64)
+    keep = counts >= required
+    return positions[keep], counts[keep]
+
+
+def intersect(first, second):
+    """
+    Intersecta dos listas de postings ordenadas.
+
+    Args:
+        first (list): Una lista ordenada de posiciones.
+        second (list): Una lista ordenada de posiciones.
+
+    Returns:
+        list: Las posiciones presentes en ambas listas, ordenadas.
+    """
+    result = []
+    i, j = 0, 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def union(first, second):
+    """
+    Mezcla dos listas de postings ordenadas sin repetir posiciones.
+
+    Args:
+        first (list): Una lista ordenada de posiciones.
+        second (list): Una lista ordenada de posiciones.
+
+    Returns:
+        list: Las posiciones presentes en alguna de las listas, ordenadas.
+    """
+    result = []
+    i, j = 0, 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            result.append(first[i])
+            i += 1
+        else:
+            result.append(second[j])
+            j += 1
+    result.extend(first[i:])
+    result.extend(second[j:])
+    return result
@@ -1,28 +1,306 @@
-import spacy
+import gc
+import hashlib
+import logging
+import uuid
+
+from src.code.base_model import corpus_cache
 from src.code.base_model.base import BaseStorage
-import ir_datasets
+from src.code.base_model.ingestion import (SPACY_MODEL, IngestionStats, lemmatize, load_lemmatizer, read_documents,
+                                           resident_memory, stop_words)
+from src.code.base_model.inverted_index import InvertedIndex
+from src.code.base_model.nlp_registry import LEMMATIZER_EXCLUDE
+from src.code.base_model.positional_index import PositionalIndex
+from src.code.base_model.tokenized_documents import TokenizedDocuments
+from src.code.base_model.weight_index import WeightIndex
+
+logger = logging.getLogger(__name__)
+
+
+def tokenizer_settings():
+    """
+    Describe la configuración que determina los lemas de los documentos y sus índices.
+
+    Returns:
+        dict: El modelo de spaCy, su versión y los componentes excluidos, las stopwords y los parámetros del
+            vocabulario.
+    """
+    import spacy
+
+    return {
+        "spacy": spacy.__version__,
+        "model": SPACY_MODEL,
+        "model_version": spacy.util.get_package_version(SPACY_MODEL),
+        "exclude": sorted(LEMMATIZER_EXCLUDE),
+        "stopwords": hashlib.sha256(" ".join(sorted(stop_words())).encode("utf-8")).hexdigest(),
+        "filters": ["is_alpha", "stopwords", "lemma"],
+        "no_below": 5,
+        "no_above": 0.5,
+    }
 
 
 class MemoryDocumentStorage(BaseStorage):
-    def __init__(self, dataset):
-        nlp = spacy.load("en_core_web_sm")
-        stopwords = spacy.lang.en.stop_words.STOP_WORDS
-        dataset = ir_datasets.load(dataset)
-        texts = [(doc.text, doc.doc_id) for doc in dataset.docs_iter()]
-        tokenized_docs = [([token for token in nlp(doc) if token.is_alpha and token.text not in stopwords], id) for (doc, id)
-                          in
-                          texts]
+    def __init__(self, dataset, use_cache=True, cache_dir=None, batch_size=256, n_process=1, compaction_ratio=0.25,
+                 chunk_size=10000, memory_limit_mb=None, positional=False, document_range=None):
+        """
+        Almacenamiento en memoria de los documentos lematizados de un conjunto de datos y de sus índices.
+
+        Si la caché del corpus existe se carga de disco; si no, el corpus se lematiza en streaming.
+
+        Args:
+            dataset (str): El nombre del conjunto de datos de ir_datasets.
+            use_cache (bool, opcional): Si es True se usa la caché del corpus en disco. Por defecto es True.
+            cache_dir (str, opcional): El directorio base de la caché.
+            batch_size (int, opcional): Documentos por lote de spaCy. Por defecto es 256.
+            n_process (int, opcional): Procesos de spaCy. Por defecto es 1.
+            compaction_ratio (float, opcional): Proporción de documentos eliminados que provoca la compactación.
+            chunk_size (int, opcional): Documentos que se acumulan antes de cerrar un segmento. Por defecto es 10000.
+            memory_limit_mb (float, opcional): Memoria residente máxima durante la ingestión, en MB.
+            positional (bool, opcional): Si es True se construye el índice posicional, que resuelve las frases y
+                proximidades de las consultas booleanas. Por defecto es False.
+            document_range (tuple, opcional): Posiciones (inicio, fin) de los documentos del conjunto de datos que
+                se cargan, con su propia caché. Por defecto se cargan todos.
+        """
+        self.name = dataset
+        self.version = 0
+        self.revision = None
+        self.compaction_ratio = compaction_ratio
+        self.positional = positional
+        settings = tokenizer_settings()
+        if document_range is not None:
+            settings["range"] = list(document_range)
+        cache_path = corpus_cache.cache_path(dataset, settings, cache_dir) if use_cache else None
+        cached = corpus_cache.load(cache_path) if use_cache else None
+
+        if cached is not None:
+            self.documents, documents_raw, self.index, self.weight_index = cached
+            self.titles = dict(documents_raw)
+            self.ingestion_stats = None
+            self.positions = {id: position for position, id in enumerate(self.documents.ids)}
+            self.build_positional()
+            return
+
+        import ir_datasets
+
+        self.documents = TokenizedDocuments()
+        self.titles = {}
+        self.index = InvertedIndex()
+        self.weight_index = WeightIndex(dictionary=self.documents.dictionary)
+        self.positions = {}
+
+        nlp = load_lemmatizer(SPACY_MODEL)
+        self.ingestion_stats = IngestionStats()
+        texts = read_documents(ir_datasets.load(dataset), *(document_range or ()))
+        self.ingest(lemmatize(nlp, texts, batch_size=batch_size, n_process=n_process, stats=self.ingestion_stats),
+                    chunk_size=chunk_size, memory_limit_mb=memory_limit_mb)
+
+        if use_cache:
+            corpus_cache.save(cache_path, self.documents, self.get_all_raw_documents(), self.index, self.weight_index)
+
+    @classmethod
+    def from_documents(cls, name, documents, documents_raw=None, compaction_ratio=0.25, positional=False):
+        """
+        Construye un almacenamiento a partir de documentos ya lematizados, sin leer el conjunto de datos.
+
+        Args:
+            name (str): El nombre del almacenamiento.
+            documents (TokenizedDocuments): Los documentos lematizados, cuyo diccionario pasa a ser el del
+                almacenamiento; sus frecuencias no deben contar todavía ningún documento.
+            documents_raw (list, opcional): Tuplas (id, título) de los documentos.
+            compaction_ratio (float, opcional): Proporción de documentos eliminados que provoca la compactación.
+            positional (bool, opcional): Si es True se construye el índice posicional. Por defecto es False.
+
+        Returns:
+            MemoryDocumentStorage: El almacenamiento con sus índices construidos.
+        """
+        storage = cls.__new__(cls)
+        storage.name = name
+        storage.version = 0
+        storage.revision = None
+        storage.compaction_ratio = compaction_ratio
+        storage.positional = positional
+        storage.ingestion_stats = None
+        storage.documents = documents
+        storage.titles = dict(documents_raw) if documents_raw is not None else dict.fromkeys(documents.ids, "")
+        storage.index = InvertedIndex.from_documents(documents)
+        storage.weight_index = WeightIndex(dictionary=documents.dictionary)
+        for position, term_ids in documents.iter_term_ids():
+            storage.weight_index.add_term_ids(term_ids)
+        storage.positions = {id: position for position, id in enumerate(documents.ids)}
+        storage.build_positional()
+        return storage
+
+    def ingest(self, documents, chunk_size=10000, memory_limit_mb=None):
+        """
+        Agrega a los índices un flujo de documentos lematizados, sin materializarlo.
+
+        Cada chunk_size documentos se cierra un segmento de los documentos y se comprueba la memoria
+        residente; si supera memory_limit_mb aun después de liberar memoria, la ingestión se detiene.
+
+        Args:
+            documents (iterable): Tuplas (lemas, (id, título)).
+            chunk_size (int, opcional): Documentos por segmento. Por defecto es 10000.
+            memory_limit_mb (float, opcional): Memoria residente máxima, en MB. Por defecto no hay límite.
+
+        Raises:
+            MemoryError: Si la memoria residente supera el límite.
+        """
+        limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        dictionary = self.documents.dictionary
+        pending = 0
+        for lemmas, (id, title) in documents:
+            term_ids = dictionary.encode(lemmas)
+            self.positions[id] = len(self.documents)
+            self.documents.append_term_ids(term_ids, id)
+            self.titles[id] = title
+            self.index.add(lemmas)
+            self.weight_index.add_term_ids(term_ids)
+            pending += 1
+            if pending >= chunk_size:
+                self.flush(limit)
+                pending = 0
+        self.flush(limit)
+        self.index.merge()
+        self.build_positional()
+
+    def build_positional(self):
+        """
+        Construye el índice posicional desde los identificadores de lemas de los documentos, si está habilitado.
+
+        Sin él, el índice invertido resuelve las frases y proximidades verificando los documentos candidatos
+        con sus identificadores de lemas, por lo que también se le dan los documentos.
+        """
+        self.index.documents = self.documents
+        if self.positional:
+            self.index.positional = PositionalIndex.from_documents(self.documents)
 
-        reduced_docs = [([token.lemma_ for token in doc], id) for (doc, id) in tokenized_docs]
+    def flush(self, limit=None):
+        """
+        Cierra el segmento de documentos en curso y comprueba el límite de memoria.
 
-        self.documents = reduced_docs
-        self.documents_raw = [(doc.doc_id, doc.title) for doc in dataset.docs_iter()]
+        Args:
+            limit (int, opcional): Memoria residente máxima, en bytes.
+
+        Raises:
+            MemoryError: Si la memoria residente supera el límite.
+        """
+        self.documents.flush()
+        if limit is None:
+            return
+
+        memory = resident_memory()
+        if memory is not None and memory > limit:
+            gc.collect()
+            memory = resident_memory()
+            if memory > limit:
+                raise MemoryError(f"La ingestión de {self.name} superó el límite de memoria: "
+                                  f"{memory / (1024 * 1024):.0f} MB tras {len(self.documents)} documentos")
+        logger.debug("Segmento cerrado: %d documentos, %.0f MB", len(self.documents),
+                     (memory or 0) / (1024 * 1024))
 
     def save_document(self, document):
-        self.documents.append(document)
+        """
+        Agrega un documento ya tokenizado actualizando los índices en el lugar.
+
+        Las listas de postings y las frecuencias de documento se actualizan en O(largo del documento);
+        los pesos se recalculan en la siguiente consulta extendida.
+
+        Args:
+            document (Document): El documento, con sus lemas en document.tokens. Si ya existe uno con el
+                mismo id, se reemplaza.
+        """
+        if document.id in self.positions:
+            self.delete_document(document.id)
+
+        tokens = list(document.tokens)
+        term_ids = self.documents.dictionary.encode(tokens)
+        position = len(self.documents)
+        self.documents.append_term_ids(term_ids, document.id)
+        self.titles[document.id] = document.title or ""
+        self.index.add(tokens)
+        self.weight_index.add_term_ids(term_ids)
+        if self.index.positional is not None:
+            self.index.positional.add(position, term_ids)
+        self.positions[document.id] = position
+        self.version += 1
+        self.revision = uuid.uuid4().hex
+
+    def delete_document(self, id):
+        """
+        Elimina un documento de los índices.
+
+        La posición del documento queda vacía y se descuenta de las frecuencias de documento; cuando las
+        posiciones vacías superan compaction_ratio del total, se compactan los índices.
+
+        Args:
+            id (str): El identificador del documento.
+
+        Returns:
+            bool: True si el documento existía, False de lo contrario.
+        """
+        position = self.positions.pop(id, None)
+        if position is None:
+            return False
+
+        doc, _ = self.documents[position]
+        self.index.remove(position, doc)
+        self.weight_index.remove(position)
+        self.documents[position] = ([], id)
+        self.titles.pop(id, None)
+        self.version += 1
+        self.revision = uuid.uuid4().hex
+
+        if len(self.index.deleted) > self.compaction_ratio * len(self.documents):
+            self.compact()
+        return True
+
+    def compact(self):
+        """
+        Quita las posiciones de los documentos eliminados y reconstruye el índice invertido y el posicional.
+        """
+        deleted = self.index.deleted
+        if not deleted:
+            return
+
+        self.documents = self.documents.without(deleted)
+        self.index = InvertedIndex.from_documents(self.documents)
+        self.build_positional()
+        self.weight_index.compact()
+        self.positions = {id: position for position, id in enumerate(self.documents.ids)}
 
     def get_all_documents(self):
         return self.documents
 
     def get_all_raw_documents(self):
-        return self.documents_raw
+        return list(self.titles.items())
+
+    def get_index(self):
+        return self.index
+
+    def get_weight_index(self):
+        return self.weight_index
+
+    def get_name(self):
+        return self.name
+
+    def get_version(self):
+        return self.version
+
+    def get_revision(self):
+        """
+        Identifica el contenido del almacenamiento entre procesos, a diferencia de get_version, que solo
+        cuenta los cambios de este proceso.
+
+        Returns:
+            str: None mientras el almacenamiento conserve el corpus tal como se cargó, que es el mismo en
+                todos los procesos; después de cada cambio, un identificador aleatorio.
+        """
+        return self.revision
+
+    def get_memory(self):
+        """
+        Estima la memoria de los documentos lematizados y de los índices.
+
+        Returns:
+            int: Los bytes de los arreglos de los documentos, del índice invertido, del posicional y de los pesos.
+        """
+        return self.documents.nbytes + self.index.nbytes + self.weight_index.nbytes
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from src.code.base_model.base import BaseModel
 import ir_datasets
 
@@ -7,6 +9,17 @@ class Metrics:
     def __init__(self, dataset):
         self.dataset = ir_datasets.load(dataset)
 
+        self.query_texts = {query_id: query_text for (query_id, query_text) in self.dataset.queries_iter()}
+
+        self.relevance = defaultdict(list)
+        for (query_id, doc_id, relevance, iteration) in self.dataset.qrels_iter():
+            if relevance in [3, 4]:
+                self.relevance[query_id].append(doc_id)
+
+        self.corpus_size = self.dataset.docs_count()
+        if self.corpus_size is None:
+            self.corpus_size = sum(1 for _ in self.dataset.docs_iter())
+
     def relevant_documents(self, query_id: str):
         """
         Obtiene los documentos relevantes para una consulta específica.
@@ -18,17 +31,7 @@ class Metrics:
             tuple: Una tupla que contiene una lista de identificadores de documentos relevantes y el texto de la consulta.
         """
 
-        for (queryt_id, query_text) in self.dataset.queries_iter():
-            if queryt_id == query_id:
-                break
-
-        return (
-            [
-                doc_id
-                for (queryt_id, doc_id, relevance, iteration) in self.dataset.qrels_iter()
-                if queryt_id == query_id and relevance in [3, 4]
-            ],
-            query_text)
+        return list(self.relevance.get(query_id, [])), self.query_texts.get(query_id)
 
     def precision(self, recovered_documents, relevant_documents):
         """
@@ -115,8 +118,7 @@ class Metrics:
             float: El Fallout calculado.
         """
         fp = len(set(recovered_documents).difference(set(relevant_documents)))
-        tn = len(set([x[0] for x in self.dataset.docs_iter()]).difference(
-            set(recovered_documents).union(set(relevant_documents))))
+        tn = self.corpus_size - len(set(recovered_documents).union(set(relevant_documents)))
         return fp / (fp + tn)
 
     def get_evaluation(self, query_id: str, model: BaseModel):
@@ -133,6 +135,20 @@ class Metrics:
         relevant_documents, query_text = self.relevant_documents(query_id)
         recovered_documents = model.query(query_text)
 
+        return self.evaluate(recovered_documents, relevant_documents)
+
+    def evaluate(self, recovered_documents, relevant_documents):
+        """
+        Calcula las métricas de evaluación de una lista de documentos recuperados.
+
+        Args:
+            recovered_documents (list): Una lista de identificadores de documentos recuperados.
+            relevant_documents (list): Una lista de identificadores de documentos relevantes.
+
+        Returns:
+            dict: Un diccionario que contiene las métricas de evaluación calculadas (precisión, recuperación, F1, precisión en r y Fallout).
+        """
+
         return {
             "precision": self.precision(recovered_documents, relevant_documents),
             "recall": self.recall(recovered_documents, relevant_documents),
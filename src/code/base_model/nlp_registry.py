@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SPACY_MODEL = "en_core_web_sm"
+
+# La lematización solo necesita el etiquetado morfológico; el parser y el NER no influyen en los lemas.
+LEMMATIZER_EXCLUDE = ("parser", "ner", "senter")
+
+_pipelines = {}
+_load_times = {}
+_lock = threading.Lock()
+
+
+def get_pipeline(model=SPACY_MODEL, exclude=LEMMATIZER_EXCLUDE):
+    """
+    Obtiene un pipeline de spaCy, cargándolo solo la primera vez que se pide en el proceso.
+
+    Todos los tokenizadores, almacenamientos y modelos comparten la misma instancia.
+
+    Args:
+        model (str, opcional): El nombre del modelo de spaCy. Por defecto es en_core_web_sm.
+        exclude (tuple, opcional): Los componentes que no se cargan. Por defecto los que no necesita la lematización.
+
+    Returns:
+        spacy.Language: El pipeline cargado.
+    """
+    key = (model, tuple(exclude))
+    pipeline = _pipelines.get(key)
+    if pipeline is not None:
+        return pipeline
+
+    with _lock:
+        if key not in _pipelines:
+            import spacy
+
+            start = time.perf_counter()
+            _pipelines[key] = spacy.load(model, exclude=list(exclude))
+            _load_times[key] = time.perf_counter() - start
+            logger.info("Pipeline %s cargado en %.2fs", model, _load_times[key])
+        return _pipelines[key]
+
+
+def warm_up(models=(SPACY_MODEL,)):
+    """
+    Carga por adelantado los pipelines dados, por ejemplo al iniciar el servidor.
+
+    Args:
+        models (iterable, opcional): Los nombres de los modelos de spaCy a cargar.
+
+    Returns:
+        dict: El tiempo de carga en segundos de cada pipeline.
+    """
+    for model in models:
+        get_pipeline(model)
+    return load_times()
+
+
+def load_times():
+    """
+    Obtiene el tiempo que tomó cargar cada pipeline del proceso.
+
+    Returns:
+        dict: Un diccionario que mapea (modelo, componentes excluidos) a segundos.
+    """
+    return dict(_load_times)
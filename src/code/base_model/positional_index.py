@@ -0,0 +1,387 @@
+import re
+from array import array
+from functools import reduce
+
+import numpy as np
+
+from src.code.base_model.posting_list import decode_varint, encode_varint, encode_varint_sizes
+
+NEAR = re.compile(r"^(\S+) NEAR/(\d+) (\S+)$")
+
+
+def phrase_literal(lemmas):
+    """
+    Construye el literal de una frase exacta, p. ej. '"boundary layer"'.
+
+    Args:
+        lemmas (list): Los lemas de la frase, en orden.
+
+    Returns:
+        str: El literal.
+    """
+    return '"' + " ".join(lemmas) + '"'
+
+
+def near_literal(left, right, distance):
+    """
+    Construye el literal de dos lemas a lo sumo a distance posiciones, en cualquier orden, p. ej. 'layer NEAR/3 wing'.
+
+    Args:
+        left (str): Un lema.
+        right (str): El otro lema.
+        distance (int): La distancia máxima entre ambos.
+
+    Returns:
+        str: El literal, con los lemas en orden alfabético.
+    """
+    left, right = sorted((left, right))
+    return f"{left} NEAR/{distance} {right}"
+
+
+def parse_positional(literal):
+    """
+    Reconoce un literal posicional.
+
+    Args:
+        literal (str): El literal, sin el prefijo '~'.
+
+    Returns:
+        tuple: ('phrase', lemas, 0) o ('near', [lema, lema], distancia), o None si es un término simple.
+    """
+    if len(literal) > 1 and literal[0] == '"' and literal[-1] == '"':
+        return "phrase", literal[1:-1].split(), 0
+    if " NEAR/" in literal:
+        match = NEAR.match(literal)
+        if match is not None:
+            return "near", [match.group(1), match.group(3)], int(match.group(2))
+    return None
+
+
+def literal_terms(literal):
+    """
+    Obtiene los lemas de un literal, con su prefijo '~' si está negado.
+
+    Args:
+        literal (str): Un término o un literal posicional.
+
+    Returns:
+        list: Los lemas de la frase o la proximidad, o el propio literal si es un término simple.
+    """
+    prefix = "~" if literal.startswith("~") else ""
+    positional = parse_positional(literal[len(prefix):])
+    if positional is None:
+        return [literal]
+    return [prefix + term for term in positional[1]]
+
+
+def matches_lemmas(literal, lemmas):
+    """
+    Verifica si una secuencia de lemas cumple un literal, sin índice.
+
+    Args:
+        literal (str): Un término o un literal posicional, sin el prefijo '~'.
+        lemmas (list): Los lemas del documento, en orden.
+
+    Returns:
+        bool: True si el documento contiene el término, la frase o los dos lemas a la distancia pedida.
+    """
+    positional = parse_positional(literal)
+    if positional is None:
+        return literal in lemmas
+    return matches_sequence(*positional, lemmas)
+
+
+def matches_sequence(kind, terms, distance, sequence):
+    """
+    Verifica si una secuencia contiene una frase o dos elementos a la distancia pedida.
+
+    Args:
+        kind (str): 'phrase' o 'near', ver parse_positional.
+        terms (list): Los elementos de la frase o de la proximidad; lemas o sus identificadores.
+        distance (int): La distancia máxima de la proximidad.
+        sequence (list): Los elementos del documento, en orden.
+
+    Returns:
+        bool: True si la secuencia cumple el literal.
+    """
+    if kind == "phrase":
+        size = len(terms)
+        return any(sequence[start:start + size] == terms for start in range(len(sequence) - size + 1))
+
+    left = [position for position, term in enumerate(sequence) if term == terms[0]]
+    right = [position for position, term in enumerate(sequence) if term == terms[1]]
+    return any(a != b and abs(a - b) <= distance for a in left for b in right)
+
+
+def verify_candidates(literal, candidates, documents):
+    """
+    Filtra los documentos candidatos de una frase o una proximidad comparando las posiciones de sus lemas.
+
+    Los candidatos contienen todos los lemas del literal; se recorren sus identificadores de lemas ya
+    guardados, en orden, sin volver a tokenizar el texto.
+
+    Args:
+        literal (str): El literal posicional.
+        candidates (numpy.ndarray): Las posiciones de los documentos que contienen todos sus lemas.
+        documents (TokenizedDocuments): Los documentos lematizados.
+
+    Returns:
+        numpy.ndarray: Las posiciones de los candidatos que cumplen el literal, en el mismo orden.
+    """
+    kind, terms, distance = parse_positional(literal)
+    term_ids = [documents.dictionary.get(term) for term in terms]
+    if None in term_ids:
+        return candidates[:0]
+    keep = [matches_sequence(kind, term_ids, distance, documents.term_ids(position))
+            for position in candidates.tolist()]
+    return candidates[np.array(keep, dtype=bool)] if keep else candidates
+
+
+def occurrence_keys(documents, positions):
+    """
+    Combina documento y posición en una clave entera que se ordena por documento y luego por posición.
+
+    Args:
+        documents (numpy.ndarray): La posición de cada documento en el almacenamiento.
+        positions (numpy.ndarray): La posición de cada lema en su documento.
+
+    Returns:
+        numpy.ndarray: Las claves, con el documento en los 32 bits altos.
+    """
+    return (documents.astype(np.int64) << 32) | positions.astype(np.int64)
+
+
+class PositionalIndex:
+
+    def __init__(self, dictionary, merge_ratio=0.25, min_merge=65536):
+        """
+        Posiciones de cada término en cada documento, para resolver frases y proximidad.
+
+        Las apariciones se agrupan por término y, dentro de cada término, por documento. De cada documento
+        se guardan su posición en el almacenamiento y la cantidad de apariciones; las posiciones de los lemas
+        se codifican en varint, la primera de cada documento absoluta y las siguientes como diferencias. Los
+        términos se identifican con los identificadores del diccionario del corpus. Los documentos agregados
+        después de construir el índice se acumulan sin codificar hasta que superan merge_ratio de las apariciones.
+
+        Args:
+            dictionary (CorpusDictionary): El diccionario del corpus.
+            merge_ratio (float, opcional): Proporción de apariciones sin codificar que provoca la fusión.
+            min_merge (int, opcional): Cantidad mínima de apariciones sin codificar para fusionar.
+        """
+        self.dictionary = dictionary
+        self.merge_ratio = merge_ratio
+        self.min_merge = min_merge
+        self.term_postings = np.zeros(1, dtype=np.int64)
+        self.term_bytes = np.zeros(1, dtype=np.int64)
+        self.documents = np.empty(0, dtype=np.int32)
+        self.counts = np.empty(0, dtype=np.int32)
+        self.data = np.empty(0, dtype=np.uint8)
+        self.occurrences = 0
+        self.pending_terms = array("i")
+        self.pending_documents = array("i")
+        self.pending_positions = array("i")
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Construye el índice a partir de los identificadores de lemas ya guardados, sin volver a tokenizar.
+
+        Args:
+            documents (TokenizedDocuments): Los documentos lematizados.
+
+        Returns:
+            PositionalIndex: El índice posicional, que comparte el diccionario de los documentos.
+        """
+        index = cls(documents.dictionary)
+        tokens, offsets = documents.arrays()
+        lengths = np.diff(offsets)
+        owners = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+        positions = np.arange(len(tokens), dtype=np.int64) - np.repeat(offsets[:-1], lengths)
+        index.encode(np.asarray(tokens, dtype=np.int64), owners, positions)
+        return index
+
+    def encode(self, terms, documents, positions):
+        """
+        Codifica las apariciones dadas, que reemplazan a las codificadas.
+
+        Args:
+            terms (numpy.ndarray): El término de cada aparición.
+            documents (numpy.ndarray): El documento de cada aparición.
+            positions (numpy.ndarray): La posición de cada aparición en su documento.
+        """
+        order = np.argsort(terms, kind="stable")
+        terms, documents, positions = terms[order], documents[order], positions[order]
+        vocabulary = len(self.dictionary)
+
+        first = np.ones(len(terms), dtype=bool)
+        first[1:] = (terms[1:] != terms[:-1]) | (documents[1:] != documents[:-1])
+        values = positions.copy()
+        values[1:][~first[1:]] -= positions[:-1][~first[1:]]
+
+        starts = np.flatnonzero(first)
+        self.documents = documents[starts].astype(np.int32)
+        self.counts = np.diff(np.append(starts, len(terms))).astype(np.int32)
+        self.term_postings = np.concatenate([[0], np.cumsum(np.bincount(terms[starts], minlength=vocabulary))])
+        sizes = np.bincount(terms, weights=encode_varint_sizes(values), minlength=vocabulary).astype(np.int64)
+        self.term_bytes = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self.data = encode_varint(values)
+        self.occurrences = len(terms)
+
+    def add(self, position, term_ids):
+        """
+        Agrega las posiciones de un documento.
+
+        Args:
+            position (int): La posición del documento en el almacenamiento.
+            term_ids (list): Los identificadores de los lemas del documento, en orden.
+        """
+        self.pending_terms.extend(term_ids)
+        self.pending_documents.extend([position] * len(term_ids))
+        self.pending_positions.extend(range(len(term_ids)))
+        if len(self.pending_terms) > max(self.min_merge, self.merge_ratio * self.occurrences):
+            self.merge()
+
+    def merge(self):
+        """
+        Codifica las apariciones pendientes junto con las ya codificadas.
+        """
+        if not self.pending_terms:
+            return
+        vocabulary = len(self.term_postings) - 1
+        terms = np.repeat(np.arange(vocabulary, dtype=np.int64), self.term_counts())
+        documents, positions = self.decode_range(0, vocabulary)
+        # Las apariciones pendientes son de documentos posteriores a los codificados, de modo que el orden
+        # estable por término de encode deja las de cada término ordenadas por documento y posición.
+        self.encode(np.concatenate([terms, np.frombuffer(self.pending_terms, dtype=np.int32)]),
+                    np.concatenate([documents, np.frombuffer(self.pending_documents, dtype=np.int32)]),
+                    np.concatenate([positions, np.frombuffer(self.pending_positions, dtype=np.int32)]))
+        self.pending_terms = array("i")
+        self.pending_documents = array("i")
+        self.pending_positions = array("i")
+
+    def term_counts(self):
+        """
+        Returns:
+            numpy.ndarray: La cantidad de apariciones codificadas de cada término.
+        """
+        counts = np.concatenate([[0], np.cumsum(self.counts, dtype=np.int64)])
+        return counts[self.term_postings[1:]] - counts[self.term_postings[:-1]]
+
+    def decode_range(self, start, end):
+        """
+        Decodifica las apariciones de un rango de términos.
+
+        Args:
+            start (int): El primer término.
+            end (int): El término siguiente al último.
+
+        Returns:
+            tuple: Dos arreglos con el documento y la posición de cada aparición, por término, documento y posición.
+        """
+        if start >= end:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        values = decode_varint(self.data[self.term_bytes[start]:self.term_bytes[end]])
+        counts = self.counts[self.term_postings[start]:self.term_postings[end]].astype(np.int64)
+        documents = np.repeat(self.documents[self.term_postings[start]:self.term_postings[end]], counts)
+        firsts = np.cumsum(counts) - counts
+        within = np.cumsum(values)
+        positions = within - np.repeat(within[firsts] - values[firsts], counts)
+        return documents.astype(np.int64), positions
+
+    def occurrences_of(self, term):
+        """
+        Obtiene las apariciones de un término.
+
+        Args:
+            term (str): El lema.
+
+        Returns:
+            numpy.ndarray: Las claves de occurrence_keys de cada aparición, en orden ascendente.
+        """
+        term_id = self.dictionary.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int64)
+
+        # Los términos registrados después de la última codificación solo tienen apariciones pendientes.
+        end = min(term_id + 1, len(self.term_postings) - 1)
+        keys = occurrence_keys(*self.decode_range(min(term_id, end), end))
+        if self.pending_terms:
+            pending = np.frombuffer(self.pending_terms, dtype=np.int32) == term_id
+            documents = np.frombuffer(self.pending_documents, dtype=np.int32)[pending]
+            positions = np.frombuffer(self.pending_positions, dtype=np.int32)[pending]
+            keys = np.concatenate([keys, occurrence_keys(documents, positions)])
+        return keys
+
+    def phrase(self, terms):
+        """
+        Obtiene los documentos que contienen los lemas dados en posiciones consecutivas.
+
+        Las apariciones del i-ésimo lema se desplazan i posiciones hacia atrás, de modo que una frase es una
+        clave (documento, inicio) presente en todas las listas; se intersectan de la más corta a la más larga.
+
+        Args:
+            terms (list): Los lemas de la frase, en orden.
+
+        Returns:
+            numpy.ndarray: Las posiciones ordenadas de los documentos.
+        """
+        if not terms:
+            return np.empty(0, dtype=np.int64)
+        starts = []
+        for offset, term in enumerate(terms):
+            keys = self.occurrences_of(term)
+            starts.append(keys[(keys & 0xFFFFFFFF) >= offset] - offset)
+        starts.sort(key=len)
+        keys = reduce(lambda left, right: np.intersect1d(left, right, assume_unique=True), starts)
+        return np.unique(keys >> 32)
+
+    def near(self, left, right, distance):
+        """
+        Obtiene los documentos en los que dos lemas aparecen a lo sumo a distance posiciones, en cualquier orden.
+
+        Para cada aparición del primer lema se busca en binario la aparición más cercana del segundo.
+
+        Args:
+            left (str): Un lema.
+            right (str): El otro lema.
+            distance (int): La distancia máxima.
+
+        Returns:
+            numpy.ndarray: Las posiciones ordenadas de los documentos.
+        """
+        first = self.occurrences_of(left)
+        if left == right:
+            close = np.diff(first) <= distance
+            return np.unique(first[1:][close] >> 32)
+
+        second = self.occurrences_of(right)
+        if len(first) == 0 or len(second) == 0:
+            return np.empty(0, dtype=np.int64)
+        following = np.searchsorted(second, first)
+        close = np.zeros(len(first), dtype=bool)
+        inside = following < len(second)
+        close[inside] = second[following[inside]] - first[inside] <= distance
+        inside = following > 0
+        close[inside] |= first[inside] - second[following[inside] - 1] <= distance
+        return np.unique(first[close] >> 32)
+
+    def postings(self, literal):
+        """
+        Resuelve un literal posicional.
+
+        Args:
+            literal (str): Una frase o una proximidad, ver parse_positional.
+
+        Returns:
+            numpy.ndarray: Las posiciones ordenadas de los documentos que lo cumplen, incluidos los eliminados.
+        """
+        kind, terms, distance = parse_positional(literal)
+        if kind == "phrase":
+            return self.phrase(terms)
+        return self.near(terms[0], terms[1], distance)
+
+    @property
+    def nbytes(self):
+        pending = 4 * 3 * len(self.pending_terms)
+        return sum(int(values.nbytes) for values in (self.term_postings, self.term_bytes, self.documents,
+                                                      self.counts, self.data)) + pending
@@ -0,0 +1,309 @@
+from bisect import bisect_left
+
+import numpy as np
+
+BLOCK_SIZE = 128
+
+
+def encode_varint_sizes(values):
+    """
+    Calcula cuántos bytes ocupa cada entero codificado en varint.
+
+    Args:
+        values (numpy.ndarray): Los enteros no negativos.
+
+    Returns:
+        numpy.ndarray: La cantidad de bytes de cada entero.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28, 35, 42, 49, 56, 63):
+        sizes += values >= (np.uint64(1) << np.uint64(bits))
+    return sizes
+
+
+def encode_varint(values):
+    """
+    Codifica enteros no negativos en varint: 7 bits por byte y el bit alto indica que el valor continúa.
+
+    Args:
+        values (numpy.ndarray): Los enteros a codificar.
+
+    Returns:
+        numpy.ndarray: Los bytes de los valores, concatenados.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = encode_varint_sizes(values)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    data = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for k in range(int(sizes.max(initial=0))):
+        present = sizes > k
+        byte = (values[present] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(sizes[present] > k + 1, np.uint64(0x80), np.uint64(0))
+        data[starts[present] + k] = byte.astype(np.uint8)
+    return data
+
+
+def decode_varint(data):
+    """
+    Decodifica una secuencia de enteros codificados con encode_varint.
+
+    Args:
+        data (numpy.ndarray): Los bytes de los valores.
+
+    Returns:
+        numpy.ndarray: Los enteros decodificados.
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    ends = data < 0x80
+    if ends.all():
+        return data.astype(np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], ends[:-1]]))
+    value_ids = np.concatenate([[0], np.cumsum(ends)[:-1]])
+    shifts = (np.arange(len(data)) - starts[value_ids]) * 7
+    return np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+
+
+class CompactPostings:
+
+    def __init__(self, terms, term_blocks, term_lengths, block_first, block_counts, block_offsets, data):
+        """
+        Listas de postings de todos los términos codificadas en bloques.
+
+        Cada término tiene un identificador entero. Sus posiciones se dividen en bloques de BLOCK_SIZE; de cada
+        bloque se guarda la primera posición sin codificar, que sirve para saltar bloques, y las diferencias
+        entre posiciones consecutivas codificadas en varint. Todos los bloques comparten un único búfer de bytes.
+
+        Args:
+            terms (list): Los términos, en el orden de sus identificadores.
+            term_blocks (numpy.ndarray): El primer bloque de cada término; el último elemento es el total de bloques.
+            term_lengths (numpy.ndarray): La cantidad de posiciones de cada término.
+            block_first (numpy.ndarray): La primera posición de cada bloque.
+            block_counts (numpy.ndarray): La cantidad de posiciones de cada bloque.
+            block_offsets (numpy.ndarray): El inicio de cada bloque en data; el último elemento es el largo de data.
+            data (numpy.ndarray): Las diferencias codificadas en varint.
+        """
+        self.terms = terms
+        self.term_to_id = {term: term_id for term_id, term in enumerate(terms)}
+        self.term_blocks = term_blocks
+        self.term_lengths = term_lengths
+        self.block_first = block_first
+        self.block_counts = block_counts
+        self.block_offsets = block_offsets
+        self.data = data
+        self.count = int(np.sum(term_lengths))
+
+    @classmethod
+    def from_postings(cls, postings):
+        """
+        Codifica un diccionario de listas de postings con operaciones vectoriales.
+
+        Args:
+            postings (dict): Un diccionario que mapea términos a listas ordenadas de posiciones.
+
+        Returns:
+            CompactPostings: Las listas codificadas.
+        """
+        terms = sorted(term for term in postings if len(postings[term]) > 0)
+        lengths = np.array([len(postings[term]) for term in terms], dtype=np.int64)
+        flat = np.fromiter((position for term in terms for position in postings[term]), dtype=np.int64,
+                           count=int(lengths.sum()))
+        return cls.from_arrays(terms, lengths, flat)
+
+    @classmethod
+    def from_arrays(cls, terms, lengths, flat):
+        """
+        Codifica las listas de postings dadas como un único arreglo, término tras término.
+
+        Args:
+            terms (list): Los términos, ordenados.
+            lengths (numpy.ndarray): La cantidad de posiciones de cada término.
+            flat (numpy.ndarray): Las posiciones de todos los términos, ordenadas dentro de cada término.
+
+        Returns:
+            CompactPostings: Las listas codificadas.
+        """
+        lengths = np.asarray(lengths, dtype=np.int64)
+        flat = np.asarray(flat, dtype=np.int64)
+        blocks = -(-lengths // BLOCK_SIZE)
+        term_blocks = np.concatenate([[0], np.cumsum(blocks)]).astype(np.int64)
+        term_starts = np.cumsum(lengths) - lengths
+
+        index_in_term = np.arange(len(flat), dtype=np.int64) - np.repeat(term_starts, lengths)
+        block_ids = np.repeat(term_blocks[:-1], lengths) + index_in_term // BLOCK_SIZE
+        first = index_in_term % BLOCK_SIZE == 0
+
+        deltas = np.diff(flat, prepend=0)[~first]
+        sizes = np.bincount(block_ids[~first], weights=encode_varint_sizes(deltas),
+                            minlength=int(term_blocks[-1])).astype(np.int64)
+
+        return cls(terms,
+                   term_blocks,
+                   lengths,
+                   flat[first],
+                   np.bincount(block_ids, minlength=int(term_blocks[-1])).astype(np.int32),
+                   np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+                   encode_varint(deltas))
+
+    def document_frequency(self, term):
+        term_id = self.term_to_id.get(term)
+        return 0 if term_id is None else int(self.term_lengths[term_id])
+
+    def get_blocks(self, term):
+        """
+        Obtiene el rango de bloques de un término.
+
+        Args:
+            term (str): El término a buscar.
+
+        Returns:
+            tuple: El primer bloque y el bloque siguiente al último; vacío si el término no existe.
+        """
+        term_id = self.term_to_id.get(term)
+        if term_id is None:
+            return 0, 0
+        return int(self.term_blocks[term_id]), int(self.term_blocks[term_id + 1])
+
+    def decode_blocks(self, start, end):
+        """
+        Decodifica las posiciones de un rango de bloques.
+
+        Args:
+            start (int): El primer bloque.
+            end (int): El bloque siguiente al último.
+
+        Returns:
+            numpy.ndarray: Las posiciones, en orden ascendente.
+        """
+        if start >= end:
+            return np.empty(0, dtype=np.int64)
+
+        deltas = decode_varint(self.data[self.block_offsets[start]:self.block_offsets[end]])
+        if end - start == 1:
+            return np.cumsum(np.concatenate([[self.block_first[start]], deltas]))
+
+        counts = np.asarray(self.block_counts[start:end], dtype=np.int64)
+
+        firsts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        increments = np.zeros(int(counts.sum()), dtype=np.int64)
+        rest = np.ones(len(increments), dtype=bool)
+        rest[firsts] = False
+        increments[rest] = deltas
+
+        within = np.cumsum(increments)
+        return within - np.repeat(within[firsts], counts) + np.repeat(self.block_first[start:end], counts)
+
+    def decode(self, term):
+        """
+        Decodifica la lista de postings completa de un término.
+
+        Args:
+            term (str): El término a buscar.
+
+        Returns:
+            numpy.ndarray: Las posiciones, en orden ascendente.
+        """
+        return self.decode_blocks(*self.get_blocks(term))
+
+    @property
+    def nbytes(self):
+        return sum(int(array.nbytes) for array in (self.term_blocks, self.term_lengths, self.block_first,
+                                                    self.block_counts, self.block_offsets, self.data))
+
+
+def gallop(values, target, low=0):
+    """
+    Busca con búsqueda exponencial la primera posición, desde low, cuyo valor es mayor o igual que target.
+
+    Se prueban las posiciones low + 1, low + 2, low + 4, ... hasta pasar target y luego se busca en binario
+    en el último tramo, de modo que el costo es logarítmico en la distancia recorrida y no en el largo.
+
+    Args:
+        values (list): Valores ordenados.
+        target (int): El valor buscado.
+        low (int, opcional): La posición desde la que se busca. Por defecto es 0.
+
+    Returns:
+        int: La primera posición mayor o igual que low con valor mayor o igual que target, o len(values).
+    """
+    size = len(values)
+    if low >= size or values[low] >= target:
+        return low
+    step = 1
+    while low + step < size and values[low + step] < target:
+        low += step
+        step *= 2
+    return bisect_left(values, target, low + 1, min(low + step, size))
+
+
+class PostingIterator:
+
+    def __init__(self, postings, term, tail=(), deleted=()):
+        """
+        Recorre la lista de postings de un término decodificando solo los bloques que visita.
+
+        Args:
+            postings (CompactPostings): Las listas codificadas, o None.
+            term (str): El término a recorrer.
+            tail (list, opcional): Posiciones posteriores a las codificadas, todavía sin codificar.
+            deleted (set, opcional): Posiciones eliminadas, que se saltan.
+        """
+        self.postings = postings
+        self.start, self.end = postings.get_blocks(term) if postings is not None else (0, 0)
+        self.firsts = postings.block_first[self.start:self.end].tolist() if postings is not None else []
+        self.tail = tail
+        if tail:
+            self.firsts.append(tail[0])
+        self.deleted = deleted
+        self.block = 0
+        self.values = None
+        self.offset = 0
+
+    def load(self, block):
+        self.block = block
+        self.offset = 0
+        if self.start + block < self.end:
+            self.values = self.postings.decode_blocks(self.start + block, self.start + block + 1).tolist()
+        else:
+            self.values = list(self.tail)
+
+    def next_geq(self, target):
+        """
+        Avanza hasta la primera posición mayor o igual que target, saltando los bloques que no la contienen.
+
+        Tanto el bloque como la posición dentro del bloque se buscan galopando desde la posición actual,
+        de modo que los avances cortos son baratos y los largos saltan bloques enteros sin decodificarlos.
+        La posición devuelta no se consume: para avanzar se llama de nuevo con una posición mayor.
+
+        Args:
+            target (int): La posición buscada.
+
+        Returns:
+            int: La primera posición no eliminada mayor o igual que target, o None si no hay más.
+        """
+        while self.block < len(self.firsts):
+            if self.values is None or self.values[-1] < target:
+                block = gallop(self.firsts, target + 1, self.block) - 1
+                block = max(block, 0 if self.values is None else self.block + 1)
+                if block >= len(self.firsts):
+                    break
+                self.load(block)
+                continue
+
+            self.offset = gallop(self.values, target, self.offset)
+            position = self.values[self.offset]
+            if position not in self.deleted:
+                return position
+            target = position + 1
+
+        self.block = len(self.firsts)
+        return None
+
+    def __iter__(self):
+        position = self.next_geq(0)
+        while position is not None:
+            yield position
+            position = self.next_geq(position + 1)
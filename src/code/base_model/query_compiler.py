@@ -0,0 +1,316 @@
+import re
+from collections import OrderedDict
+import threading
+
+from src.code.base_model.ingestion import load_lemmatizer, stop_words
+from src.code.base_model.positional_index import near_literal, parse_positional, phrase_literal
+from src.code.base_model.tracing import current_trace
+
+OPERATORS = {"AND": "&", "OR": "|", "NOT": "~"}
+SYMBOLS = {"&", "|", "~", "(", ")"}
+POSITIONAL = re.compile(r'"([^"]*)"|\bNEAR/(\d+)\b', re.IGNORECASE)
+
+
+class QueryTooComplexError(ValueError):
+    pass
+
+
+class QueryCompiler:
+
+    def __init__(self, max_conjunctions=256, cache_size=1024):
+        """
+        Compila consultas booleanas en forma normal disyuntiva (DNF) sobre sus lemas.
+
+        Args:
+            max_conjunctions (int, opcional): Cantidad máxima de conjunciones de la DNF. Por defecto es 256.
+            cache_size (int, opcional): Cantidad de consultas compiladas que se recuerdan. Por defecto es 1024.
+        """
+        self.max_conjunctions = max_conjunctions
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def compile(self, query):
+        """
+        Convierte una consulta booleana en una lista de conjunciones de lemas.
+
+        Las consultas se normalizan antes de buscarlas en la caché LRU, de modo que las consultas repetidas
+        no se vuelven a analizar ni a compilar.
+
+        Args:
+            query (str): La consulta booleana en formato de cadena.
+
+        Returns:
+            list: Una lista de conjunciones; cada conjunción es una lista de lemas, con el prefijo '~' si están negados.
+        """
+        key = normalize(str(query))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                current_trace().count("compiled_query_hits")
+                return [list(conjunction) for conjunction in self.cache[key]]
+
+        dnf = self.compile_uncached(key)
+
+        with self.lock:
+            self.misses += 1
+            self.cache[key] = dnf
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return [list(conjunction) for conjunction in dnf]
+
+    def compile_uncached(self, query):
+        """
+        Lematiza, analiza y convierte una consulta a DNF sin consultar la caché.
+
+        Args:
+            query (str): La consulta booleana normalizada.
+
+        Returns:
+            tuple: Las conjunciones de la DNF como tuplas ordenadas de literales.
+        """
+        trace = current_trace()
+        with trace.stage("lemmatize"):
+            tokens = self.lex(query)
+        with trace.stage("dnf"):
+            tree = Parser(tokens).parse()
+            if tree is None:
+                return ()
+
+            conjunctions = self.to_dnf(tree, negated=False)
+            dnf = tuple(sorted(tuple(sorted(literal_to_string(literal) for literal in conjunction))
+                               for conjunction in simplify(conjunctions)))
+        trace.count("conjunctions", len(dnf))
+        return dnf
+
+    def lex(self, query):
+        """
+        Separa la consulta en operadores y lemas, descartando ruido y stopwords igual que en los documentos.
+
+        Una frase entre comillas dobles se convierte en un único operando con sus lemas, o en un término si
+        solo queda uno; 'NEAR/k' es el operador de proximidad entre los operandos que lo rodean.
+
+        Args:
+            query (str): La consulta booleana.
+
+        Returns:
+            list: Los símbolos de la consulta, con un '&' implícito entre operandos consecutivos.
+        """
+        nlp = load_lemmatizer()
+        stopwords = stop_words()
+        tokens = []
+        start = 0
+        for match in POSITIONAL.finditer(query):
+            self.lex_text(nlp, stopwords, query[start:match.start()], tokens)
+            if match.group(2) is not None:
+                push(tokens, ("near", int(match.group(2))))
+            else:
+                lemmas = [token.lemma_ for token in nlp(match.group(1))
+                          if token.is_alpha and token.text not in stopwords]
+                if len(lemmas) == 1:
+                    push(tokens, ("term", lemmas[0]))
+                elif lemmas:
+                    push(tokens, ("term", phrase_literal(lemmas)))
+            start = match.end()
+        self.lex_text(nlp, stopwords, query[start:], tokens)
+        return tokens
+
+    def lex_text(self, nlp, stopwords, text, tokens):
+        """
+        Agrega a tokens los operadores y lemas de un fragmento de la consulta sin frases ni proximidades.
+        """
+        if not text.strip():
+            return
+        for token in nlp(re.sub(r"([()&|~])", r" \1 ", text)):
+            if token.text in SYMBOLS:
+                push(tokens, token.text)
+            elif token.text.upper() in OPERATORS:
+                push(tokens, OPERATORS[token.text.upper()])
+            elif token.is_alpha and token.text not in stopwords:
+                push(tokens, ("term", token.lemma_))
+
+    def to_dnf(self, node, negated):
+        """
+        Convierte un árbol de la consulta en una lista de conjunciones, aplicando las leyes de De Morgan.
+
+        Args:
+            node (tuple): El nodo del árbol.
+            negated (bool): Si el nodo está bajo una negación.
+
+        Returns:
+            list: Una lista de conjunciones, cada una un frozenset de literales (lema, negado).
+
+        Raises:
+            QueryTooComplexError: Si la DNF supera el máximo de conjunciones.
+        """
+        kind = node[0]
+        if kind == "term":
+            return [frozenset([(node[1], negated)])]
+        if kind == "not":
+            return self.to_dnf(node[1], not negated)
+
+        children = [self.to_dnf(child, negated) for child in node[1]]
+        if (kind == "or") != negated:
+            result = [conjunction for child in children for conjunction in child]
+        else:
+            result = [frozenset()]
+            for child in children:
+                if len(result) * len(child) > self.max_conjunctions:
+                    raise QueryTooComplexError(
+                        f"La consulta genera más de {self.max_conjunctions} conjunciones en DNF")
+                result = [left | right for left in result for right in child]
+
+        if len(result) > self.max_conjunctions:
+            raise QueryTooComplexError(f"La consulta genera más de {self.max_conjunctions} conjunciones en DNF")
+        return result
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache), "max_size": self.cache_size}
+
+    def clear_cache(self):
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class Parser:
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def parse(self):
+        """
+        Analiza la consulta con precedencia ~ > NEAR > & > |, ignorando operadores sin operandos y paréntesis
+        sin cerrar.
+
+        Returns:
+            tuple: La raíz del árbol de la consulta, o None si la consulta no tiene términos.
+        """
+        node = None
+        while self.position < len(self.tokens):
+            node = combine("or", node, self.parse_or())
+            self.position += 1
+        return node
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == "|":
+            self.position += 1
+            node = combine("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_near()
+        while self.peek() == "&":
+            self.position += 1
+            node = combine("and", node, self.parse_near())
+        return node
+
+    def parse_near(self):
+        node = self.parse_unary()
+        while is_near(self.peek()):
+            distance = self.peek()[1]
+            self.position += 1
+            node = combine_near(node, self.parse_unary(), distance)
+        return node
+
+    def parse_unary(self):
+        token = self.peek()
+        if token == "~":
+            self.position += 1
+            operand = self.parse_unary()
+            return None if operand is None else ("not", operand)
+        if token == "(":
+            self.position += 1
+            node = self.parse_or()
+            if self.peek() == ")":
+                self.position += 1
+            return node
+        if is_term(token):
+            self.position += 1
+            return token
+        return None
+
+
+def normalize(query):
+    return " ".join(query.split())
+
+
+def is_term(symbol):
+    return isinstance(symbol, tuple) and symbol[0] == "term"
+
+
+def is_near(symbol):
+    return isinstance(symbol, tuple) and symbol[0] == "near"
+
+
+def ends_operand(symbol):
+    return is_term(symbol) or symbol == ")"
+
+
+def starts_operand(symbol):
+    return is_term(symbol) or symbol in ("(", "~")
+
+
+def push(tokens, symbol):
+    if tokens and ends_operand(tokens[-1]) and starts_operand(symbol):
+        tokens.append("&")
+    tokens.append(symbol)
+
+
+def combine(kind, left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return (kind, [left, right])
+
+
+def combine_near(left, right, distance):
+    """
+    Combina dos operandos con NEAR/distance.
+
+    Solo dos lemas forman un literal de proximidad; con una frase, una negación o una subconsulta como
+    operando, NEAR se reduce a un AND.
+    """
+    if left is None or right is None:
+        return combine("and", left, right)
+    if is_term(left) and is_term(right) and parse_positional(left[1]) is None and parse_positional(right[1]) is None:
+        return ("term", near_literal(left[1], right[1], distance))
+    return ("and", [left, right])
+
+
+def simplify(conjunctions):
+    """
+    Simplifica una DNF eliminando conjunciones contradictorias, repetidas o absorbidas por otra más general.
+
+    Args:
+        conjunctions (list): Una lista de conjunciones, cada una un frozenset de literales (lema, negado).
+
+    Returns:
+        list: Las conjunciones que quedan, de menor a mayor tamaño.
+    """
+    consistent = {conjunction for conjunction in conjunctions
+                  if not any((term, not negated) in conjunction for (term, negated) in conjunction)}
+
+    result = []
+    for conjunction in sorted(consistent, key=len):
+        if not any(kept <= conjunction for kept in result):
+            result.append(conjunction)
+    return result
+
+
+def literal_to_string(literal):
+    term, negated = literal
+    return f"~{term}" if negated else term
+
+
+default_compiler = QueryCompiler()
@@ -1,45 +1,114 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import weakref
+
+import numpy as np
 from src.code.base_model.base import BaseStorage
+from src.code.base_model.tracing import current_trace
 
 
-class Recommendation:
+class TitleIndex:
 
-    def __init__(self, storage: BaseStorage):
-        self.storage = storage
+    def __init__(self, documents):
+        """
+        Ajusta una sola vez la matriz TF-IDF de los títulos de los documentos.
 
-    def get_recommendations(self, recovered_documents):
+        Args:
+            documents (list): Una lista de tuplas (id, título).
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.documents = documents
+        self.size = len(documents)
+        self.id_to_row = {doc[0]: row for row, doc in enumerate(documents)}
+        self.matrix = TfidfVectorizer(stop_words='english').fit_transform([doc[1] for doc in documents]).tocsr()
 
+    def similarity_sum(self, rows):
         """
-        Obtiene recomendaciones de documentos basadas en documentos recuperados previamente.
+        Suma la similitud coseno de cada título con los títulos de las filas dadas.
+
+        Las filas de la matriz TF-IDF están normalizadas, por lo que basta multiplicar la matriz
+        por la suma de las filas dadas en lugar de construir la matriz de similitud completa.
 
         Args:
-            recovered_documents (list): Una lista de índices de documentos recuperados previamente.
+            rows (list): Las filas de los documentos de referencia.
 
         Returns:
-            list: Una lista de índices de documentos recomendados.
+            numpy.ndarray: La similitud acumulada de cada documento.
+        """
+        if len(rows) == 0:
+            return np.zeros(self.size)
+
+        profile = self.matrix[rows].sum(axis=0)
+        return np.asarray(self.matrix @ np.asarray(profile).ravel()).ravel()
+
+
+def top_k(scores, k):
+    """
+    Obtiene las k posiciones de mayor puntuación con una ordenación parcial.
+
+    Los empates se resuelven a favor de la posición menor, igual que una ordenación estable.
+
+    Args:
+        scores (numpy.ndarray): Las puntuaciones.
+        k (int): La cantidad de posiciones a devolver.
+
+    Returns:
+        numpy.ndarray: Las posiciones ordenadas por puntuación descendente.
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+class Recommendation:
+
+    _title_indexes = weakref.WeakKeyDictionary()
+
+    def __init__(self, storage: BaseStorage, size=5):
+        self.storage = storage
+        self.size = size
+
+    def get_title_index(self):
         """
+        Obtiene el índice de títulos del almacenamiento, ajustándolo solo la primera vez o si cambió el corpus.
 
-        documents = self.storage.get_all_raw_documents()
+        Returns:
+            TitleIndex: El índice de títulos del almacenamiento.
+        """
+        version = self.storage.get_version()
+        cached = self._title_indexes.get(self.storage)
+        if cached is None or cached[0] != version:
+            with current_trace().stage("title_index"):
+                cached = (version, TitleIndex(self.storage.get_all_raw_documents()))
+            self._title_indexes[self.storage] = cached
+        return cached[1]
 
-        tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+    def get_recommendations(self, recovered_documents):
 
-        titles = [doc[1] for doc in documents]
+        """
+        Obtiene recomendaciones de documentos basadas en documentos recuperados previamente.
 
-        tfidf_matrix = tfidf_vectorizer.fit_transform(titles)
+        Args:
+            recovered_documents (list): Una lista de identificadores de documentos recuperados previamente.
 
-        cosine_sim_titles = cosine_similarity(tfidf_matrix, tfidf_matrix)
+        Returns:
+            list: Una lista de pares ((id, título), similitud) de los documentos recomendados.
+        """
 
-        recommendations = {}
+        title_index = self.get_title_index()
 
-        for i, doc in enumerate(documents):
-            if doc[0] not in recovered_documents:
-                sim_sum = 0
-                for index in recovered_documents:
-                    sim_sum += cosine_sim_titles[i][int(index)]
+        with current_trace().stage("recommendation"):
+            rows = [title_index.id_to_row[id] for id in recovered_documents if id in title_index.id_to_row]
 
-                recommendations[doc] = recommendations.get(doc, 0) + sim_sum
+            scores = title_index.similarity_sum(rows)
+            scores[rows] = -np.inf
 
-        sorted_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
+            best = top_k(scores, min(self.size, title_index.size - len(set(rows))))
 
-        return sorted_recommendations[:5]
\ No newline at end of file
+        return [(title_index.documents[row], float(scores[row])) for row in best.tolist()]
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from src.code.base_model.tracing import current_trace
+
+
+class InProcessBackend:
+
+    def __init__(self, max_entries=1024):
+        """
+        Almacén en memoria del proceso con desalojo LRU por cantidad de entradas y expiración por TTL.
+
+        Args:
+            max_entries (int, opcional): Cantidad máxima de entradas. Por defecto es 1024.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl if ttl else None, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ResultCache:
+
+    def __init__(self, backend=None, ttl=300):
+        """
+        Caché de resultados de consultas delante de BooleanModel.query y ExtendedBooleanModel.query.
+
+        Args:
+            backend (opcional): Almacén con métodos get(key), set(key, value, ttl) y clear(). Por defecto InProcessBackend.
+            ttl (float, opcional): Segundos que vive un resultado; None para no expirar. Por defecto es 300.
+        """
+        self.backend = backend if backend is not None else InProcessBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, model, storage, processed_query, parameters):
+        """
+        Calcula la clave de un resultado.
+
+        La clave incluye la versión y la revisión del almacenamiento, de modo que agregar o eliminar
+        documentos invalida los resultados anteriores sin recorrer la caché. La versión solo cuenta los
+        cambios del proceso; la revisión distingue además los contenidos de procesos que comparten la caché
+        y llegaron a la misma versión con cambios distintos.
+
+        Args:
+            model (str): El nombre del modelo.
+            storage (BaseStorage): El almacenamiento consultado.
+            processed_query (list): La consulta compilada en DNF.
+            parameters (dict): Los parámetros de la consulta (tamaño, relajación, etc.).
+
+        Returns:
+            str: La clave del resultado.
+        """
+        payload = json.dumps({
+            "model": model,
+            "dataset": storage.get_name(),
+            "version": storage.get_version(),
+            "revision": storage.get_revision(),
+            "query": processed_query,
+            "parameters": parameters,
+        }, sort_keys=True)
+        return "sri:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, key, compute):
+        """
+        Obtiene un resultado de la caché o lo calcula y lo guarda.
+
+        Args:
+            key (str): La clave del resultado.
+            compute (callable): Función que calcula el resultado si no está en la caché.
+
+        Returns:
+            list: El resultado de la consulta.
+        """
+        trace = current_trace()
+        with trace.stage("result_cache"):
+            value = self.backend.get(key)
+        if value is not None:
+            with self.lock:
+                self.hits += 1
+            trace.count("result_cache_hits")
+            return list(value)
+
+        with self.lock:
+            self.misses += 1
+        trace.count("result_cache_misses")
+        value = compute()
+        self.backend.set(key, list(value), self.ttl)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,565 @@
+import heapq
+import multiprocessing
+import os
+import sys
+import threading
+import uuid
+import weakref
+
+import numpy as np
+
+from src.code.base_model.base import BaseStorage
+from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.tracing import current_trace
+from src.code.base_model.corpus_dictionary import inverse_frequencies
+from src.code.boolean_model.boolean_model import BooleanHandler
+from src.code.boolean_model.extended_boolean_model import ExtendedBooleanHandler
+
+
+def build_from_documents(name, documents, documents_raw, positional=False):
+    """
+    Construye el almacenamiento de una parte a partir de sus documentos ya lematizados.
+
+    Args:
+        name (str): El nombre del almacenamiento.
+        documents (TokenizedDocuments): Los documentos lematizados de la parte.
+        documents_raw (list): Tuplas (id, título) de los documentos de la parte.
+        positional (bool, opcional): Si es True la parte construye su índice posicional.
+
+    Returns:
+        MemoryDocumentStorage: El almacenamiento de la parte.
+    """
+    return MemoryDocumentStorage.from_documents(name, documents, documents_raw, positional=positional)
+
+
+def build_from_dataset(dataset, start, end, options):
+    """
+    Construye el almacenamiento de una parte leyendo y lematizando solo su rango del conjunto de datos.
+
+    Args:
+        dataset (str): El nombre del conjunto de datos de ir_datasets.
+        start (int): La posición del primer documento de la parte.
+        end (int): La posición siguiente a la del último documento de la parte.
+        options (dict): Opciones de MemoryDocumentStorage.
+
+    Returns:
+        MemoryDocumentStorage: El almacenamiento de la parte.
+    """
+    return MemoryDocumentStorage(dataset, document_range=(start, end), **options)
+
+
+class Shard:
+
+    def __init__(self, storage):
+        """
+        Parte del corpus que vive en un proceso de trabajo, con su propio almacenamiento e índices.
+
+        Args:
+            storage (MemoryDocumentStorage): El almacenamiento de la parte.
+        """
+        self.storage = storage
+        self.boolean = BooleanHandler()
+        self.extended = ExtendedBooleanHandler()
+
+    def statistics(self):
+        """
+        Obtiene las estadísticas locales con las que se calcula la frecuencia inversa global.
+
+        Returns:
+            tuple: Los términos en el orden en que aparecieron, su frecuencia de documento y la cantidad
+                de documentos no eliminados.
+        """
+        dictionary = self.storage.get_weight_index().dictionary
+        return list(dictionary.terms), np.array(dictionary.document_frequency, dtype=np.int64), dictionary.documents
+
+    def set_statistics(self, inverse_document_frequency):
+        self.storage.get_weight_index().set_statistics(inverse_document_frequency)
+
+    def query_boolean(self, query, relaxation_threshold, size):
+        positions = self.boolean.query_positions(self.storage.get_index(), query, relaxation_threshold, size)
+        ids = self.storage.get_all_documents().ids
+        return [ids[position] for position in positions]
+
+    def document_frequencies(self, terms):
+        index = self.storage.get_index()
+        return [index.document_frequency(term) for term in terms]
+
+    def query_match_counts(self, query, relaxation_threshold):
+        positions, counts = self.boolean.query_relaxed(self.storage.get_index(), query, relaxation_threshold)
+        ids = self.storage.get_all_documents().ids
+        return [(ids[position], count) for position, count in zip(positions.tolist(), counts.tolist())]
+
+    def query_extended(self, query, p, relevance_threshold, size):
+        """
+        Resuelve una consulta extendida en la parte.
+
+        Returns:
+            list: Tuplas (similitud, posición, id) en orden descendente de similitud y ascendente de posición.
+        """
+        weight_index = self.storage.get_weight_index()
+        if size is None:
+            positions, scores = self.extended.rank_index(query, weight_index, p, relevance_threshold)
+            positions, scores = positions.tolist(), scores.tolist()
+        else:
+            positions, scores = self.extended.rank_top_k(query, weight_index, size, p, relevance_threshold)
+
+        ids = self.storage.get_all_documents().ids
+        return [(score, position, ids[position]) for position, score in zip(positions, scores)]
+
+    def save_document(self, document):
+        self.storage.save_document(document)
+
+    def delete_document(self, id):
+        return self.storage.delete_document(id)
+
+    def get_document(self, id):
+        position = self.storage.positions.get(id)
+        return None if position is None else self.storage.get_all_documents()[position]
+
+    def get_all_raw_documents(self):
+        return list(self.storage.get_all_raw_documents())
+
+    def get_memory(self):
+        return self.storage.get_memory()
+
+
+def serve_shard(connection, build, args):
+    """
+    Bucle de un proceso de trabajo: construye su parte y responde los pedidos del coordinador.
+
+    Al terminar de construirla responde con los identificadores de sus documentos. Cada pedido es una
+    tupla (método, argumentos) de Shard; la respuesta es ("ok", resultado) o ("error", excepción). El
+    pedido ("close", ()) termina el proceso.
+
+    Args:
+        connection (multiprocessing.connection.Connection): El extremo del proceso de trabajo.
+        build (callable): La función que construye el almacenamiento de la parte, build_from_documents o
+            build_from_dataset.
+        args (tuple): Los argumentos de build.
+    """
+    try:
+        shard = Shard(build(*args))
+        del args
+        connection.send(("ok", list(shard.storage.get_all_documents().ids)))
+    except Exception as error:
+        connection.send(("error", error))
+        return
+
+    while True:
+        try:
+            method, args = connection.recv()
+        except EOFError:
+            return
+        if method == "close":
+            connection.send(("ok", None))
+            return
+        try:
+            connection.send(("ok", getattr(shard, method)(*args)))
+        except Exception as error:
+            connection.send(("error", error))
+
+
+def unwrap(replies):
+    """
+    Obtiene los resultados de las respuestas de las partes, lanzando el primer error si alguna falló.
+
+    Args:
+        replies (list): Las respuestas ("ok", resultado) o ("error", excepción).
+
+    Returns:
+        list: Los resultados, en el mismo orden.
+    """
+    for status, result in replies:
+        if status == "error":
+            raise result
+    return [result for status, result in replies]
+
+
+def stop_workers(connections, processes):
+    """
+    Pide a los procesos de trabajo que terminen y los espera.
+
+    Args:
+        connections (list): Los extremos del coordinador.
+        processes (list): Los procesos de trabajo.
+    """
+    for connection, process in zip(connections, processes):
+        try:
+            if process.is_alive():
+                connection.send(("close", ()))
+                connection.recv()
+        except (EOFError, OSError):
+            pass
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+        connection.close()
+
+
+class ShardedStorage(BaseStorage):
+
+    def __init__(self, storage, shards=None, start_method="spawn"):
+        """
+        Almacenamiento que reparte el corpus en partes, cada una con sus índices en un proceso de trabajo.
+
+        Cada parte recibe un rango consecutivo de documentos, de modo que las posiciones globales se ordenan
+        igual que las de un único índice. Las consultas se envían a todas las partes a la vez y sus resultados
+        se combinan: el modelo booleano concatena los resultados en el orden de las partes y el extendido
+        mezcla los k mejores de cada parte por similitud y posición. La frecuencia inversa se calcula con las
+        frecuencias de documento de todas las partes, por lo que la similitud coincide con la de un único índice.
+
+        El coordinador solo conserva la parte de cada documento; los títulos se piden a las partes. Los
+        documentos eliminados del almacenamiento dado se omiten sin modificarlo, y puede descartarse después
+        de construir las partes; para no cargar nunca el corpus completo en un proceso, ver from_dataset. Si
+        el almacenamiento tiene índice posicional, cada parte construye el suyo.
+
+        Args:
+            storage (MemoryDocumentStorage): El almacenamiento con el corpus completo.
+            shards (int, opcional): Cantidad de partes. Por defecto la cantidad de núcleos.
+            start_method (str, opcional): Método de inicio de los procesos. Por defecto es 'spawn', para que
+                cada proceso solo reciba su parte del corpus.
+        """
+        documents = storage.get_all_documents()
+        deleted = storage.get_index().deleted
+        if deleted:
+            documents = documents.without(deleted)
+        titles = dict(storage.get_all_raw_documents())
+        shards = max(1, min(shards or os.cpu_count() or 1, len(documents) or 1))
+
+        parts = []
+        bounds = np.linspace(0, len(documents), shards + 1).astype(int).tolist()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            part = documents.slice(start, end)
+            raw = [(id, titles.get(id, "")) for id in part.ids]
+            parts.append((build_from_documents, (storage.get_name(), part, raw, storage.positional)))
+        self.start(storage.get_name(), parts, start_method)
+
+    @classmethod
+    def from_dataset(cls, dataset, shards=None, start_method="spawn", **options):
+        """
+        Reparte un conjunto de datos en partes que cada proceso de trabajo lee y lematiza por su cuenta.
+
+        El coordinador solo cuenta los documentos para calcular los rangos, de modo que ningún proceso tiene
+        en memoria más que su parte del corpus, y las partes se lematizan en paralelo. Cada parte guarda su
+        propia caché del corpus.
+
+        Args:
+            dataset (str): El nombre del conjunto de datos de ir_datasets.
+            shards (int, opcional): Cantidad de partes. Por defecto la cantidad de núcleos.
+            start_method (str, opcional): Método de inicio de los procesos. Por defecto es 'spawn'.
+            **options: Opciones de MemoryDocumentStorage.
+
+        Returns:
+            ShardedStorage: El almacenamiento repartido.
+        """
+        import ir_datasets
+
+        count = ir_datasets.load(dataset).docs_count()
+        shards = max(1, min(shards or os.cpu_count() or 1, count or 1))
+        bounds = np.linspace(0, count, shards + 1).astype(int).tolist()
+
+        storage = cls.__new__(cls)
+        storage.start(dataset, [(build_from_dataset, (dataset, start, end, options))
+                                for start, end in zip(bounds[:-1], bounds[1:])], start_method)
+        return storage
+
+    def start(self, name, parts, start_method):
+        """
+        Inicia un proceso de trabajo por parte y espera a que todas estén construidas.
+
+        Args:
+            name (str): El nombre del almacenamiento.
+            parts (list): Tuplas (función, argumentos) que construyen el almacenamiento de cada parte.
+            start_method (str): Método de inicio de los procesos.
+        """
+        self.name = name
+        self.version = 0
+        self.revision = None
+        self.owners = {}
+        self.statistics_version = None
+
+        context = multiprocessing.get_context(start_method)
+        self.connections = []
+        self.processes = []
+        self.locks = []
+        for build, args in parts:
+            connection, child = context.Pipe()
+            process = context.Process(target=serve_shard, daemon=True, args=(child, build, args))
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+            self.locks.append(threading.Lock())
+        del parts
+
+        self.finalizer = weakref.finalize(self, stop_workers, self.connections, self.processes)
+        for shard, ids in enumerate(self.gather(self.connections)):
+            for id in ids:
+                self.owners[id] = shard
+
+    def receive(self, connection):
+        status, result = connection.recv()
+        if status == "error":
+            raise result
+        return result
+
+    def gather(self, connections):
+        """
+        Lee la respuesta de cada parte y, solo después de leerlas todas, lanza el primer error.
+
+        Así ninguna respuesta queda en su conexión, donde se leería como la respuesta del pedido siguiente.
+
+        Args:
+            connections (list): Las conexiones a las que se envió un pedido.
+
+        Returns:
+            list: El resultado de cada parte, en el orden de las conexiones.
+        """
+        return unwrap([connection.recv() for connection in connections])
+
+    def call(self, shard, method, *args):
+        with self.locks[shard]:
+            self.connections[shard].send((method, args))
+            return self.receive(self.connections[shard])
+
+    def scatter_gather(self, requests):
+        """
+        Envía un pedido a cada parte y espera sus respuestas, que se calculan en paralelo.
+
+        Cada conexión tiene su propio cerrojo, que se toma en el orden de las partes antes de enviar el pedido
+        y se suelta en cuanto llega la respuesta. Dos consultas concurrentes se solapan así en las partes: la
+        segunda se envía a cada parte apenas esta respondió a la primera, sin esperar a las demás.
+
+        Args:
+            requests (list): El pedido (método, argumentos) de cada parte.
+
+        Returns:
+            list: La respuesta de cada parte, en el orden de las partes.
+        """
+        connections, locks = self.connections, self.locks
+        acquired = sent = received = 0
+        replies = []
+        try:
+            for request in requests:
+                locks[acquired].acquire()
+                acquired += 1
+                connections[sent].send(request)
+                sent += 1
+            while received < sent:
+                replies.append(connections[received].recv())
+                locks[received].release()
+                received += 1
+        finally:
+            for shard in range(received, acquired):
+                if shard < sent:
+                    try:
+                        connections[shard].recv()
+                    except (EOFError, OSError):
+                        pass
+                locks[shard].release()
+        return unwrap(replies)
+
+    def broadcast(self, method, *args):
+        """
+        Envía el mismo pedido a todas las partes y espera sus respuestas.
+
+        Args:
+            method (str): El método de Shard.
+            *args: Los argumentos del método.
+
+        Returns:
+            list: La respuesta de cada parte, en el orden de las partes.
+        """
+        trace = current_trace()
+        trace.count("shard_requests", len(self.connections))
+        with trace.stage("scatter_gather"):
+            return self.scatter_gather([(method, args)] * len(self.connections))
+
+    def update_statistics(self):
+        """
+        Recalcula la frecuencia inversa global si el corpus cambió y la envía a las partes.
+
+        Los términos se numeran en el orden en que aparecen recorriendo las partes en orden, que es el mismo
+        en que los numera un único índice, de modo que el vocabulario coincide también al recortarlo a keep_n.
+        """
+        if self.statistics_version == self.version:
+            return
+
+        columns = {}
+        shard_columns = []
+        frequencies = []
+        documents = 0
+        for terms, frequency, size in self.broadcast("statistics"):
+            shard_columns.append(np.array([columns.setdefault(term, len(columns)) for term in terms],
+                                          dtype=np.int64))
+            frequencies.append(frequency)
+            documents += size
+
+        frequency = np.zeros(len(columns), dtype=np.int64)
+        for shard, shard_frequency in zip(shard_columns, frequencies):
+            np.add.at(frequency, shard, shard_frequency)
+        idf = inverse_frequencies(frequency, documents)
+
+        self.scatter_gather([("set_statistics", (idf[shard],)) for shard in shard_columns])
+        self.statistics_version = self.version
+
+    def query_boolean(self, query, relaxation_threshold=1, size=None):
+        """
+        Resuelve una consulta booleana en todas las partes.
+
+        Como las partes son rangos consecutivos del corpus, basta con que cada una devuelva sus size primeros
+        documentos.
+
+        Args:
+            query (list): La consulta en DNF.
+            relaxation_threshold (float, opcional): El nivel de relajación de la consulta. Por defecto es 1.
+            size (int, opcional): La cantidad máxima de documentos a recuperar. Por defecto todos.
+
+        Returns:
+            list: Los identificadores de los documentos relevantes, en el orden del corpus.
+        """
+        ids = [id for ids in self.broadcast("query_boolean", query, relaxation_threshold, size) for id in ids]
+        return ids if size is None else ids[:size]
+
+    def document_frequencies(self, terms):
+        """
+        Obtiene la frecuencia de documento de cada término en todo el corpus.
+
+        Args:
+            terms (list): Los términos.
+
+        Returns:
+            list: La suma de las frecuencias de cada término en las partes.
+        """
+        if not terms:
+            return []
+        return [sum(frequencies) for frequencies in zip(*self.broadcast("document_frequencies", terms))]
+
+    def query_match_counts(self, query, relaxation_threshold=0.5):
+        """
+        Resuelve una consulta relajada en todas las partes, con la cantidad de términos que encontró cada documento.
+
+        Args:
+            query (list): La consulta en DNF.
+            relaxation_threshold (float, opcional): El nivel de relajación de la consulta. Por defecto es 0.5.
+
+        Returns:
+            list: Tuplas (id, términos encontrados) de los documentos relevantes, en el orden del corpus.
+        """
+        return [match for matches in self.broadcast("query_match_counts", query, relaxation_threshold)
+                for match in matches]
+
+    def query_extended(self, query, p=1, relevance_threshold=0.5, size=None):
+        """
+        Resuelve una consulta extendida en todas las partes y mezcla sus mejores resultados.
+
+        Cada parte devuelve sus size mejores documentos, que incluyen a todos los suyos entre los size
+        mejores globales. Se mezclan por similitud descendente y, a igual similitud, por parte y posición,
+        que es el orden de desempate de un único índice.
+
+        Args:
+            query (list): La consulta en DNF.
+            p (int, opcional): El valor de p para la métrica de similitud. Por defecto es 1.
+            relevance_threshold (float, opcional): Umbral de relevancia. Por defecto es 0.5.
+            size (int, opcional): La cantidad máxima de documentos a recuperar. Por defecto todos.
+
+        Returns:
+            list: Los identificadores de los documentos relevantes, en orden descendente de similitud.
+        """
+        self.update_statistics()
+        results = self.broadcast("query_extended", query, p, relevance_threshold, size)
+        merged = heapq.merge(*[[(-score, shard, position, id) for (score, position, id) in result]
+                               for shard, result in enumerate(results)])
+        ids = [id for (score, shard, position, id) in merged]
+        return ids if size is None else ids[:size]
+
+    def get_document(self, id):
+        """
+        Obtiene los lemas de un documento desde su parte.
+
+        Args:
+            id (str): El identificador del documento.
+
+        Returns:
+            tuple: Una tupla (lemas, id), o None si el documento no existe.
+        """
+        shard = self.owners.get(id)
+        return None if shard is None else self.call(shard, "get_document", id)
+
+    def save_document(self, document):
+        """
+        Agrega un documento ya tokenizado a la última parte, de modo que las partes siguen siendo rangos
+        consecutivos del corpus.
+
+        Args:
+            document (Document): El documento, con sus lemas en document.tokens. Si ya existe uno con el
+                mismo id, se reemplaza.
+        """
+        if document.id in self.owners:
+            self.delete_document(document.id)
+
+        shard = len(self.connections) - 1
+        self.call(shard, "save_document", document)
+        self.owners[document.id] = shard
+        self.version += 1
+        self.revision = uuid.uuid4().hex
+
+    def delete_document(self, id):
+        shard = self.owners.pop(id, None)
+        if shard is None:
+            return False
+
+        self.call(shard, "delete_document", id)
+        self.version += 1
+        self.revision = uuid.uuid4().hex
+        return True
+
+    def close(self):
+        """
+        Termina los procesos de trabajo. También se llama cuando el almacenamiento deja de usarse.
+        """
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            self.finalizer()
+        finally:
+            for lock in self.locks:
+                lock.release()
+
+    def get_all_raw_documents(self):
+        """
+        Obtiene los títulos de los documentos desde las partes.
+
+        Returns:
+            list: Tuplas (id, título), en el orden del corpus.
+        """
+        return [raw for raws in self.broadcast("get_all_raw_documents") for raw in raws]
+
+    def get_name(self):
+        return self.name
+
+    def get_version(self):
+        return self.version
+
+    def get_revision(self):
+        """
+        Identifica el contenido del almacenamiento entre procesos, a diferencia de get_version, que solo
+        cuenta los cambios de este proceso.
+
+        Returns:
+            str: None mientras el almacenamiento conserve el corpus tal como se cargó, que es el mismo en
+                todos los procesos; después de cada cambio, un identificador aleatorio.
+        """
+        return self.revision
+
+    def get_memory(self):
+        """
+        Estima la memoria del corpus repartido, sumando la de cada parte a la del coordinador.
+
+        Returns:
+            int: Los bytes de los índices de todas las partes y del diccionario de partes de los documentos.
+        """
+        return sum(self.broadcast("get_memory")) + sys.getsizeof(self.owners)
+
+    def is_sharded(self):
+        return True
@@ -0,0 +1,229 @@
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+from src.code.base_model.corpus_dictionary import CorpusDictionary
+
+
+class TokenizedDocuments:
+
+    def __init__(self, dictionary=None, tokens=None, offsets=None, ids=None):
+        """
+        Secuencia de documentos lematizados guardados como identificadores enteros de sus lemas.
+
+        Se comporta como una lista de tuplas (lemas, id): cada acceso decodifica los lemas del documento.
+        Cada lema ocupa 4 bytes en lugar de una cadena de Python por token, con los identificadores del
+        diccionario del corpus. Los documentos agregados se acumulan en búferes de array que flush() cierra
+        como un segmento de arreglos de NumPy, de modo que agregar documentos nunca copia los segmentos anteriores.
+
+        Args:
+            dictionary (CorpusDictionary, opcional): El diccionario del corpus. Por defecto uno vacío.
+            tokens (numpy.ndarray, opcional): Los identificadores de los lemas de todos los documentos, concatenados.
+            offsets (numpy.ndarray, opcional): El inicio de cada documento en tokens; el último elemento es el total.
+            ids (list, opcional): Los identificadores de los documentos.
+        """
+        self.dictionary = dictionary if dictionary is not None else CorpusDictionary()
+        self.ids = list(ids) if ids is not None else []
+        self.segments = []
+        self.segment_starts = [0]
+        if tokens is not None and len(self.ids) > 0:
+            self.segments.append((tokens, offsets))
+            self.segment_starts.append(len(self.ids))
+        self.pending_tokens = array("i")
+        self.pending_offsets = array("q", [0])
+        self.replaced = {}
+
+    @classmethod
+    def from_documents(cls, tokenized_docs):
+        """
+        Construye la secuencia a partir de tuplas (lemas, id).
+
+        Args:
+            tokenized_docs (iterable): Tuplas (lemas, id).
+
+        Returns:
+            TokenizedDocuments: Los documentos codificados.
+        """
+        documents = cls()
+        documents.extend(tokenized_docs)
+        documents.flush()
+        return documents
+
+    @property
+    def terms(self):
+        return self.dictionary.terms
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self.ids)
+        if position in self.replaced:
+            return self.replaced[position]
+        if not 0 <= position < len(self.ids):
+            raise IndexError(position)
+        return self.dictionary.decode(self.term_ids(position)), self.ids[position]
+
+    def term_ids(self, position):
+        """
+        Obtiene los identificadores de los lemas de un documento, sin decodificarlos.
+
+        Args:
+            position (int): La posición del documento.
+
+        Returns:
+            list: Los identificadores de los lemas, en el orden del documento.
+        """
+        if position in self.replaced:
+            return self.dictionary.encode(self.replaced[position][0])
+        if position >= self.segment_starts[-1]:
+            local = position - self.segment_starts[-1]
+            return self.pending_tokens[self.pending_offsets[local]:self.pending_offsets[local + 1]].tolist()
+
+        segment = bisect_right(self.segment_starts, position) - 1
+        tokens, offsets = self.segments[segment]
+        local = position - self.segment_starts[segment]
+        return tokens[offsets[local]:offsets[local + 1]].tolist()
+
+    def __setitem__(self, position, document):
+        self.replaced[position] = document
+
+    def __iter__(self):
+        terms = self.terms
+        for position, term_ids in self.iter_term_ids():
+            if position in self.replaced:
+                yield self.replaced[position]
+            else:
+                yield [terms[term_id] for term_id in term_ids], self.ids[position]
+
+    def iter_term_ids(self):
+        """
+        Recorre los documentos sin decodificar sus lemas, leyendo cada segmento por bloques.
+
+        Yields:
+            tuple: Tuplas (posición, identificadores de los lemas).
+        """
+        self.flush()
+        replaced = self.replaced
+        for segment, (tokens, offsets) in enumerate(self.segments):
+            start = self.segment_starts[segment]
+            offsets = offsets.tolist()
+            for block in range(0, len(offsets) - 1, 4096):
+                end = min(block + 4096, len(offsets) - 1)
+                chunk = tokens[offsets[block]:offsets[end]].tolist()
+                for local in range(block, end):
+                    position = start + local
+                    if position in replaced:
+                        yield position, self.dictionary.encode(replaced[position][0])
+                    else:
+                        yield position, chunk[offsets[local] - offsets[block]:offsets[local + 1] - offsets[block]]
+
+    def append(self, document):
+        """
+        Agrega un documento al final de la secuencia.
+
+        Args:
+            document (tuple): Una tupla (lemas, id).
+        """
+        lemmas, id = document
+        self.append_term_ids(self.dictionary.encode(lemmas), id)
+
+    def append_term_ids(self, term_ids, id):
+        """
+        Agrega un documento ya codificado con el diccionario del corpus.
+
+        Args:
+            term_ids (list): Los identificadores de los lemas del documento.
+            id (str): El identificador del documento.
+        """
+        self.pending_tokens.extend(term_ids)
+        self.pending_offsets.append(len(self.pending_tokens))
+        self.ids.append(id)
+
+    def extend(self, documents):
+        for document in documents:
+            self.append(document)
+
+    def flush(self):
+        """
+        Cierra los documentos agregados desde el último flush como un nuevo segmento.
+        """
+        if len(self.pending_offsets) == 1:
+            return
+        self.segments.append((np.array(self.pending_tokens, dtype=np.int32),
+                              np.array(self.pending_offsets, dtype=np.int64)))
+        self.segment_starts.append(len(self.ids))
+        self.pending_tokens = array("i")
+        self.pending_offsets = array("q", [0])
+
+    def arrays(self):
+        """
+        Concatena todos los segmentos.
+
+        Returns:
+            tuple: Los identificadores de los lemas de todos los documentos y el inicio de cada documento.
+        """
+        self.flush()
+        if not self.segments:
+            return np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int64)
+
+        tokens = np.concatenate([tokens for (tokens, offsets) in self.segments])
+        shifts = np.cumsum([0] + [len(tokens) for (tokens, offsets) in self.segments[:-1]])
+        offsets = np.concatenate([[0]] + [offsets[1:] + shift for (tokens, offsets), shift in zip(self.segments, shifts)])
+        return tokens, offsets.astype(np.int64)
+
+    def slice(self, start, end):
+        """
+        Obtiene una copia de los documentos de un rango de posiciones.
+
+        Args:
+            start (int): La primera posición.
+            end (int): La posición siguiente a la última.
+
+        Returns:
+            TokenizedDocuments: Los documentos del rango, en un único segmento, con una copia del diccionario
+                sin documentos contados.
+        """
+        tokens, offsets = self.arrays()
+        documents = TokenizedDocuments(self.dictionary.copy_terms(),
+                                       tokens[offsets[start]:offsets[end]].copy(),
+                                       offsets[start:end + 1] - offsets[start],
+                                       self.ids[start:end])
+        for position, document in self.replaced.items():
+            if start <= position < end:
+                documents.replaced[position - start] = document
+        return documents
+
+    def without(self, deleted):
+        """
+        Obtiene una copia sin los documentos de las posiciones dadas.
+
+        Args:
+            deleted (set): Las posiciones a quitar.
+
+        Returns:
+            TokenizedDocuments: Los documentos restantes, en el mismo orden, en un único segmento, con el
+                mismo diccionario.
+        """
+        tokens, offsets = self.arrays()
+        alive = np.ones(len(self.ids), dtype=bool)
+        alive[list(deleted)] = False
+        lengths = np.diff(offsets)
+
+        documents = TokenizedDocuments(self.dictionary,
+                                       tokens[np.repeat(alive, lengths)],
+                                       np.concatenate([[0], np.cumsum(lengths[alive])]).astype(np.int64),
+                                       [id for id, keep in zip(self.ids, alive.tolist()) if keep])
+        positions = np.cumsum(alive) - 1
+        for position, document in self.replaced.items():
+            if alive[position]:
+                documents.replaced[int(positions[position])] = document
+        return documents
+
+    @property
+    def nbytes(self):
+        pending = self.pending_tokens.itemsize * len(self.pending_tokens) + \
+            self.pending_offsets.itemsize * len(self.pending_offsets)
+        return sum(int(tokens.nbytes) + int(offsets.nbytes) for (tokens, offsets) in self.segments) + pending
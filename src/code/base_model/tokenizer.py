@@ -1,25 +1,13 @@
-from sympy import sympify, to_dnf
 from src.code.base_model.base import BaseTokenizer
-import spacy
-import subprocess
-
-
-def get_logical_symbol(token):
-    if token == "AND":
-        return "&"
-    if token == "OR":
-        return '|'
-    if token == "NOT":
-        return '~'
-
-    return token
+from src.code.base_model.ingestion import lemmatize, load_lemmatizer, stop_words
+from src.code.base_model.query_compiler import default_compiler
 
 
 class Tokenizer(BaseTokenizer):
 
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
-        self.operators = {'&', '|', '~', '(', ')'}
+    @property
+    def nlp(self):
+        return load_lemmatizer()
 
     def tokenize_document(self, document):
         """
@@ -38,6 +26,21 @@ class Tokenizer(BaseTokenizer):
 
         return tokens
 
+    def tokenize_documents(self, documents, batch_size=256, n_process=1):
+        """
+        Tokeniza varios documentos en lotes con nlp.pipe y devuelve los lemas de cada uno.
+
+        Args:
+            documents (list): Los documentos de texto a ser tokenizados.
+            batch_size (int, opcional): Documentos por lote. Por defecto es 256.
+            n_process (int, opcional): Procesos de spaCy. Por defecto es 1.
+
+        Returns:
+            list: Una lista con los lemas de cada documento, sin ruido ni stopwords.
+        """
+        return [lemmas for (lemmas, _) in
+                lemmatize(self.nlp, ((document, None) for document in documents), batch_size, n_process)]
+
     def tokenize_query(self, query):
         return self.tokenize_document(query)
 
@@ -75,41 +78,29 @@ class Tokenizer(BaseTokenizer):
         Returns:
             list: Una lista de tokens sin stopwords.
         """
-        stopwords = spacy.lang.en.stop_words.STOP_WORDS
-        return [
-            [token for token in tokenized_doc if token.text not in stopwords]
-        ]
+        stopwords = stop_words()
+        return [token for token in tokenized_doc if token.text not in stopwords]
 
     def morphological_reduction(self, tokenized_doc):
-        return [
-            [token.lemma_ for token in tokenized_doc]
-        ]
-
-    def query_to_dnf(self, query):
         """
-        Convierte una consulta booleana en forma normal disyuntiva (DNF).
+        Reduce cada token a su lema.
 
         Args:
-            query (str): La consulta booleana en formato de cadena.
+            tokenized_doc (list): Una lista de tokens.
 
         Returns:
-            La consulta booleana convertida en DNF.
+            list: Una lista con el lema de cada token.
         """
+        return [token.lemma_ for token in tokenized_doc]
 
-        tokens = [token.lemma_ for token in self.nlp(query) if
-                  token.is_alpha or token.lemma_ in ['(', ')', '&', '|', '~']]
-
-        processed_query = [get_logical_symbol(token.upper()) for token in tokens]
-
-        for i in range(len(processed_query) - 1):
-            if processed_query[i] not in self.operators and (processed_query[i + 1] not in self.operators):
-                processed_query[i] = processed_query[i] + ' &'
-
-        query_expr = sympify(" ".join(processed_query), evaluate=False)
-        query_dnf = to_dnf(query_expr, simplify=True, force=True)
+    def query_to_dnf(self, query):
+        """
+        Convierte una consulta booleana en forma normal disyuntiva (DNF) sobre los lemas de sus términos.
 
-        return query_dnf
+        Args:
+            query (str): La consulta booleana en formato de cadena.
 
-    def dnf_to_query(self, query_dnf):
-        return [conjunction.replace(' ', '').replace(')', '').replace('(', '').split('&') for conjunction in
-                query_dnf.__str__().split('|')]
+        Returns:
+            list: Una lista de conjunciones; cada conjunción es una lista de lemas, con el prefijo '~' si están negados.
+        """
+        return default_compiler.compile(query)
@@ -0,0 +1,149 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import time
+from collections import Counter
+
+
+class NullStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTrace:
+    """
+    Traza desactivada: sus métodos no hacen nada, de modo que instrumentar el código casi no cuesta.
+    """
+
+    enabled = False
+    _stage = NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, value=1):
+        pass
+
+
+class Stage:
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.stages[self.name] = self.trace.stages.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class Trace:
+
+    enabled = True
+
+    def __init__(self, profile=False):
+        """
+        Tiempos y contadores de las etapas de una consulta.
+
+        Las etapas se acumulan por nombre en el orden en que empiezan por primera vez; una etapa puede
+        contener a otras, por lo que los tiempos no se suman.
+
+        Args:
+            profile (bool, opcional): Si es True la consulta también se perfila con cProfile. Por defecto es False.
+        """
+        self.stages = {}
+        self.counters = Counter()
+        self.profiler = cProfile.Profile() if profile else None
+
+    def stage(self, name):
+        """
+        Mide una etapa.
+
+        Args:
+            name (str): El nombre de la etapa.
+
+        Returns:
+            Stage: Un gestor de contexto que suma a la etapa el tiempo transcurrido en su bloque.
+        """
+        self.stages.setdefault(name, 0.0)
+        return Stage(self, name)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def profile_report(self, limit=25):
+        """
+        Resume el perfil de cProfile de la consulta.
+
+        Args:
+            limit (int, opcional): La cantidad de funciones a mostrar. Por defecto es 25.
+
+        Returns:
+            str: Las funciones con mayor tiempo acumulado, o None si la consulta no se perfiló.
+        """
+        if self.profiler is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def report(self):
+        """
+        Returns:
+            dict: Los segundos de cada etapa, los contadores y, si se pidió, el perfil.
+        """
+        return {
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+            "profile": self.profile_report(),
+        }
+
+
+NULL_TRACE = NullTrace()
+_current = contextvars.ContextVar("sri_trace", default=NULL_TRACE)
+
+
+def current_trace():
+    """
+    Obtiene la traza de la consulta en curso en este hilo, o NULL_TRACE si no se está trazando.
+    """
+    return _current.get()
+
+
+class tracing:
+
+    def __init__(self, profile=False):
+        """
+        Activa la traza en el bloque que encierra, en el hilo o la tarea actual.
+
+        Uso:
+            with tracing() as trace:
+                model.query("...")
+            trace.report()
+
+        Args:
+            profile (bool, opcional): Si es True el bloque también se perfila con cProfile. Por defecto es False.
+        """
+        self.trace = Trace(profile)
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current.set(self.trace)
+        if self.trace.profiler is not None:
+            self.trace.profiler.enable()
+        return self.trace
+
+    def __exit__(self, *exc):
+        if self.trace.profiler is not None:
+            self.trace.profiler.disable()
+        _current.reset(self.token)
+        return False
@@ -1,5 +1,4 @@
 from collections import Counter
-import gensim
 import math
 
 
@@ -17,6 +16,7 @@ class Vectorizer:
         Returns:
             list: Una lista de términos únicos en el vocabulario.
         """
+        import gensim
 
         dictionary = gensim.corpora.Dictionary([[token for token in doc] for (doc, id) in tokenized_docs])
         dictionary.filter_extremes(no_below=no_below, no_above=no_above)
@@ -41,6 +41,21 @@ class Vectorizer:
             tokenized_docs, vocabulary
         )
 
+        return self.normalize_term_frequency(document, inverse_document_frequency)
+
+    def normalize_term_frequency(self, document, inverse_document_frequency):
+
+        """
+        Calcula la frecuencia de términos normalizada para un documento a partir de una frecuencia inversa ya calculada.
+
+        Args:
+            document (list): El documento para el cual se calculará la frecuencia de términos normalizada.
+            inverse_document_frequency (dict): Un diccionario que mapea términos a su frecuencia inversa del documento.
+
+        Returns:
+            dict: Un diccionario que mapea términos a su frecuencia normalizada.
+        """
+
         term_frequency = Counter(document)
         max_inverse_frequency = 0
 
@@ -50,6 +65,9 @@ class Vectorizer:
                     max_inverse_frequency, inverse_document_frequency[term]
                 )
 
+        if max_inverse_frequency == 0:
+            return {term: 0.0 for term in term_frequency}
+
         normalized_term_frequency = {
             term: (frequency * (
                 inverse_document_frequency[
@@ -0,0 +1,355 @@
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+from src.code.base_model.corpus_dictionary import CorpusDictionary
+from src.code.base_model.tracing import current_trace
+
+
+class WeightIndex:
+
+    def __init__(self, no_below=5, no_above=0.5, keep_n=100000, dictionary=None):
+        """
+        Índice de pesos de los documentos que se actualiza en forma incremental.
+
+        Cada documento se guarda como los identificadores de sus términos en el diccionario del corpus y la
+        frecuencia de cada uno; las columnas de la matriz de pesos son esos identificadores. El índice cuenta
+        los documentos en las frecuencias del diccionario. Los documentos nuevos se agregan a un segmento delta
+        en O(largo del documento); el segmento se fusiona y los pesos se recalculan con operaciones vectoriales
+        solo cuando se vuelven a consultar, ya que el vocabulario y la frecuencia inversa dependen de todo el corpus.
+
+        Args:
+            no_below (int, opcional): Frecuencia mínima de documento para incluir un término en el vocabulario.
+            no_above (float, opcional): Proporción máxima de documentos para incluir un término en el vocabulario.
+            keep_n (int, opcional): Cantidad máxima de términos del vocabulario, como en gensim.
+            dictionary (CorpusDictionary, opcional): El diccionario del corpus, compartido con los documentos
+                lematizados. Si se proporciona, se usan sus parámetros del vocabulario en lugar de los anteriores.
+        """
+        if dictionary is None:
+            dictionary = CorpusDictionary(no_below=no_below, no_above=no_above, keep_n=keep_n)
+        self.dictionary = dictionary
+        self.lengths = array("q")
+        self.deleted = set()
+
+        self.row_terms = np.empty(0, dtype=np.int32)
+        self.row_counts = np.empty(0, dtype=np.int32)
+        self.row_offsets = np.zeros(1, dtype=np.int64)
+        self.delta_terms = array("i")
+        self.delta_counts = array("i")
+        self.delta_offsets = array("q", [0])
+
+        self.statistics = None
+        self.vocabulary = []
+        self.inverse_document_frequency = {}
+        self.matrix = None
+        self.rows = None
+        self.weighted_lengths = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_documents(cls, tokenized_docs, no_below=5, no_above=0.5):
+        """
+        Construye el índice de pesos a partir de los documentos tokenizados.
+
+        El vocabulario, la frecuencia inversa y los pesos normalizados coinciden con los de Vectorizer.
+        Se guardan en una matriz dispersa CSC de documentos por términos, de modo que una consulta solo
+        necesita leer las columnas de sus términos.
+
+        Args:
+            tokenized_docs (list): Una lista de tuplas (lemas, id).
+            no_below (int): Frecuencia mínima de documento para incluir un término en el vocabulario.
+            no_above (float): Proporción máxima de documentos para incluir un término en el vocabulario.
+
+        Returns:
+            WeightIndex: El índice de pesos de los documentos.
+        """
+        index = cls(no_below=no_below, no_above=no_above)
+        for (doc, id) in tokenized_docs:
+            index.add(doc)
+        index.update()
+        return index
+
+    @classmethod
+    def from_arrays(cls, dictionary, row_terms, row_counts, row_offsets, lengths):
+        """
+        Reconstruye el índice a partir de los arreglos guardados por la caché del corpus.
+
+        Args:
+            dictionary (CorpusDictionary): El diccionario del corpus, con los documentos ya contados.
+            row_terms (numpy.ndarray): Las columnas de los términos de cada documento, concatenadas.
+            row_counts (numpy.ndarray): La frecuencia de cada término en su documento, concatenadas.
+            row_offsets (numpy.ndarray): El inicio de cada documento en row_terms y row_counts.
+            lengths (numpy.ndarray): La cantidad de lemas de cada documento.
+
+        Returns:
+            WeightIndex: El índice de pesos, cuyos pesos se calculan en la primera consulta.
+        """
+        index = cls(dictionary=dictionary)
+        index.lengths = array("q", np.asarray(lengths, dtype=np.int64).tobytes())
+        index.row_terms = row_terms
+        index.row_counts = row_counts
+        index.row_offsets = row_offsets
+        return index
+
+    @property
+    def terms(self):
+        return self.dictionary.terms
+
+    @property
+    def term_to_column(self):
+        return self.dictionary.term_to_id
+
+    @property
+    def document_frequency(self):
+        return self.dictionary.document_frequency
+
+    @property
+    def no_below(self):
+        return self.dictionary.no_below
+
+    @property
+    def no_above(self):
+        return self.dictionary.no_above
+
+    @property
+    def size(self):
+        return len(self.lengths)
+
+    @property
+    def document_lengths(self):
+        self.update()
+        return self.weighted_lengths
+
+    def add(self, document):
+        """
+        Agrega un documento al segmento delta y actualiza las frecuencias del diccionario.
+
+        Args:
+            document (list): Los lemas del documento.
+
+        Returns:
+            int: La posición asignada al documento.
+        """
+        return self.add_term_ids(self.dictionary.encode(document))
+
+    def add_term_ids(self, term_ids):
+        """
+        Agrega un documento ya codificado con el diccionario del corpus.
+
+        Args:
+            term_ids (list): Los identificadores de los lemas del documento.
+
+        Returns:
+            int: La posición asignada al documento.
+        """
+        counts = Counter(term_ids)
+        columns = list(counts.keys())
+        frequencies = list(counts.values())
+        self.dictionary.add(columns, frequencies)
+        self.delta_terms.extend(columns)
+        self.delta_counts.extend(frequencies)
+        self.delta_offsets.append(len(self.delta_terms))
+
+        self.lengths.append(len(term_ids))
+        self.matrix = None
+        return len(self.lengths) - 1
+
+    def remove(self, position):
+        """
+        Elimina un documento descontando sus términos de las frecuencias del diccionario.
+
+        La fila del documento queda vacía hasta que se compacte el índice.
+
+        Args:
+            position (int): La posición del documento.
+        """
+        if position in self.deleted:
+            return
+
+        base = len(self.row_offsets) - 1
+        if position < base:
+            start, end = self.row_offsets[position], self.row_offsets[position + 1]
+            columns, counts = self.row_terms[start:end], self.row_counts[start:end]
+        else:
+            start, end = self.delta_offsets[position - base], self.delta_offsets[position - base + 1]
+            columns, counts = self.delta_terms[start:end], self.delta_counts[start:end]
+        self.dictionary.remove(np.asarray(columns).tolist(), np.asarray(counts).tolist())
+
+        self.lengths[position] = 0
+        self.deleted.add(position)
+        self.matrix = None
+
+    def merge(self):
+        """
+        Fusiona el segmento delta con las filas ya guardadas.
+        """
+        if len(self.delta_offsets) == 1:
+            return
+
+        delta_offsets = np.frombuffer(self.delta_offsets, dtype=np.int64)[1:] + self.row_offsets[-1]
+        self.row_terms = np.concatenate([self.row_terms, np.frombuffer(self.delta_terms, dtype=np.int32)])
+        self.row_counts = np.concatenate([self.row_counts, np.frombuffer(self.delta_counts, dtype=np.int32)])
+        self.row_offsets = np.concatenate([self.row_offsets, delta_offsets])
+        self.delta_terms = array("i")
+        self.delta_counts = array("i")
+        self.delta_offsets = array("q", [0])
+
+    def compact(self):
+        """
+        Quita las filas de los documentos eliminados, de modo que las posiciones vuelven a ser consecutivas.
+        """
+        self.merge()
+        if not self.deleted:
+            return
+
+        alive = np.ones(self.size, dtype=bool)
+        alive[list(self.deleted)] = False
+        row_lengths = np.diff(self.row_offsets)
+        entries = np.repeat(alive, row_lengths)
+
+        self.row_terms = self.row_terms[entries]
+        self.row_counts = self.row_counts[entries]
+        self.row_offsets = np.concatenate([[0], np.cumsum(row_lengths[alive])]).astype(np.int64)
+        self.lengths = array("q", np.frombuffer(self.lengths, dtype=np.int64)[alive].tobytes())
+        self.deleted = set()
+        self.matrix = None
+
+    def set_statistics(self, inverse_document_frequency):
+        """
+        Fija la frecuencia inversa de los términos, calculada sobre un corpus del que este índice es solo una parte.
+
+        Los pesos se recalculan en la siguiente consulta con esas frecuencias en lugar de las del índice, de
+        modo que coinciden con los de un único índice sobre todo el corpus.
+
+        Args:
+            inverse_document_frequency (numpy.ndarray): La frecuencia inversa de cada término, en el orden de
+                sus columnas; 0 para los términos fuera del vocabulario. None vuelve a usar las del índice.
+        """
+        with self.lock:
+            self.statistics = inverse_document_frequency
+            self.matrix = None
+
+    def update(self):
+        """
+        Recalcula el vocabulario, la frecuencia inversa y los pesos si el índice cambió desde el último cálculo.
+
+        El costo es lineal en la cantidad de entradas de la matriz y no depende de cuántos documentos se agregaron.
+
+        Returns:
+            scipy.sparse.csc_matrix: La matriz de pesos actualizada.
+        """
+        with self.lock:
+            if self.matrix is not None:
+                return self.matrix
+            with current_trace().stage("weights"):
+                return self.recompute()
+
+    def recompute(self):
+        """
+        Recalcula los pesos; update lo llama con el candado tomado.
+
+        Returns:
+            scipy.sparse.csc_matrix: La matriz de pesos.
+        """
+        self.merge()
+        size = self.size
+        if self.statistics is None:
+            idf = self.dictionary.inverse_frequencies()
+            mask = self.dictionary.vocabulary_mask()
+        else:
+            idf = np.zeros(len(self.terms), dtype=np.float64)
+            idf[:len(self.statistics)] = self.statistics
+            mask = idf > 0
+
+        good = np.flatnonzero(mask)
+        self.vocabulary = [self.terms[column] for column in good.tolist()]
+        self.inverse_document_frequency = dict(zip(self.vocabulary, idf[good].tolist()))
+
+        rows = np.repeat(np.arange(size, dtype=np.int64), np.diff(self.row_offsets))
+        keep = mask[self.row_terms]
+        if self.deleted:
+            alive = np.ones(size, dtype=bool)
+            alive[list(self.deleted)] = False
+            keep &= alive[rows]
+
+        rows = rows[keep]
+        columns = np.asarray(self.row_terms[keep], dtype=np.int64)
+        weights = idf[columns]
+        if len(rows):
+            starts = np.flatnonzero(np.concatenate([[True], rows[1:] != rows[:-1]]))
+            max_idf = np.repeat(np.maximum.reduceat(weights, starts), np.diff(np.append(starts, len(rows))))
+            data = np.asarray(self.row_counts[keep], dtype=np.float64) * weights / max_idf
+        else:
+            data = np.empty(0, dtype=np.float64)
+
+        matrix = csc_matrix((data, (rows, columns)), shape=(size, len(self.terms)))
+        matrix.sort_indices()
+
+        self.weighted_lengths = np.array(self.lengths, dtype=np.int64)
+        self.rows = None
+        self.matrix = matrix
+        return matrix
+
+    @property
+    def nbytes(self):
+        matrices = [self.matrix] if self.matrix is not None else []
+        if self.rows is not None:
+            matrices.append(self.rows[1])
+        buffers = [self.lengths, self.delta_terms, self.delta_counts, self.delta_offsets]
+        return sum(int(array.nbytes) for array in (self.row_terms, self.row_counts, self.row_offsets)) + \
+            sum(array.itemsize * len(array) for array in buffers) + \
+            sum(int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) for matrix in matrices)
+
+    def get_column(self, term):
+        """
+        Obtiene las posiciones y los pesos de los documentos en los que un término tiene peso.
+
+        Args:
+            term (str): El término a buscar.
+
+        Returns:
+            tuple: Dos arreglos con las posiciones ordenadas de los documentos y sus pesos.
+        """
+        matrix = self.update()
+        column = self.term_to_column.get(term)
+        if column is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        start, end = matrix.indptr[column], matrix.indptr[column + 1]
+        return matrix.indices[start:end], matrix.data[start:end]
+
+    def get_postings(self, term):
+        """
+        Obtiene las posiciones de los documentos en los que un término tiene peso.
+
+        Args:
+            term (str): El término a buscar.
+
+        Returns:
+            list: Las posiciones de los documentos, en orden ascendente.
+        """
+        return self.get_column(term)[0].tolist()
+
+    def get_weights(self, position):
+        """
+        Obtiene los pesos normalizados de un documento.
+
+        Args:
+            position (int): La posición del documento en el almacenamiento.
+
+        Returns:
+            dict: Un diccionario que mapea términos a su peso en el documento.
+        """
+        matrix = self.update()
+        if self.rows is None or self.rows[0] is not matrix:
+            self.rows = (matrix, matrix.tocsr())
+
+        rows = self.rows[1]
+        start, end = rows.indptr[position], rows.indptr[position + 1]
+        return {
+            self.terms[column]: weight
+            for column, weight in zip(rows.indices[start:end].tolist(), rows.data[start:end].tolist())
+        }
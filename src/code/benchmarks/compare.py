@@ -0,0 +1,88 @@
+import argparse
+import json
+import sys
+
+from tabulate import tabulate
+
+# Métricas comparadas y si un valor mayor es una mejora.
+METRICS = {
+    "ingest.docs_per_second": True,
+    "latency.Boolean.p50_ms": False,
+    "latency.Boolean.p95_ms": False,
+    "latency.Boolean.p99_ms": False,
+    "latency.Extended Boolean.p50_ms": False,
+    "latency.Extended Boolean.p95_ms": False,
+    "latency.Extended Boolean.p99_ms": False,
+    "latency.Recommendation.p50_ms": False,
+    "latency.Recommendation.p95_ms": False,
+    "latency.Recommendation.p99_ms": False,
+    "recommendation_build_seconds": False,
+    "peak_rss_bytes": False,
+}
+
+
+def metric(result, path):
+    value = result
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(baseline, current, tolerance=0.1):
+    """
+    Compara dos ejecuciones del benchmark escala por escala.
+
+    Args:
+        baseline (dict): El reporte de referencia de run_suite.
+        current (dict): El reporte a comparar.
+        tolerance (float, opcional): Empeoramiento relativo tolerado antes de marcar una regresión. Por defecto es 0.1.
+
+    Returns:
+        list: Por cada métrica presente en ambos reportes, una tupla (corpus, documentos, métrica, valor de
+            referencia, valor actual, cambio relativo, regresión).
+    """
+    baseline_results = {(result["corpus"], result["documents"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        reference = baseline_results.get((result["corpus"], result["documents"]))
+        if reference is None:
+            continue
+        for path, higher_is_better in METRICS.items():
+            before, after = metric(reference, path), metric(result, path)
+            if before is None or after is None or before == 0:
+                continue
+            change = (after - before) / before
+            regression = -change > tolerance if higher_is_better else change > tolerance
+            rows.append((result["corpus"], result["documents"], path, before, after, change, regression))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos ejecuciones del benchmark.")
+    parser.add_argument("baseline", help="JSON de referencia generado por suite --output.")
+    parser.add_argument("current", help="JSON a comparar.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Empeoramiento relativo tolerado. Por defecto es 0.1 (10%%).")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current = json.load(file)
+
+    rows = compare(baseline, current, args.tolerance)
+    print(tabulate([[corpus, documents, path, before, after, f"{change:+.1%}", "REGRESIÓN" if regression else ""]
+                    for corpus, documents, path, before, after, change, regression in rows],
+                   headers=["Corpus", "Documentos", "Métrica", "Referencia", "Actual", "Cambio", ""],
+                   tablefmt="grid"))
+
+    for key in ("commit", "cpu_count", "platform"):
+        if baseline["environment"].get(key) != current["environment"].get(key):
+            print(f"{key}: {baseline['environment'].get(key)} -> {current['environment'].get(key)}")
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
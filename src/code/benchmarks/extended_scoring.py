@@ -0,0 +1,140 @@
+import argparse
+import time
+
+import ir_datasets
+import numpy as np
+from tabulate import tabulate
+
+from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.tokenized_documents import TokenizedDocuments
+from src.code.base_model.vectorizer import Vectorizer
+from src.code.benchmarks.synthetic import zipf_corpus, zipf_queries
+from src.code.boolean_model.extended_boolean_model import ExtendedBooleanHandler, ExtendedBooleanTokenizer
+
+
+def measure(function, queries):
+    """
+    Ejecuta una función sobre cada consulta y mide su latencia.
+
+    Args:
+        function (callable): La función a medir, recibe la consulta procesada.
+        queries (list): Una lista de consultas procesadas.
+
+    Returns:
+        tuple: Los resultados de cada consulta y la latencia media en segundos.
+    """
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(function(query))
+    return results, (time.perf_counter() - start) / max(len(queries), 1)
+
+
+def original_scan(handler, documents, query, p, relevance_threshold=0.5):
+    """
+    Reproduce el recorrido original del modelo booleano extendido, anterior al índice de pesos.
+
+    Se construye el vocabulario en cada consulta y se evalúan todos los documentos, recalculando la IDF de
+    todo el corpus para cada uno de ellos.
+
+    Args:
+        handler (ExtendedBooleanHandler): El manejador cuyas funciones de similitud se usan.
+        documents (list): Una lista de documentos lematizados.
+        query (list): Una lista de conjunciones de términos.
+        p (float): El valor de p para la métrica de similitud.
+        relevance_threshold (float, opcional): Umbral de relevancia. Por defecto es 0.5.
+
+    Returns:
+        list: Los documentos relevantes, en orden descendente de similitud.
+    """
+    vectorizer = Vectorizer()
+    vocabulary = vectorizer.build_vocabulary(tokenized_docs=documents)
+    scores = [
+        (doc, id, handler.is_document_relevant(
+            vectorizer.calculate_normalized_term_frequency(document=doc, tokenized_docs=documents,
+                                                           vocabulary=vocabulary),
+            query, p))
+        for (doc, id) in documents if len(doc) > 0
+    ]
+    scores.sort(key=lambda x: x[2], reverse=True)
+    return [(doc, id) for (doc, id, score) in scores if score >= relevance_threshold]
+
+
+def load(dataset, synthetic):
+    """
+    Carga el almacenamiento y las consultas procesadas del conjunto de datos o de un corpus sintético.
+
+    Args:
+        dataset (str): El nombre del conjunto de datos de ir_datasets.
+        synthetic (int): Si no es None, la cantidad de documentos del corpus sintético de Zipf que se usa
+            en lugar del conjunto de datos.
+
+    Returns:
+        tuple: El almacenamiento y la lista de consultas procesadas.
+    """
+    if synthetic is not None:
+        storage = MemoryDocumentStorage.from_documents(f"zipf-{synthetic}", TokenizedDocuments())
+        storage.ingest(zipf_corpus(synthetic, vocabulary_size=10000))
+        storage.get_weight_index().update()
+        return storage, zipf_queries(225, vocabulary_size=10000)
+
+    storage = MemoryDocumentStorage(dataset)
+    tokenizer = ExtendedBooleanTokenizer()
+    queries = [tokenizer.tokenize_query(query.text) for query in ir_datasets.load(dataset).queries_iter()]
+    return storage, [query for query in queries if len(query) > 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la latencia del modelo booleano extendido.")
+    parser.add_argument("--dataset", default="cranfield")
+    parser.add_argument("--p", type=float, default=1)
+    parser.add_argument("--k", type=int, default=10, help="Documentos recuperados en el modo top-k.")
+    parser.add_argument("--baseline-queries", type=int, default=3,
+                        help="Consultas evaluadas con el recorrido original, que recalcula la IDF por documento.")
+    parser.add_argument("--synthetic", type=int,
+                        help="Usa un corpus sintético de Zipf con esta cantidad de documentos en lugar del conjunto "
+                             "de datos, por ejemplo 1400 para el tamaño de Cranfield.")
+    args = parser.parse_args()
+
+    storage, queries = load(args.dataset, args.synthetic)
+    documents = storage.get_all_documents()
+    weight_index = storage.get_weight_index()
+    handler = ExtendedBooleanHandler()
+
+    document_list = list(documents)
+    original, baseline = measure(lambda query: original_scan(handler, document_list, query, args.p),
+                                 queries[:args.baseline_queries])
+    rebuilt, rebuilt_latency = measure(lambda query: handler.query(documents, query, args.p),
+                                       queries[:args.baseline_queries])
+    assert [[id for _, id in result] for result in original] == [[id for _, id in result] for result in rebuilt]
+    per_document, per_document_latency = measure(
+        lambda query: handler.score_index_per_document(weight_index, query, args.p), queries)
+    vectorized, vectorized_latency = measure(
+        lambda query: handler.score_index(weight_index, query, args.p), queries)
+    exhaustive, exhaustive_latency = measure(
+        lambda query: handler.query(documents, query, args.p, weight_index=weight_index)[:args.k], queries)
+    top_k, top_k_latency = measure(
+        lambda query: handler.query(documents, query, args.p, weight_index=weight_index, size=args.k), queries)
+    assert exhaustive == top_k
+
+    max_difference = 0.0
+    for (expected_positions, expected_scores), (positions, scores) in zip(per_document, vectorized):
+        assert list(expected_positions) == positions.tolist()
+        if len(scores) > 0:
+            max_difference = max(max_difference, float(np.max(np.abs(np.array(expected_scores) - scores))))
+
+    rows = [
+        ["Recorrido original, IDF recalculada por documento", baseline * 1000, 1.0],
+        ["Índice de pesos construido en cada consulta", rebuilt_latency * 1000, baseline / rebuilt_latency],
+        ["Pesos precalculados, por documento", per_document_latency * 1000, baseline / per_document_latency],
+        ["Matriz dispersa vectorizada", vectorized_latency * 1000, baseline / vectorized_latency],
+        [f"Consulta completa truncada a {args.k}", exhaustive_latency * 1000, baseline / exhaustive_latency],
+        [f"Top-{args.k} con cotas MaxScore", top_k_latency * 1000, baseline / top_k_latency],
+    ]
+    print(tabulate(rows, headers=["Motor", "Latencia media (ms)", "Aceleración"], tablefmt="grid"))
+    print(f"Documentos: {len(documents)}. Consultas: {len(queries)}, {len(original)} con el recorrido original.")
+    print(f"Diferencia máxima de similitud: {max_difference:.3e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import time
+import tracemalloc
+
+from tabulate import tabulate
+
+from src.code.base_model.inverted_index import InvertedIndex, intersect, union
+from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.boolean_model.boolean_model import BooleanHandler, BooleanTokenizer
+
+
+def list_postings(tokenized_docs):
+    """
+    Construye las listas de postings con la representación anterior: un diccionario de listas de Python.
+
+    Args:
+        tokenized_docs (list): Una lista de tuplas (lemas, id).
+
+    Returns:
+        dict: Un diccionario que mapea lemas a listas ordenadas de posiciones.
+    """
+    postings = {}
+    for position, (doc, id) in enumerate(tokenized_docs):
+        for term in set(doc):
+            postings.setdefault(term, []).append(position)
+    return postings
+
+
+def allocated(build):
+    """
+    Mide la memoria que retiene el resultado de una función.
+
+    Args:
+        build (callable): La función que construye la estructura.
+
+    Returns:
+        tuple: La estructura construida y los bytes que ocupa.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def memory_report(tokenized_docs):
+    """
+    Compara la memoria de las listas de postings de Python con la de las listas codificadas en bloques varint.
+
+    Args:
+        tokenized_docs (list): Una lista de tuplas (lemas, id).
+
+    Returns:
+        dict: Los bytes de cada representación, la cantidad de postings y los bytes por posting.
+    """
+    postings, list_bytes = allocated(lambda: list_postings(tokenized_docs))
+    index, compact_bytes = allocated(lambda: InvertedIndex.from_documents(tokenized_docs))
+    count = sum(len(positions) for positions in postings.values())
+
+    return {
+        "documents": len(tokenized_docs),
+        "terms": len(postings),
+        "postings": count,
+        "list_bytes": list_bytes,
+        "compact_bytes": compact_bytes,
+        "compact_buffer_bytes": index.compact.nbytes,
+        "list_bytes_per_posting": list_bytes / max(count, 1),
+        "compact_bytes_per_posting": compact_bytes / max(count, 1),
+        "ratio": list_bytes / max(compact_bytes, 1),
+    }
+
+
+def list_query(postings, query, size):
+    result = []
+    for conjunction in query:
+        if len(conjunction) == 0:
+            return list(range(size))
+        matches = postings.get(conjunction[0], [])
+        for token in conjunction[1:]:
+            matches = intersect(matches, postings.get(token, []))
+        result = union(result, matches)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la memoria y la latencia de las listas de postings.")
+    parser.add_argument("--dataset", default="cranfield")
+    args = parser.parse_args()
+
+    import ir_datasets
+
+    storage = MemoryDocumentStorage(args.dataset)
+    documents = storage.get_all_documents()
+    report = memory_report(documents)
+
+    print(tabulate([
+        ["Listas de Python", report["list_bytes"], report["list_bytes_per_posting"]],
+        ["Bloques varint", report["compact_bytes"], report["compact_bytes_per_posting"]],
+    ], headers=["Representación", "Bytes", "Bytes por posting"], tablefmt="grid"))
+    print(f"Documentos: {report['documents']}. Términos: {report['terms']}. Postings: {report['postings']}. "
+          f"Reducción: {report['ratio']:.1f}x")
+
+    tokenizer = BooleanTokenizer()
+    handler = BooleanHandler()
+    queries = [tokenizer.tokenize_query(query.text) for query in ir_datasets.load(args.dataset).queries_iter()]
+    queries = [query for query in queries if len(query) > 0]
+    postings = list_postings(documents)
+    index = storage.get_index()
+
+    start = time.perf_counter()
+    expected = [list_query(postings, query, len(documents)) for query in queries]
+    list_latency = (time.perf_counter() - start) / max(len(queries), 1)
+
+    start = time.perf_counter()
+    results = [handler.query_index(index, query) for query in queries]
+    compact_latency = (time.perf_counter() - start) / max(len(queries), 1)
+
+    assert results == expected
+    print(tabulate([
+        ["Listas de Python", list_latency * 1000],
+        ["Bloques varint con saltos", compact_latency * 1000],
+    ], headers=["Representación", "Latencia media (ms)"], tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.tokenized_documents import TokenizedDocuments
+from src.code.benchmarks.synthetic import zipf_corpus, zipf_queries
+from src.code.boolean_model.boolean_model import BooleanModel
+from src.code.boolean_model.extended_boolean_model import ExtendedBooleanModel
+
+SIZES = [1000, 10000, 100000, 1000000]
+PERCENTILES = [50, 95, 99]
+
+
+def peak_memory():
+    """
+    Obtiene la memoria residente máxima del proceso en bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency_summary(latencies):
+    """
+    Resume una serie de latencias.
+
+    Args:
+        latencies (list): Las latencias en segundos.
+
+    Returns:
+        dict: La cantidad de mediciones, la media, el máximo y los percentiles de PERCENTILES, en milisegundos.
+    """
+    if not latencies:
+        return {"count": 0}
+    values = np.array(latencies) * 1000
+    summary = {"count": len(values), "mean_ms": float(values.mean()), "max_ms": float(values.max())}
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist()):
+        summary[f"p{percentile}_ms"] = value
+    return summary
+
+
+def timed(function, queries):
+    """
+    Ejecuta una función sobre cada consulta y mide la latencia de cada ejecución.
+
+    Args:
+        function (callable): La función a medir, recibe la consulta.
+        queries (list): Las consultas.
+
+    Returns:
+        tuple: Los resultados y las latencias en segundos.
+    """
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(function(query))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def synthetic_storage(size, vocabulary_size, chunk_size):
+    """
+    Ingiere un corpus sintético de Zipf midiendo su velocidad.
+
+    Args:
+        size (int): La cantidad de documentos.
+        vocabulary_size (int): La cantidad de términos distintos.
+        chunk_size (int): Documentos por segmento de la ingestión.
+
+    Returns:
+        tuple: El almacenamiento y los segundos de la ingestión, sin contar la generación del corpus.
+    """
+    generation = [0.0]
+
+    def generate(stream):
+        while True:
+            start = time.perf_counter()
+            document = next(stream, None)
+            generation[0] += time.perf_counter() - start
+            if document is None:
+                return
+            yield document
+
+    storage = MemoryDocumentStorage.from_documents(f"zipf-{size}", TokenizedDocuments())
+    start = time.perf_counter()
+    storage.ingest(generate(zipf_corpus(size, vocabulary_size, chunk_size=chunk_size)), chunk_size=chunk_size)
+    storage.get_weight_index().update()
+    return storage, time.perf_counter() - start - generation[0]
+
+
+def dataset_storage(dataset):
+    """
+    Lematiza un conjunto de datos de ir_datasets sin usar la caché del corpus, midiendo su velocidad.
+
+    Args:
+        dataset (str): El nombre del conjunto de datos.
+
+    Returns:
+        tuple: El almacenamiento, los segundos de la ingestión y las consultas en DNF del conjunto de datos.
+    """
+    import ir_datasets
+
+    from src.code.boolean_model.boolean_model import BooleanTokenizer
+
+    start = time.perf_counter()
+    storage = MemoryDocumentStorage(dataset, use_cache=False)
+    storage.get_weight_index().update()
+    seconds = time.perf_counter() - start
+
+    tokenizer = BooleanTokenizer()
+    queries = [tokenizer.tokenize_query(query.text) for query in ir_datasets.load(dataset).queries_iter()]
+    return storage, seconds, [query for query in queries if len(query) > 0]
+
+
+def run_scale(corpus, size, queries, k, vocabulary_size, chunk_size):
+    """
+    Mide una combinación de corpus y tamaño. Se ejecuta en un proceso propio para que la memoria
+    residente máxima sea solo la de esa combinación.
+
+    Args:
+        corpus (str): 'zipf' o el nombre de un conjunto de datos de ir_datasets.
+        size (int): La cantidad de documentos del corpus sintético; se ignora para los conjuntos de datos.
+        queries (int): La cantidad de consultas sintéticas.
+        k (int): Documentos recuperados por consulta.
+        vocabulary_size (int): La cantidad de términos del corpus sintético.
+        chunk_size (int): Documentos por segmento de la ingestión.
+
+    Returns:
+        dict: Las mediciones de ingestión, latencia de consultas y recomendación, y la memoria máxima.
+    """
+    if corpus == "zipf":
+        storage, ingest_seconds = synthetic_storage(size, vocabulary_size, chunk_size)
+        processed_queries = zipf_queries(queries, vocabulary_size)
+    else:
+        storage, ingest_seconds, processed_queries = dataset_storage(corpus)
+    documents = len(storage.get_all_documents())
+
+    boolean = BooleanModel(storage=storage)
+    extended = ExtendedBooleanModel(storage=storage, verbose=False)
+    _, boolean_latencies = timed(lambda query: boolean.retrieve(query, k, 1), processed_queries)
+    results, extended_latencies = timed(lambda query: extended.retrieve(query, k), processed_queries)
+
+    start = time.perf_counter()
+    extended.recommendation.get_title_index()
+    recommendation_build = time.perf_counter() - start
+    _, recommendation_latencies = timed(extended.recommendation.get_recommendations, results)
+
+    return {
+        "corpus": corpus,
+        "documents": documents,
+        "queries": len(processed_queries),
+        "k": k,
+        "ingest": {
+            "seconds": ingest_seconds,
+            "docs_per_second": documents / ingest_seconds if ingest_seconds > 0 else None,
+        },
+        "latency": {
+            "Boolean": latency_summary(boolean_latencies),
+            "Extended Boolean": latency_summary(extended_latencies),
+            "Recommendation": latency_summary(recommendation_latencies),
+        },
+        "recommendation_build_seconds": recommendation_build,
+        "peak_rss_bytes": peak_memory(),
+    }
+
+
+def environment():
+    """
+    Describe la máquina y la versión del código con que se midió, para comparar solo ejecuciones equivalentes.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run_suite(corpora, sizes, queries=200, k=10, vocabulary_size=50000, chunk_size=10000, isolate=True):
+    """
+    Ejecuta el benchmark en cada combinación de corpus y tamaño.
+
+    Args:
+        corpora (list): 'zipf' y nombres de conjuntos de datos de ir_datasets.
+        sizes (list): Los tamaños del corpus sintético.
+        queries (int, opcional): La cantidad de consultas sintéticas. Por defecto es 200.
+        k (int, opcional): Documentos recuperados por consulta. Por defecto es 10.
+        vocabulary_size (int, opcional): La cantidad de términos del corpus sintético. Por defecto es 50000.
+        chunk_size (int, opcional): Documentos por segmento de la ingestión. Por defecto es 10000.
+        isolate (bool, opcional): Si es True cada combinación se mide en un proceso nuevo. Por defecto es True.
+
+    Returns:
+        dict: El entorno y los resultados de cada combinación.
+    """
+    scales = [(corpus, size) for corpus in corpora for size in (sizes if corpus == "zipf" else [None])]
+    results = []
+    for corpus, size in scales:
+        args = (corpus, size, queries, k, vocabulary_size, chunk_size)
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results.append(executor.submit(run_scale, *args).result())
+        else:
+            results.append(run_scale(*args))
+    return {"environment": environment(), "results": results}
+
+
+def print_report(report):
+    rows = []
+    for result in report["results"]:
+        for model, latency in result["latency"].items():
+            rows.append([result["corpus"], result["documents"], model, latency.get("p50_ms"), latency.get("p95_ms"),
+                         latency.get("p99_ms")])
+    print(tabulate(rows, headers=["Corpus", "Documentos", "Etapa", "p50 (ms)", "p95 (ms)", "p99 (ms)"],
+                   tablefmt="grid"))
+
+    rows = [[result["corpus"], result["documents"], result["ingest"]["docs_per_second"],
+             result["recommendation_build_seconds"], result["peak_rss_bytes"] / (1024 * 1024)]
+            for result in report["results"]]
+    print(tabulate(rows, headers=["Corpus", "Documentos", "Ingestión (docs/s)", "Índice de títulos (s)",
+                                  "Memoria máxima (MB)"], tablefmt="grid"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide ingestión, latencia de consultas y recomendación a varias escalas.")
+    parser.add_argument("--corpora", nargs="+", default=["zipf"],
+                        help="'zipf' para el corpus sintético o nombres de ir_datasets, p. ej. cranfield.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES[:3],
+                        help="Tamaños del corpus sintético. Por defecto 1000 10000 100000.")
+    parser.add_argument("--queries", type=int, default=200, help="Consultas sintéticas por tamaño.")
+    parser.add_argument("--k", type=int, default=10, help="Documentos recuperados por consulta.")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="Términos del corpus sintético.")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Mide todo en el proceso actual; la memoria máxima deja de ser por escala.")
+    parser.add_argument("--output", help="Guarda los resultados en un archivo JSON.")
+    args = parser.parse_args()
+
+    report = run_suite(args.corpora, args.sizes, queries=args.queries, k=args.k, vocabulary_size=args.vocabulary,
+                       chunk_size=args.chunk_size, isolate=not args.no_isolate)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def vocabulary(size):
+    """
+    Genera un vocabulario de pseudopalabras alfabéticas distintas.
+
+    Args:
+        size (int): La cantidad de palabras.
+
+    Returns:
+        list: Las palabras, de la más frecuente a la menos frecuente.
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = []
+    for rank in range(size):
+        word = ""
+        rank += 26
+        while rank > 0:
+            rank, letter = divmod(rank, 26)
+            word = letters[letter] + word
+        words.append(word)
+    return words
+
+
+def zipf_probabilities(size, exponent):
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def zipf_corpus(documents, vocabulary_size=50000, exponent=1.1, mean_length=80, seed=0, chunk_size=10000):
+    """
+    Genera un corpus lematizado sintético cuyas frecuencias de términos siguen la ley de Zipf.
+
+    Los documentos se generan por bloques con NumPy y se entregan uno a uno, de modo que el corpus
+    nunca está completo en memoria.
+
+    Args:
+        documents (int): La cantidad de documentos.
+        vocabulary_size (int, opcional): La cantidad de términos distintos. Por defecto es 50000.
+        exponent (float, opcional): El exponente de la ley de Zipf. Por defecto es 1.1.
+        mean_length (int, opcional): La cantidad media de lemas por documento. Por defecto es 80.
+        seed (int, opcional): La semilla del generador. Por defecto es 0.
+        chunk_size (int, opcional): Documentos generados en cada bloque. Por defecto es 10000.
+
+    Yields:
+        tuple: Tuplas (lemas, (id, título)), en el formato de MemoryDocumentStorage.ingest.
+    """
+    rng = np.random.default_rng(seed)
+    words = vocabulary(vocabulary_size)
+    probabilities = zipf_probabilities(vocabulary_size, exponent)
+
+    for start in range(0, documents, chunk_size):
+        count = min(chunk_size, documents - start)
+        lengths = rng.poisson(mean_length, count)
+        terms = rng.choice(vocabulary_size, size=int(lengths.sum()), p=probabilities).tolist()
+        titles = rng.choice(vocabulary_size, size=(count, 6), p=probabilities).tolist()
+        offset = 0
+        for i, length in enumerate(lengths.tolist()):
+            lemmas = [words[term] for term in terms[offset:offset + length]]
+            offset += length
+            yield lemmas, (str(start + i), " ".join(words[term] for term in titles[i]))
+
+
+def zipf_queries(count, vocabulary_size=50000, exponent=1.1, max_terms=3, max_conjunctions=3, skip=20, seed=1):
+    """
+    Genera consultas en DNF con términos de la misma distribución que el corpus sintético.
+
+    Se omiten los términos más frecuentes, que en un corpus real serían stopwords.
+
+    Args:
+        count (int): La cantidad de consultas.
+        vocabulary_size (int, opcional): La cantidad de términos distintos. Por defecto es 50000.
+        exponent (float, opcional): El exponente de la ley de Zipf. Por defecto es 1.1.
+        max_terms (int, opcional): Términos máximos por conjunción. Por defecto es 3.
+        max_conjunctions (int, opcional): Conjunciones máximas por consulta. Por defecto es 3.
+        skip (int, opcional): Términos más frecuentes que no se usan en las consultas. Por defecto es 20.
+        seed (int, opcional): La semilla del generador. Por defecto es 1.
+
+    Returns:
+        list: Las consultas, como listas de conjunciones de lemas.
+    """
+    rng = np.random.default_rng(seed)
+    words = vocabulary(vocabulary_size)
+    probabilities = zipf_probabilities(vocabulary_size - skip, exponent)
+
+    queries = []
+    for _ in range(count):
+        query = []
+        for _ in range(int(rng.integers(1, max_conjunctions + 1))):
+            terms = rng.choice(vocabulary_size - skip, size=int(rng.integers(1, max_terms + 1)), p=probabilities)
+            query.append([words[skip + term] for term in terms.tolist()])
+        queries.append(query)
+    return queries
@@ -1,11 +1,34 @@
+from collections import Counter
+
+import numpy as np
+
 from src.code.base_model.base import BaseHandler, BaseModel, BaseStorage, BaseTokenizer
 from src.code.base_model.document import Document
+from src.code.base_model.inverted_index import intersect_iterators, scan_count, union
 from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.positional_index import matches_lemmas, parse_positional
+from src.code.base_model.tokenized_documents import TokenizedDocuments
 from src.code.base_model.tokenizer import Tokenizer
+from src.code.base_model.tracing import current_trace
+from src.code.boolean_model.query_planner import plan_query, split_literals
+
+
+def literal_in(literal, document):
+    """
+    Verifica si un documento cumple un literal: contiene el término, la frase o la proximidad o, si está
+    negado con '~', no lo contiene.
+    """
+    if literal.startswith("~"):
+        return not matches_lemmas(literal[1:], document)
+    return matches_lemmas(literal, document)
+
+
+def has_positional(query):
+    return any(parse_positional(literal.lstrip("~")) is not None for conjunction in query for literal in conjunction)
 
 
 class BooleanHandler(BaseHandler):
-    def query(self, documents, query, relaxation_threshold=1):
+    def query(self, documents, query, relaxation_threshold=1, index=None):
         """
         Realiza una consulta booleana en los documentos dados.
 
@@ -13,10 +36,23 @@ class BooleanHandler(BaseHandler):
             documents (list): Una lista de documentos.
             query (list): Una lista de términos de consulta.
             relaxation_threshold (float, opcional): Umbral de relajación para la coincidencia de términos.
+            index (InvertedIndex, opcional): Índice invertido de los documentos. Si se proporciona, la consulta
+                se resuelve con las listas de postings: intersectándolas si no es relajada y contando los
+                términos de cada documento si lo es.
 
         Returns:
             list: Una lista de documentos que cumplen con la consulta.
         """
+        if index is not None and relaxation_threshold == 1:
+            return [documents[position] for position in self.query_index(index, query)]
+        if index is not None:
+            positions = self.query_relaxed(index, query, relaxation_threshold)[0]
+            return [documents[position] for position in positions.tolist()]
+
+        current_trace().count("documents_scanned", len(documents))
+        if isinstance(documents, TokenizedDocuments) and not has_positional(query):
+            return [documents[position] for position in self.scan_term_ids(documents, query, relaxation_threshold)]
+
         relevant_documents = [
             (doc, id)
             for (doc, id) in documents
@@ -24,6 +60,166 @@ class BooleanHandler(BaseHandler):
         ]
         return relevant_documents
 
+    def query_index(self, index, query, limit=None):
+        """
+        Resuelve una consulta en DNF sobre el índice invertido siguiendo el plan de plan_query.
+
+        Cada conjunción se resuelve intersectando las listas de postings de sus términos, de la más corta a
+        la más larga, con iteradores que galopan sobre los bloques; las conjunciones con un término ausente
+        se saltan sin leer ninguna lista y una conjunción vacía devuelve todo el corpus sin evaluar las demás.
+        Las conjunciones con términos negados se resuelven con operaciones sobre los mapas de bits del índice.
+        La disyunción se obtiene mezclando los resultados de las conjunciones.
+
+        Args:
+            index (InvertedIndex): El índice invertido de los documentos.
+            query (list): Una lista de conjunciones de términos.
+            limit (int, opcional): Si se proporciona, solo se buscan las primeras limit posiciones; cada
+                intersección se detiene al encontrarlas.
+
+        Returns:
+            list: Las posiciones ordenadas de los documentos relevantes.
+        """
+        trace = current_trace()
+        with trace.stage("plan"):
+            plan = plan_query(query, index.document_frequency)
+        trace.count("subsumed_conjunctions", len(plan.subsumed))
+
+        with trace.stage("postings"):
+            if plan.matches_all:
+                positions = index.all_positions()
+                return positions if limit is None else positions[:limit]
+
+            result = []
+            negated = []
+            for conjunction in plan.conjunctions:
+                if conjunction.empty:
+                    trace.count("skipped_conjunctions")
+                    continue
+                if conjunction.negated:
+                    negated.append((conjunction.terms, conjunction.negated))
+                    continue
+                if trace.enabled:
+                    trace.count("terms", len(conjunction.terms))
+                    trace.count("postings", sum(conjunction.frequencies))
+                if len(conjunction.terms) == 1:
+                    matches = index.get_postings(conjunction.terms[0])
+                else:
+                    matches = intersect_iterators([index.iterator(term) for term in conjunction.terms], limit)
+
+                result = union(result, matches)
+                if limit is not None:
+                    result = result[:limit]
+
+        if negated:
+            trace.count("bitmap_conjunctions", len(negated))
+            with trace.stage("bitmaps"):
+                matches = index.bitmap_index().evaluate(negated).tolist()
+            result = union(result, matches)
+        return result if limit is None else result[:limit]
+
+    def query_positions(self, index, query, relaxation_threshold=1, limit=None):
+        """
+        Obtiene las posiciones de los documentos relevantes sin decodificar sus lemas.
+
+        Args:
+            index (InvertedIndex): El índice invertido de los documentos.
+            query (list): Una lista de conjunciones de términos.
+            relaxation_threshold (float, opcional): Umbral de relajación para la coincidencia de términos.
+            limit (int, opcional): La cantidad máxima de posiciones. Por defecto todas.
+
+        Returns:
+            list: Las primeras limit posiciones de los documentos relevantes, en orden ascendente.
+        """
+        if relaxation_threshold == 1:
+            return self.query_index(index, query, limit)
+        positions, counts = self.query_relaxed(index, query, relaxation_threshold)
+        return positions[:limit].tolist()
+
+    def query_relaxed(self, index, query, relaxation_threshold):
+        """
+        Resuelve una consulta relajada contando con las listas de postings cuántos términos de cada
+        conjunción contiene cada documento.
+
+        Las listas de los términos de una conjunción se mezclan sumando, por documento, las veces que el
+        término aparece en la conjunción; los documentos que alcanzan el umbral salen directamente de la
+        mezcla, igual que con is_document_relevant pero sin recorrer los documentos. La cantidad de
+        términos encontrados sirve además para ordenar los resultados.
+
+        Args:
+            index (InvertedIndex): El índice invertido de los documentos.
+            query (list): Una lista de conjunciones de términos.
+            relaxation_threshold (float): Proporción mínima de los términos de una conjunción que debe
+                contener un documento.
+
+        Returns:
+            tuple: Dos arreglos con las posiciones ordenadas de los documentos relevantes y, para cada uno,
+                la mayor cantidad de términos que contiene de una conjunción que satisface.
+        """
+        trace = current_trace()
+        positions = []
+        counts = []
+        with trace.stage("postings"):
+            for conjunction in query:
+                literals = Counter(conjunction)
+                terms, negated = split_literals(literals)
+                required = len(conjunction) * relaxation_threshold
+                postings = [index.get_postings_array(term) for term in terms + negated]
+                weights = [literals[term] for term in terms] + [-literals["~" + term] for term in negated]
+                if trace.enabled:
+                    trace.count("terms", len(literals))
+                    trace.count("postings", sum(len(positions) for positions in postings))
+
+                # Un documento cumple todos los literales negados salvo los de las listas en que aparece.
+                baseline = sum(literals["~" + term] for term in negated)
+                if baseline < required:
+                    matches, hits = scan_count(postings, weights, required - baseline)
+                    hits += baseline
+                else:
+                    matches, hits = scan_count(postings, weights, -np.inf)
+                    every = np.array(index.all_positions(), dtype=np.int64)
+                    every_hits = np.full(len(every), baseline, dtype=np.int64)
+                    every_hits[np.searchsorted(every, matches)] += hits
+                    keep = every_hits >= required
+                    matches, hits = every[keep], every_hits[keep]
+                positions.append(matches)
+                counts.append(hits)
+
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        counts = np.concatenate(counts) if counts else np.empty(0, dtype=np.int64)
+        if len(positions) == 0:
+            return positions, counts
+        order = np.lexsort((-counts, positions))
+        positions, counts = positions[order], counts[order]
+        first = np.concatenate([[True], positions[1:] != positions[:-1]])
+        return positions[first], counts[first]
+
+    def scan_term_ids(self, documents, query, relaxation_threshold, deleted=()):
+        """
+        Evalúa una consulta relajada recorriendo los identificadores de los lemas, sin decodificar los documentos.
+
+        Args:
+            documents (TokenizedDocuments): Los documentos lematizados.
+            query (list): Una lista de conjunciones de términos.
+            relaxation_threshold (float): Umbral de relajación para la coincidencia de términos.
+            deleted (set, opcional): Posiciones de documentos eliminados, que se omiten.
+
+        Returns:
+            list: Las posiciones ordenadas de los documentos relevantes.
+        """
+        dictionary = documents.dictionary
+        conjunctions = [([(dictionary.get(token.lstrip("~")), token.startswith("~")) for token in conjunction],
+                         len(conjunction) * relaxation_threshold)
+                        for conjunction in query]
+        positions = []
+        for position, term_ids in documents.iter_term_ids():
+            if position in deleted:
+                continue
+            present = set(term_ids)
+            if any(sum((term_id in present) != negated for term_id, negated in conjunction) >= required
+                   for conjunction, required in conjunctions):
+                positions.append(position)
+        return positions
+
     def is_document_relevant(self, document, query, relaxation_threshold):
         """
         Verifica si un documento es relevante para una consulta dada.
@@ -38,13 +234,14 @@ class BooleanHandler(BaseHandler):
         """
 
         return any(
-            [sum(token in document for token in conjunction) >= len(conjunction) * relaxation_threshold for
-             conjunction in query])
+            [sum(literal_in(token, document) for token in conjunction) >= len(conjunction) * relaxation_threshold
+             for conjunction in query])
 
 
 class BooleanTokenizer(BaseTokenizer):
     def __init__(self):
         super().__init__()
+        self.tokenizer = Tokenizer()
 
     def tokenize_query(self, query):
         """
@@ -56,10 +253,7 @@ class BooleanTokenizer(BaseTokenizer):
         Returns:
             La consulta en forma normal disyuntiva (DNF).
         """
-        tokenizer = Tokenizer()
-        dnf = tokenizer.query_to_dnf(query)
-        query = tokenizer.dnf_to_query(dnf)
-        return query
+        return self.tokenizer.query_to_dnf(query)
 
     def tokenize_document(self, document):
         """
@@ -71,8 +265,7 @@ class BooleanTokenizer(BaseTokenizer):
         Returns:
             list: Una lista de tokens del documento.
         """
-        tokenizer = Tokenizer()
-        tokens = tokenizer.tokenize_document(document)
+        tokens = self.tokenizer.tokenize_document(document)
         return tokens
 
 
@@ -99,12 +292,111 @@ class BooleanModel(BaseModel):
         Returns:
             list: Una lista de documentos relevantes para la consulta.
         """
+        with current_trace().stage("parse"):
+            processed_query = self.tokenizer.tokenize_query(query)
+        if len(processed_query) == 0:
+            return []
+        return self.cached_query(processed_query, {"size": size, "relaxation_threshold": relaxation_threshold},
+                                 lambda: self.retrieve(processed_query, size, relaxation_threshold))
+
+    def retrieve(self, processed_query, size, relaxation_threshold):
+        """
+        Recupera los documentos de una consulta ya compilada, sin pasar por la caché de resultados.
+
+        Args:
+            processed_query (list): La consulta compilada en DNF.
+            size (int): El tamaño máximo de los documentos recuperados, o None.
+            relaxation_threshold (float): El nivel de relajación de la consulta.
+
+        Returns:
+            list: Una lista de identificadores de documentos relevantes.
+        """
+        if self.storage.is_sharded():
+            return self.storage.query_boolean(processed_query, relaxation_threshold, size)
+
+        with current_trace().stage("retrieval"):
+            positions = self.handler.query_positions(self.storage.get_index(), processed_query,
+                                                     relaxation_threshold, size)
+        ids = self.storage.get_all_documents().ids
+        return [ids[position] for position in positions]
+
+    def explain(self, query, relaxation_threshold=1):
+        """
+        Describe cómo se resolvería una consulta, sin resolverla.
+
+        Args:
+            query (str): La consulta a explicar.
+            relaxation_threshold (float, opcional): El nivel de relajación de la consulta. Por defecto es 1.
+
+        Returns:
+            dict: La consulta compilada en DNF y, si no es relajada, el plan de plan_query: las conjunciones
+                en el orden en que se evalúan con la frecuencia de documento de sus términos y la estrategia
+                de cada una, las conjunciones descartadas por estar cubiertas por otra y una cota superior de
+                los resultados. Las consultas relajadas se resuelven contando términos en las listas de postings.
+        """
         processed_query = self.tokenizer.tokenize_query(query)
-        if processed_query is None:
+        terms = sorted({literal.lstrip("~") for conjunction in processed_query for literal in conjunction})
+        if self.storage.is_sharded():
+            document_frequency = dict(zip(terms, self.storage.document_frequencies(terms))).get
+        else:
+            document_frequency = self.storage.get_index().document_frequency
+
+        explanation = {"query": processed_query, "relaxation_threshold": relaxation_threshold}
+        if relaxation_threshold == 1:
+            explanation["strategy"] = "plan"
+            explanation.update(plan_query(processed_query, document_frequency).explain())
+        else:
+            explanation["strategy"] = "scan_count"
+            explanation["conjunctions"] = [
+                {"terms": [{"term": literal, "document_frequency": document_frequency(literal.lstrip("~"))}
+                           for literal in conjunction],
+                 "required_matches": len(conjunction) * relaxation_threshold}
+                for conjunction in processed_query
+            ]
+        return explanation
+
+    def rank(self, query, size=None, relaxation_threshold=0.5):
+        """
+        Realiza una consulta relajada y ordena los documentos por la cantidad de términos de la consulta
+        que contienen.
+
+        Args:
+            query (str): La consulta a realizar.
+            size (int, opcional): El tamaño máximo de los documentos recuperados. Por defecto todos.
+            relaxation_threshold (float, opcional): El nivel de relajación de la consulta. Por defecto es 0.5.
+
+        Returns:
+            list: Tuplas (id, términos encontrados) en orden descendente de términos encontrados y, a igual
+                cantidad, en el orden del corpus.
+        """
+        with current_trace().stage("parse"):
+            processed_query = self.tokenizer.tokenize_query(query)
+        if len(processed_query) == 0:
             return []
-        documents = self.storage.get_all_documents()
-        relevant = self.handler.query(documents, processed_query, relaxation_threshold)
-        if size is None or size >= len(relevant):
-            return [id for _, id in relevant]
+        return self.cached_query(processed_query,
+                                 {"size": size, "relaxation_threshold": relaxation_threshold, "ranked": True},
+                                 lambda: self.retrieve_ranked(processed_query, size, relaxation_threshold))
+
+    def retrieve_ranked(self, processed_query, size, relaxation_threshold):
+        """
+        Recupera los documentos de una consulta ya compilada ordenados por la cantidad de términos encontrados.
+
+        Args:
+            processed_query (list): La consulta compilada en DNF.
+            size (int): El tamaño máximo de los documentos recuperados, o None.
+            relaxation_threshold (float): El nivel de relajación de la consulta.
+
+        Returns:
+            list: Tuplas (id, términos encontrados), de la mayor cantidad a la menor.
+        """
+        if self.storage.is_sharded():
+            matches = self.storage.query_match_counts(processed_query, relaxation_threshold)
         else:
-            return [id for _, id in relevant][:size]
+            with current_trace().stage("retrieval"):
+                positions, counts = self.handler.query_relaxed(self.storage.get_index(), processed_query,
+                                                               relaxation_threshold)
+            ids = self.storage.get_all_documents().ids
+            matches = [(ids[position], count) for position, count in zip(positions.tolist(), counts.tolist())]
+
+        matches.sort(key=lambda match: -match[1])
+        return matches if size is None else matches[:size]
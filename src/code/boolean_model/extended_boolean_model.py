@@ -1,16 +1,38 @@
+import heapq
+
 from tabulate import tabulate
 import numpy as np
 
 from src.code.base_model.base import BaseHandler, BaseModel, BaseStorage, BaseTokenizer
 from src.code.base_model.document import Document
 from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.positional_index import literal_terms
 from src.code.base_model.recommendation import Recommendation
 from src.code.base_model.tokenizer import Tokenizer
-from src.code.base_model.vectorizer import Vectorizer
+from src.code.base_model.tracing import current_trace
+from src.code.base_model.weight_index import WeightIndex
+
+
+def merge_positions(rows):
+    """
+    Mezcla varias listas ordenadas de posiciones sin repetirlas.
+
+    Args:
+        rows (list): Arreglos ordenados de posiciones.
+
+    Returns:
+        numpy.ndarray: Las posiciones presentes en algún arreglo, ordenadas.
+    """
+    if not rows:
+        return np.empty(0, dtype=np.int64)
+    positions = np.sort(np.concatenate(rows).astype(np.int64, copy=False))
+    if len(positions) == 0:
+        return positions
+    return positions[np.concatenate([[True], positions[1:] != positions[:-1]])]
 
 
 class ExtendedBooleanHandler(BaseHandler):
-    def query(self, documents, query, p=1, relevance_threshold=0.5):
+    def query(self, documents, query, p=1, relevance_threshold=0.5, weight_index=None, size=None):
         """
         Realiza una consulta extendida en los documentos dados.
 
@@ -19,32 +41,276 @@ class ExtendedBooleanHandler(BaseHandler):
             query (list): Una lista de términos de consulta.
             p (int, opcional): El valor de p para la métrica de similitud. Por defecto es 1.
             relevance_threshold (float, opcional): Umbral de relevancia para los documentos recuperados. Por defecto es 0.5.
+            weight_index (WeightIndex, opcional): Índice con los pesos precalculados de los documentos. Si no se
+                proporciona, se construye uno para los documentos dados. Solo se evalúan los documentos que
+                contienen algún término de la consulta.
+            size (int, opcional): Si se proporciona, solo se recuperan los size documentos de mayor similitud,
+                descartando sin evaluarlos los que no pueden alcanzarlos.
 
         Returns:
             list: Una lista de documentos que cumplen con la consulta extendida.
         """
 
-        vectorizer = Vectorizer()
-        vocabulary = vectorizer.build_vocabulary(tokenized_docs=documents)
-        relevant_documents_with_scores = [
-            (doc, id, relevance_score)
-            for (doc, id, relevance_score) in [
-                (doc, id, self.is_document_relevant(
-                    vectorizer.calculate_normalized_term_frequency(
-                        document=doc,
-                        tokenized_docs=documents, vocabulary=vocabulary
-                    ),
-                    query,
-                    p
-                ))
-                for (doc, id) in documents if len(doc) > 0
-            ]
-        ]
+        if weight_index is None:
+            weight_index = WeightIndex.from_documents(documents)
+
+        if size is not None:
+            return self.query_top_k(documents, query, weight_index, size, p, relevance_threshold)
+        return self.query_index(documents, query, weight_index, p, relevance_threshold)
+
+    def query_index(self, documents, query, weight_index, p, relevance_threshold):
+        """
+        Realiza una consulta extendida consultando solo los pesos de los términos de la consulta.
+
+        Args:
+            documents (list): Una lista de documentos.
+            query (list): Una lista de términos de consulta.
+            weight_index (WeightIndex): Índice con los pesos precalculados de los documentos.
+            p (int): El valor de p para la métrica de similitud.
+            relevance_threshold (float): Umbral de relevancia para los documentos recuperados.
+
+        Returns:
+            list: Una lista de documentos que cumplen con la consulta extendida.
+        """
 
-        relevant_documents_with_scores.sort(key=lambda x: x[2], reverse=True)
-        return [(doc, id) for (doc, id, score) in relevant_documents_with_scores if score >= relevance_threshold]
+        positions, scores = self.rank_index(query, weight_index, p, relevance_threshold)
+        return [documents[position] for position in positions.tolist()]
 
+    def rank_index(self, query, weight_index, p, relevance_threshold):
+        """
+        Ordena por similitud los documentos que superan el umbral de relevancia.
 
+        Args:
+            query (list): Una lista de términos de consulta.
+            weight_index (WeightIndex): Índice con los pesos precalculados de los documentos.
+            p (int): El valor de p para la métrica de similitud.
+            relevance_threshold (float): Umbral de relevancia para los documentos recuperados.
+
+        Returns:
+            tuple: Dos arreglos con las posiciones de los documentos y su similitud, en orden descendente de
+                similitud y, a igual similitud, ascendente de posición.
+        """
+        positions, scores = self.score_index(weight_index, query, p, include_all=relevance_threshold <= 0)
+
+        with current_trace().stage("sort"):
+            order = np.argsort(-scores, kind="stable")
+            keep = scores[order] >= relevance_threshold
+            return positions[order][keep], scores[order][keep]
+
+    def query_top_k(self, documents, query, weight_index, k, p, relevance_threshold, block_size=4096):
+        """
+        Recupera los k documentos de mayor similitud, con el mismo resultado que query_index truncado a k.
+
+        Args:
+            documents (list): Una lista de documentos.
+            query (list): Una lista de términos de consulta.
+            weight_index (WeightIndex): Índice con los pesos precalculados de los documentos.
+            k (int): La cantidad máxima de documentos a recuperar.
+            p (int): El valor de p para la métrica de similitud.
+            relevance_threshold (float): Umbral de relevancia para los documentos recuperados.
+            block_size (int, opcional): Candidatos evaluados antes de actualizar el umbral. Por defecto es 4096.
+
+        Returns:
+            list: Los documentos relevantes de mayor similitud, en orden descendente.
+        """
+        positions, scores = self.rank_top_k(query, weight_index, k, p, relevance_threshold, block_size)
+        return [documents[position] for position in positions]
+
+    def rank_top_k(self, query, weight_index, k, p, relevance_threshold, block_size=4096):
+        """
+        Obtiene las posiciones y la similitud de los k documentos de mayor similitud, igual que rank_index truncado a k.
+
+        La similitud es creciente en el peso de cada término, por lo que se acota reemplazando cada peso por
+        el máximo de su columna (MaxScore). Los términos se ordenan por su cota y los de menor cota que,
+        juntos, no alcanzan el umbral dejan de generar candidatos: un documento que solo contiene esos
+        términos no puede superar el umbral. Los candidatos se evalúan en bloques por posición y el umbral
+        sube al k-ésimo mejor resultado cuando el montículo de resultados está lleno.
+
+        Si los pesos pueden superar 1 y p no es 1, la similitud deja de ser monótona y si el umbral de
+        relevancia no es positivo todos los documentos son relevantes; en esos casos se evalúan todos los
+        candidatos.
+
+        Args:
+            query (list): Una lista de términos de consulta.
+            weight_index (WeightIndex): Índice con los pesos precalculados de los documentos.
+            k (int): La cantidad máxima de documentos a recuperar.
+            p (int): El valor de p para la métrica de similitud.
+            relevance_threshold (float): Umbral de relevancia para los documentos recuperados.
+            block_size (int, opcional): Candidatos evaluados antes de actualizar el umbral. Por defecto es 4096.
+
+        Returns:
+            tuple: Dos listas con las posiciones de los documentos y su similitud, en orden descendente.
+        """
+        if k <= 0:
+            return [], []
+
+        terms = sorted({term.lower() for conjunction in query for term in conjunction})
+        columns = {term: weight_index.get_column(term) for term in terms}
+        max_weights = {term: float(data.max()) if len(data) else 0.0 for term, (indices, data) in columns.items()}
+
+        if relevance_threshold <= 0 or (p != 1 and max(max_weights.values(), default=0.0) > 1):
+            positions, scores = self.rank_index(query, weight_index, p, relevance_threshold)
+            return positions[:k].tolist(), scores[:k].tolist()
+
+        single = self.prefix_bounds(query, max_weights, [[term] for term in terms], p)
+        order = [term for (value, term) in sorted(zip(single.tolist(), terms))]
+        bounds = self.prefix_bounds(query, max_weights, [order[:j + 1] for j in range(len(order))], p).tolist()
+
+        trace = current_trace()
+        trace.count("terms", len(terms))
+        heap = []
+        position = -1
+        essential = None
+        candidates = np.empty(0, dtype=np.int64)
+        cursor = 0
+
+        while True:
+            threshold = heap[0][0] if len(heap) == k else None
+            pruned = 0
+            while pruned < len(order) and (bounds[pruned] < relevance_threshold or
+                                           (threshold is not None and bounds[pruned] <= threshold)):
+                pruned += 1
+
+            if essential is None or len(order) - pruned < len(essential):
+                essential = order[pruned:]
+                rows = [columns[term][0][np.searchsorted(columns[term][0], position, side="right"):]
+                        for term in essential]
+                candidates = merge_positions(rows)
+                cursor = 0
+
+            block = candidates[cursor:cursor + block_size]
+            if len(block) == 0:
+                break
+            cursor += len(block)
+
+            sliced = {}
+            for term, (indices, data) in columns.items():
+                start = np.searchsorted(indices, block[0])
+                end = np.searchsorted(indices, block[-1], side="right")
+                sliced[term] = (indices[start:end], data[start:end])
+            with trace.stage("scoring"):
+                scores = self.score_positions(
+                    [[sliced[term.lower()] for term in conjunction] for conjunction in query], block, p)
+            trace.count("documents_scored", len(block))
+            trace.count("blocks")
+            keep = scores >= (relevance_threshold if threshold is None else max(relevance_threshold, threshold))
+            for score, candidate in zip(scores[keep].tolist(), block[keep].tolist()):
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -candidate))
+                elif (score, -candidate) > heap[0]:
+                    heapq.heapreplace(heap, (score, -candidate))
+            position = int(block[-1])
+
+        ranked = sorted(heap, reverse=True)
+        return [-candidate for (score, candidate) in ranked], [score for (score, candidate) in ranked]
+
+    def prefix_bounds(self, query, max_weights, selections, p):
+        """
+        Acota la similitud de los documentos que solo contienen los términos de cada selección.
+
+        Args:
+            query (list): Una lista de términos de consulta.
+            max_weights (dict): El peso máximo de cada término en el índice.
+            selections (list): Listas de términos que puede contener el documento.
+            p (int): El valor de p para la métrica de similitud.
+
+        Returns:
+            numpy.ndarray: Por cada selección, la similitud con el peso máximo en cada uno de sus términos.
+        """
+        positions = np.arange(len(selections), dtype=np.int64)
+        columns = []
+        for conjunction in query:
+            columns.append([])
+            for term in conjunction:
+                weight = max_weights[term.lower()]
+                indices = np.array([i for i, selected in enumerate(selections) if term.lower() in selected],
+                                   dtype=np.int64)
+                columns[-1].append((indices, np.full(len(indices), weight)))
+        return self.score_positions(columns, positions, p)
+
+    def score_positions(self, columns, positions, p):
+        """
+        Calcula la similitud de los documentos en las posiciones dadas con operaciones vectoriales.
+
+        Args:
+            columns (list): Por cada conjunción, las columnas (posiciones, pesos) de sus términos.
+            positions (numpy.ndarray): Las posiciones ordenadas de los documentos a evaluar.
+            p (int): El valor de p para la métrica de similitud.
+
+        Returns:
+            numpy.ndarray: La similitud de cada documento.
+        """
+        and_scores = np.empty((len(positions), len(columns)), dtype=np.float64)
+        for i, conjunction in enumerate(columns):
+            weights = np.zeros((len(positions), len(conjunction)), dtype=np.float64)
+            for j, (indices, data) in enumerate(conjunction):
+                rows = np.searchsorted(positions, indices)
+                found = rows < len(positions)
+                found[found] = positions[rows[found]] == indices[found]
+                weights[rows[found], j] = data[found]
+            and_scores[:, i] = 1 - (np.sum((1 - weights) ** p, axis=1) / len(conjunction)) ** (1 / p)
+
+        return (np.sum(and_scores ** p, axis=1) / len(columns)) ** (1 / p)
+
+    def score_index(self, weight_index, query, p, include_all=False):
+        """
+        Calcula la similitud de todos los documentos candidatos a la vez con operaciones vectoriales.
+
+        Solo se leen las columnas de la matriz de pesos que corresponden a los términos de la consulta.
+        Un documento sin ningún término de la consulta tiene similitud 0, por lo que solo se incluye
+        cuando se pide evaluar todos los documentos no vacíos.
+
+        Args:
+            weight_index (WeightIndex): Índice con los pesos precalculados de los documentos.
+            query (list): Una lista de términos de consulta.
+            p (int): El valor de p para la métrica de similitud.
+            include_all (bool, opcional): Si es True se evalúan todos los documentos no vacíos.
+
+        Returns:
+            tuple: Dos arreglos con las posiciones ordenadas de los documentos evaluados y su similitud.
+        """
+
+        trace = current_trace()
+        columns = [[weight_index.get_column(term.lower()) for term in conjunction] for conjunction in query]
+
+        if include_all:
+            positions = np.flatnonzero(weight_index.document_lengths > 0)
+        else:
+            rows = [indices for conjunction in columns for (indices, data) in conjunction]
+            positions = merge_positions(rows)
+
+        trace.count("terms", sum(len(conjunction) for conjunction in query))
+        trace.count("documents_scored", len(positions))
+        with trace.stage("scoring"):
+            return positions, self.score_positions(columns, positions, p)
+
+    def score_index_per_document(self, weight_index, query, p, include_all=False):
+        """
+        Calcula la similitud de los documentos candidatos uno a uno con is_document_relevant.
+
+        Produce los mismos resultados que score_index y sirve como referencia para compararlo.
+
+        Args:
+            weight_index (WeightIndex): Índice con los pesos precalculados de los documentos.
+            query (list): Una lista de términos de consulta.
+            p (int): El valor de p para la métrica de similitud.
+            include_all (bool, opcional): Si es True se evalúan todos los documentos no vacíos.
+
+        Returns:
+            tuple: Dos listas con las posiciones ordenadas de los documentos evaluados y su similitud.
+        """
+
+        if include_all:
+            positions = [position for position in range(weight_index.size) if weight_index.document_lengths[position] > 0]
+        else:
+            positions = set()
+            for conjunction in query:
+                for term in conjunction:
+                    positions.update(weight_index.get_postings(term.lower()))
+            positions = sorted(positions)
+
+        return positions, [self.is_document_relevant(weight_index.get_weights(position), query, p)
+                           for position in positions]
 
     def is_document_relevant(self, weights, query, p):
         """
@@ -99,21 +365,23 @@ class ExtendedBooleanHandler(BaseHandler):
 class ExtendedBooleanTokenizer(BaseTokenizer):
     def __init__(self):
         super().__init__()
+        self.tokenizer = Tokenizer()
 
     def tokenize_query(self, query):
         """
         Tokeniza una consulta y la convierte en forma normal disyuntiva (DNF).
 
+        Los pesos no dependen de las posiciones de los lemas, por lo que las frases y las proximidades se
+        reemplazan por sus lemas.
+
         Args:
             query (str): La consulta a tokenizar.
 
         Returns:
             La consulta en forma normal disyuntiva (DNF).
         """
-        tokenizer = Tokenizer()
-        dnf = tokenizer.query_to_dnf(query)
-        query = tokenizer.dnf_to_query(dnf)
-        return query
+        return [[term for literal in conjunction for term in literal_terms(literal)]
+                for conjunction in self.tokenizer.query_to_dnf(query)]
 
     def tokenize_document(self, document):
         """
@@ -126,18 +394,19 @@ class ExtendedBooleanTokenizer(BaseTokenizer):
             list: Una lista de tokens del documento.
         """
 
-        tokenizer = Tokenizer()
-        tokens = tokenizer.tokenize_document(document)
+        tokens = self.tokenizer.tokenize_document(document)
         return tokens
 
 
 class ExtendedBooleanModel(BaseModel):
-    def __init__(self, storage: BaseStorage = None):
+    def __init__(self, storage: BaseStorage = None, verbose=True):
         if storage is None:
             storage = MemoryDocumentStorage()
         handler = ExtendedBooleanHandler()
         tokenizer = ExtendedBooleanTokenizer()
         super().__init__(storage, handler, tokenizer)
+        self.recommendation = Recommendation(storage)
+        self.verbose = verbose
 
     def add_document(self, document: Document):
         super().add_document(document)
@@ -153,20 +422,40 @@ class ExtendedBooleanModel(BaseModel):
         Returns:
             list: Una lista de documentos relevantes para la consulta.
         """
-        processed_query = self.tokenizer.tokenize_query(query)
+        with current_trace().stage("parse"):
+            processed_query = self.tokenizer.tokenize_query(query)
         if len(processed_query) == 0:
             return []
-        documents = self.storage.get_all_documents()
-        relevant = self.handler.query(documents,
-                                      processed_query)
-
-        print(tabulate([(id, " ".join([token for token in doc[:20]])) for (doc, id) in relevant][:5],
-                       headers=["Id", "Start"], tablefmt="grid"))
+        return self.cached_query(processed_query, {"size": size},
+                                 lambda: self.retrieve(processed_query, size))
 
-        ids = [id for (doc, id) in relevant]
-
-        recommended = Recommendation(self.storage).get_recommendations(ids)
+    def retrieve(self, processed_query, size):
+        """
+        Recupera los documentos de una consulta ya compilada, sin pasar por la caché de resultados.
 
-        print(tabulate(recommended, headers=["Id", "Title"], tablefmt="grid"))
+        Args:
+            processed_query (list): La consulta compilada en DNF.
+            size (int): El tamaño máximo de los documentos recuperados, o None.
 
-        return ids if size is None or size >= len(relevant) else ids[:size]
+        Returns:
+            list: Una lista de identificadores de documentos relevantes.
+        """
+        if self.storage.is_sharded():
+            ids = self.storage.query_extended(processed_query, size=size)
+            relevant = [self.storage.get_document(id) for id in ids[:5]] if self.verbose else []
+        else:
+            documents = self.storage.get_all_documents()
+            with current_trace().stage("retrieval"):
+                relevant = self.handler.query(documents,
+                                              processed_query,
+                                              weight_index=self.storage.get_weight_index(),
+                                              size=size)
+            ids = [id for (doc, id) in relevant]
+
+        if self.verbose:
+            print(tabulate([(id, " ".join([token for token in doc[:20]])) for (doc, id) in relevant][:5],
+                           headers=["Id", "Start"], tablefmt="grid"))
+            recommended = self.recommendation.get_recommendations(ids)
+            print(tabulate(recommended, headers=["Id", "Title"], tablefmt="grid"))
+
+        return ids
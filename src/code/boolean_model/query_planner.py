@@ -0,0 +1,151 @@
+def split_literals(conjunction):
+    """
+    Separa los literales de una conjunción en términos y términos negados.
+
+    Args:
+        conjunction (list): Los literales, con el prefijo '~' si están negados.
+
+    Returns:
+        tuple: Los términos afirmados y los negados, sin el prefijo.
+    """
+    terms = [literal for literal in conjunction if not literal.startswith("~")]
+    negated = [literal[1:] for literal in conjunction if literal.startswith("~")]
+    return terms, negated
+
+
+class ConjunctionPlan:
+
+    def __init__(self, terms, frequencies, negated=(), negated_frequencies=()):
+        """
+        Plan de una conjunción: sus términos ordenados de la lista de postings más corta a la más larga.
+
+        La intersección empieza por la lista más corta, de modo que las listas largas solo se recorren
+        saltando hasta las posiciones candidatas. A igual frecuencia los términos se ordenan alfabéticamente,
+        para que el plan no dependa del orden en que se escribió la consulta. Las conjunciones con términos
+        negados se resuelven con los mapas de bits del índice.
+
+        Args:
+            terms (list): Los términos distintos de la conjunción.
+            frequencies (list): La frecuencia de documento de cada término.
+            negated (list, opcional): Los términos negados, sin el prefijo '~'.
+            negated_frequencies (list, opcional): La frecuencia de documento de cada término negado.
+        """
+        order = sorted(range(len(terms)), key=lambda i: (frequencies[i], terms[i]))
+        self.terms = [terms[i] for i in order]
+        self.frequencies = [frequencies[i] for i in order]
+        order = sorted(range(len(negated)), key=lambda i: (-negated_frequencies[i], negated[i]))
+        self.negated = [negated[i] for i in order]
+        self.negated_frequencies = [negated_frequencies[i] for i in order]
+
+    @property
+    def matches_all(self):
+        return len(self.terms) == 0 and len(self.negated) == 0
+
+    @property
+    def empty(self):
+        """
+        Una conjunción con un término que no aparece en ningún documento, o con un término y su negación,
+        no puede coincidir con ninguno.
+        """
+        if len(self.terms) > 0 and self.frequencies[0] == 0:
+            return True
+        return not set(self.terms).isdisjoint(self.negated)
+
+    @property
+    def cost(self):
+        """
+        Cota superior de los documentos de la conjunción: la frecuencia de su término más raro, o None si
+        solo tiene términos negados.
+        """
+        return self.frequencies[0] if self.terms else None
+
+    @property
+    def strategy(self):
+        if self.matches_all:
+            return "all"
+        if self.empty:
+            return "skip"
+        if self.negated:
+            return "bitmap"
+        if len(self.terms) == 1:
+            return "postings"
+        return "intersect"
+
+    def explain(self):
+        return {
+            "terms": [{"term": term, "document_frequency": frequency}
+                      for term, frequency in zip(self.terms, self.frequencies)],
+            "negated": [{"term": term, "document_frequency": frequency}
+                        for term, frequency in zip(self.negated, self.negated_frequencies)],
+            "strategy": self.strategy,
+            "estimated_matches": self.cost,
+        }
+
+
+class QueryPlan:
+
+    def __init__(self, conjunctions, subsumed):
+        """
+        Plan de una consulta en DNF.
+
+        Args:
+            conjunctions (list): Los planes de las conjunciones que se evalúan, de la más barata a la más cara.
+            subsumed (list): Las conjunciones descartadas porque otra de la consulta ya las cubre.
+        """
+        self.conjunctions = conjunctions
+        self.subsumed = subsumed
+
+    @property
+    def matches_all(self):
+        return any(conjunction.matches_all for conjunction in self.conjunctions)
+
+    def explain(self):
+        """
+        Describe el plan.
+
+        Returns:
+            dict: Las conjunciones en el orden en que se evalúan, con sus términos, frecuencias y estrategia;
+                las conjunciones descartadas; y una cota superior de la cantidad de resultados, o None si alguna
+                conjunción puede abarcar todo el corpus.
+        """
+        costs = [conjunction.cost for conjunction in self.conjunctions]
+        estimate = None if self.matches_all or None in costs else sum(costs)
+        return {
+            "matches_all": self.matches_all,
+            "conjunctions": [conjunction.explain() for conjunction in self.conjunctions],
+            "subsumed": [list(conjunction) for conjunction in self.subsumed],
+            "estimated_matches": estimate,
+        }
+
+
+def plan_query(query, document_frequency):
+    """
+    Planifica una consulta booleana en DNF a partir de la frecuencia de documento de sus términos.
+
+    Se quitan los literales repetidos de cada conjunción y las conjunciones que contienen todos los literales
+    de otra, que por absorción no agregan documentos. Las conjunciones se ordenan por su costo estimado.
+
+    Args:
+        query (list): Una lista de conjunciones de literales, con el prefijo '~' si están negados.
+        document_frequency (callable): Función que devuelve la frecuencia de documento de un término.
+
+    Returns:
+        QueryPlan: El plan de la consulta.
+    """
+    conjunctions = sorted({tuple(sorted(set(conjunction))) for conjunction in query}, key=lambda c: (len(c), c))
+
+    kept = []
+    subsumed = []
+    for conjunction in conjunctions:
+        if any(set(general) <= set(conjunction) for general in kept):
+            subsumed.append(conjunction)
+        else:
+            kept.append(conjunction)
+
+    plans = []
+    for conjunction in kept:
+        terms, negated = split_literals(conjunction)
+        plans.append(ConjunctionPlan(terms, [document_frequency(term) for term in terms],
+                                     negated, [document_frequency(term) for term in negated]))
+    plans.sort(key=lambda plan: (not plan.matches_all, plan.cost is None, plan.cost or 0))
+    return QueryPlan(plans, subsumed)
@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import time
+
+from tabulate import tabulate
+
+from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.metrics import Metrics
+from src.code.boolean_model.boolean_model import BooleanModel
+from src.code.boolean_model.extended_boolean_model import ExtendedBooleanModel
+
+MODELS = {
+    "Boolean": lambda storage: BooleanModel(storage=storage),
+    "Extended Boolean": lambda storage: ExtendedBooleanModel(storage=storage, verbose=False),
+}
+
+# Estado compartido por los procesos de la evaluación. Se asigna antes de crear el pool, de modo que con
+# 'fork' los procesos hijos heredan el índice ya cargado en lugar de reconstruirlo.
+_state = {}
+
+
+def _init_worker(state):
+    if not _state:
+        _state.update(state)
+
+
+def evaluate_query(query_id):
+    """
+    Evalúa una consulta con todos los modelos cargados.
+
+    Args:
+        query_id (str): El identificador único de la consulta.
+
+    Returns:
+        dict: El texto de la consulta y, por cada modelo, sus métricas, los tiempos de recuperación y evaluación
+            y, si se pidió, la traza de la consulta.
+    """
+    metrics = _state["metrics"]
+    relevant_documents, query_text = metrics.relevant_documents(query_id)
+
+    results = {}
+    for name, model in _state["models"].items():
+        report = None
+        start = time.perf_counter()
+        if _state.get("trace") or _state.get("profile"):
+            recovered_documents, report = model.traced_query(query_text, profile=_state.get("profile", False))
+        else:
+            recovered_documents = model.query(query_text)
+        retrieval = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = metrics.evaluate(recovered_documents, relevant_documents)
+        result["retrieved"] = len(recovered_documents)
+        result["retrieval_seconds"] = retrieval
+        result["metrics_seconds"] = time.perf_counter() - start
+        if report is not None:
+            result["trace"] = report
+        results[name] = result
+
+    return {"query_id": query_id, "query": query_text, "models": results}
+
+
+def run_evaluation(dataset, model_names=None, processes=None, query_ids=None, chunksize=4, trace=False,
+                   profile=False):
+    """
+    Evalúa todas las consultas de un conjunto de datos repartiéndolas en un pool de procesos.
+
+    El almacenamiento y los modelos se cargan una sola vez en el proceso principal y los procesos del pool
+    los comparten en modo de solo lectura.
+
+    Args:
+        dataset (str): El nombre del conjunto de datos de ir_datasets.
+        model_names (list, opcional): Los modelos a evaluar. Por defecto todos los de MODELS.
+        processes (int, opcional): Cantidad de procesos. Por defecto la cantidad de núcleos; 1 evalúa en el proceso actual.
+        query_ids (list, opcional): Las consultas a evaluar. Por defecto todas las del conjunto de datos.
+        chunksize (int, opcional): Consultas que se envían juntas a cada proceso. Por defecto es 4.
+        trace (bool, opcional): Si es True se registran los tiempos y contadores de cada etapa de cada consulta.
+        profile (bool, opcional): Si es True cada consulta también se perfila con cProfile.
+
+    Returns:
+        dict: Un reporte con los resultados por consulta, las métricas promedio por modelo y los tiempos por etapa.
+    """
+    processes = processes or os.cpu_count() or 1
+    model_names = model_names or list(MODELS)
+    timings = {}
+    start = time.perf_counter()
+
+    stage = time.perf_counter()
+    storage = MemoryDocumentStorage(dataset)
+    timings["storage"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    metrics = Metrics(dataset)
+    timings["metrics_index"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    models = {name: MODELS[name](storage) for name in model_names}
+    timings["models"] = time.perf_counter() - stage
+
+    query_ids = list(query_ids) if query_ids is not None else list(metrics.query_texts)
+    state = {"metrics": metrics, "models": models, "trace": trace, "profile": profile}
+
+    stage = time.perf_counter()
+    if processes == 1:
+        _state.clear()
+        _state.update(state)
+        queries = [evaluate_query(query_id) for query_id in query_ids]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        if "fork" in methods:
+            _state.clear()
+            _state.update(state)
+            context = multiprocessing.get_context("fork")
+            pool = context.Pool(processes)
+        else:
+            pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(state,))
+        with pool:
+            queries = list(pool.imap(evaluate_query, query_ids, chunksize=chunksize))
+    timings["evaluation"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - start
+
+    for name in model_names:
+        timings[f"retrieval[{name}]"] = sum(query["models"][name]["retrieval_seconds"] for query in queries)
+    timings["metrics"] = sum(result["metrics_seconds"] for query in queries for result in query["models"].values())
+
+    return {
+        "dataset": dataset,
+        "processes": processes,
+        "queries": queries,
+        "aggregate": aggregate(queries, model_names),
+        "traces": aggregate_traces(queries, model_names),
+        "timings": timings,
+    }
+
+
+def aggregate(queries, model_names):
+    """
+    Promedia las métricas de cada modelo sobre todas las consultas evaluadas.
+
+    Args:
+        queries (list): Los resultados por consulta de evaluate_query.
+        model_names (list): Los modelos evaluados.
+
+    Returns:
+        dict: Por cada modelo, el promedio de cada métrica y de los tiempos.
+    """
+    result = {}
+    for name in model_names:
+        rows = [query["models"][name] for query in queries]
+        keys = [key for key in rows[0] if key != "trace"] if rows else []
+        result[name] = {key: sum(row[key] for row in rows) / len(rows) for key in keys}
+    return result
+
+
+def aggregate_traces(queries, model_names):
+    """
+    Promedia por modelo los tiempos y contadores de las trazas de las consultas.
+
+    Args:
+        queries (list): Los resultados por consulta de evaluate_query.
+        model_names (list): Los modelos evaluados.
+
+    Returns:
+        dict: Por cada modelo con trazas, el promedio por consulta de cada etapa y de cada contador.
+    """
+    result = {}
+    for name in model_names:
+        traces = [query["models"][name]["trace"] for query in queries if "trace" in query["models"][name]]
+        if not traces:
+            continue
+        totals = {}
+        for trace in traces:
+            for stage, seconds in trace["stages"].items():
+                totals[f"{stage} (s)"] = totals.get(f"{stage} (s)", 0.0) + seconds
+            for counter, value in trace["counters"].items():
+                totals[counter] = totals.get(counter, 0) + value
+        result[name] = {key: value / len(traces) for key, value in totals.items()}
+    return result
+
+
+def print_report(report, per_query=False):
+    """
+    Imprime el reporte de una evaluación.
+
+    Args:
+        report (dict): El reporte devuelto por run_evaluation.
+        per_query (bool, opcional): Si es True también se imprimen las métricas de cada consulta.
+    """
+    names = list(report["aggregate"])
+
+    if per_query:
+        for query in report["queries"]:
+            print(f"Consulta {query['query_id']}: {query['query']}")
+            keys = [key for key in query["models"][names[0]] if key != "trace"] if names else []
+            rows = [[key] + [query["models"][name][key] for name in names] for key in keys]
+            print(tabulate(rows, headers=["Metric"] + names, tablefmt="grid"))
+
+    keys = list(report["aggregate"][names[0]]) if names else []
+    rows = [[key] + [report["aggregate"][name].get(key) for name in names] for key in keys]
+    print(f"Promedio sobre {len(report['queries'])} consultas de {report['dataset']}")
+    print(tabulate(rows, headers=["Metric"] + names, tablefmt="grid"))
+
+    print(f"Tiempos con {report['processes']} procesos")
+    print(tabulate(report["timings"].items(), headers=["Etapa", "Segundos"], tablefmt="grid"))
+
+    traces = report.get("traces", {})
+    if traces:
+        names = list(traces)
+        keys = list(dict.fromkeys(key for name in names for key in traces[name]))
+        rows = [[key] + [traces[name].get(key) for name in names] for key in keys]
+        print("Promedio por consulta de cada etapa de la traza")
+        print(tabulate(rows, headers=["Etapa"] + names, tablefmt="grid"))
@@ -1,30 +1,32 @@
-import ir_datasets
-from tabulate import tabulate
+import argparse
+import json
 
-from src.code.base_model.memory_document_storage import MemoryDocumentStorage
-from src.code.base_model.metrics import Metrics
-from src.code.boolean_model.boolean_model import BooleanModel
-from src.code.boolean_model.extended_boolean_model import ExtendedBooleanModel
+from src.code.evaluation import MODELS, print_report, run_evaluation
 
-dataset = ir_datasets.load("cranfield")
 
-storage = MemoryDocumentStorage("cranfield")
-boolean = BooleanModel(storage=storage)
-extended = ExtendedBooleanModel(storage=storage)
-metrics = Metrics("cranfield")
+def main():
+    parser = argparse.ArgumentParser(description="Evalúa los modelos sobre todas las consultas de un conjunto de datos.")
+    parser.add_argument("--dataset", default="cranfield")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Procesos del pool de evaluación. Por defecto la cantidad de núcleos.")
+    parser.add_argument("--per-query", action="store_true", help="Imprime las métricas de cada consulta.")
+    parser.add_argument("--trace", action="store_true",
+                        help="Registra los tiempos y contadores de cada etapa de cada consulta.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila cada consulta con cProfile; el perfil se guarda en el reporte JSON.")
+    parser.add_argument("--output", help="Guarda el reporte completo en un archivo JSON.")
+    args = parser.parse_args()
 
-queries = dataset.queries_iter()
+    report = run_evaluation(args.dataset, model_names=args.models, processes=args.processes, trace=args.trace,
+                            profile=args.profile)
 
-for query_id, query_text in queries:
-    print(f"Consulta {query_id}: {query_text}")
+    print_report(report, per_query=args.per_query)
 
-    boolean_result = metrics.get_evaluation(query_id, boolean)
-    extended_boolean_result = metrics.get_evaluation(query_id, extended)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
 
-    rows = [[key, boolean_result[key], extended_boolean_result[key]] for key in boolean_result.keys()]
 
-    print(tabulate(rows, headers=["Metric", "Boolean", "Extended Boolean"], tablefmt="grid"))
-
-
-    
-    
\ No newline at end of file
+if __name__ == "__main__":
+    main()
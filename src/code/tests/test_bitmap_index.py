@@ -0,0 +1,79 @@
+import random
+import unittest
+
+import numpy as np
+
+from src.code.base_model.bitmap_index import BitmapIndex, to_bitmap, to_positions
+from src.code.base_model.document import Document
+from src.code.base_model.memory_document_storage import MemoryDocumentStorage
+from src.code.base_model.tokenized_documents import TokenizedDocuments
+from src.code.boolean_model.boolean_model import BooleanModel
+
+
+def storage(documents, positional=False):
+    return MemoryDocumentStorage.from_documents("test", TokenizedDocuments.from_documents(documents),
+                                                positional=positional)
+
+
+def document(id, tokens):
+    saved = Document(id, "", title="")
+    saved.tokens = tokens
+    return saved
+
+
+class BitmapTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for size in (0, 1, 63, 64, 65, 1000):
+            positions = np.arange(0, size, 3)
+            bitmap = to_bitmap(positions, (size + 63) // 64)
+            self.assertEqual(to_positions(bitmap, size).tolist(), positions.tolist())
+
+    def test_negated_phrase_after_add(self):
+        documents = [(["wing", "tunnel"], "0"), (["wing", "tunnel", "flow"], "1"), (["flow", "wing", "tunnel"], "2"),
+                     (["wing"], "3"), (["tunnel", "wing"], "4")]
+        for positional in (True, False):
+            with self.subTest(positional=positional):
+                corpus = storage(documents, positional)
+                model = BooleanModel(storage=corpus)
+                expected = [([["wing", '~"wing tunnel"']], ["3", "4"]), ([["wing", "~wing NEAR/1 tunnel"]], ["3"])]
+                for query, ids in expected:
+                    self.assertEqual(model.retrieve(query, None, 1), ids)
+                corpus.save_document(document("5", ["wing", "tunnel"]))
+                for query, ids in expected:
+                    self.assertEqual(model.retrieve(query, None, 1), ids)
+
+    def test_not_after_add_and_delete(self):
+        rng = random.Random(4)
+        vocabulary = [f"t{i}" for i in range(12)]
+        documents = {str(i): rng.choices(vocabulary, k=rng.randint(0, 8)) for i in range(150)}
+        corpus = storage([(tokens, id) for id, tokens in documents.items()])
+        bitmaps = corpus.get_index().bitmap_index()
+        for step in range(400):
+            if rng.random() < 0.6 or len(documents) < 20:
+                id = f"n{step}"
+                documents[id] = rng.choices(vocabulary, k=rng.randint(0, 8))
+                corpus.save_document(document(id, documents[id]))
+            else:
+                id = rng.choice(sorted(documents))
+                del documents[id]
+                corpus.delete_document(id)
+
+            terms = rng.sample(vocabulary, 2)
+            negated = rng.sample(vocabulary, 2)
+            conjunctions = [([terms[0]], negated), ([], [terms[1]])]
+            index = corpus.get_index()
+            if index.bitmaps is not bitmaps:
+                bitmaps = index.bitmap_index()
+            positions = bitmaps.evaluate(conjunctions).tolist()
+            self.assertEqual(positions, BitmapIndex(index).evaluate(conjunctions).tolist())
+
+            ids = corpus.get_all_documents().ids
+            expected = sorted(corpus.positions[id] for id, tokens in documents.items()
+                              if (terms[0] in tokens and not set(negated) & set(tokens)) or terms[1] not in tokens)
+            self.assertEqual(positions, expected)
+            self.assertTrue(all(ids[position] in documents for position in positions))
+
+
+if __name__ == "__main__":
+    unittest.main()
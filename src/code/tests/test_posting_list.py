@@ -0,0 +1,95 @@
+import random
+import unittest
+from bisect import bisect_left
+
+import numpy as np
+
+from src.code.base_model.posting_list import BLOCK_SIZE, CompactPostings, PostingIterator, decode_varint, \
+    encode_varint, encode_varint_sizes, gallop
+
+
+def random_postings(rng, terms=20, size=2000):
+    postings = {}
+    for term in range(terms):
+        count = rng.choice([1, 2, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, rng.randint(1, size)])
+        postings[f"t{term}"] = sorted(rng.sample(range(size), count))
+    return postings
+
+
+class VarintTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = np.array([0, 1, 127, 128, 255, 16383, 16384, 2 ** 21, 2 ** 35 + 7, 2 ** 62], dtype=np.int64)
+        data = encode_varint(values)
+        self.assertEqual(decode_varint(data).tolist(), values.tolist())
+        self.assertEqual(encode_varint_sizes(values).tolist(), [1, 1, 1, 2, 2, 2, 3, 4, 6, 9])
+        self.assertEqual(len(data), int(encode_varint_sizes(values).sum()))
+
+    def test_empty(self):
+        self.assertEqual(len(encode_varint([])), 0)
+        self.assertEqual(decode_varint(np.empty(0, dtype=np.uint8)).tolist(), [])
+
+
+class CompactPostingsTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        postings = random_postings(random.Random(1))
+        compact = CompactPostings.from_postings(postings)
+        for term, positions in postings.items():
+            self.assertEqual(compact.decode(term).tolist(), positions)
+            self.assertEqual(compact.document_frequency(term), len(positions))
+        self.assertEqual(compact.decode("missing").tolist(), [])
+        self.assertEqual(compact.document_frequency("missing"), 0)
+
+    def test_decode_block_ranges(self):
+        positions = list(range(0, 10 * BLOCK_SIZE, 3))
+        compact = CompactPostings.from_postings({"a": positions})
+        start, end = compact.get_blocks("a")
+        decoded = [position for block in range(start, end) for position in compact.decode_blocks(block, block + 1)]
+        self.assertEqual(decoded, positions)
+        self.assertEqual(compact.decode_blocks(start + 1, end - 1).tolist(),
+                         positions[BLOCK_SIZE:(end - start - 1) * BLOCK_SIZE])
+
+
+class GallopTest(unittest.TestCase):
+
+    def test_matches_bisect(self):
+        rng = random.Random(2)
+        values = sorted(rng.sample(range(10000), 500))
+        for _ in range(2000):
+            target = rng.randint(-5, 10005)
+            low = rng.randint(0, len(values))
+            self.assertEqual(gallop(values, target, low), max(low, bisect_left(values, target)))
+
+
+class PostingIteratorTest(unittest.TestCase):
+
+    def test_next_geq_skips_blocks_tail_and_deleted(self):
+        rng = random.Random(3)
+        positions = sorted(rng.sample(range(20000), 6 * BLOCK_SIZE))
+        tail = list(range(20000, 20050, 7))
+        deleted = set(rng.sample(positions + tail, 100))
+        compact = CompactPostings.from_postings({"a": positions})
+        expected = [position for position in positions + tail if position not in deleted]
+
+        self.assertEqual(list(PostingIterator(compact, "a", tail, deleted)), expected)
+
+        for _ in range(50):
+            iterator = PostingIterator(compact, "a", tail, deleted)
+            target = 0
+            while True:
+                target += rng.choice([1, 2, 50, BLOCK_SIZE * 20, 3000])
+                i = bisect_left(expected, target)
+                self.assertEqual(iterator.next_geq(target), expected[i] if i < len(expected) else None)
+                if i == len(expected):
+                    break
+
+    def test_missing_term(self):
+        compact = CompactPostings.from_postings({"a": [1, 2]})
+        self.assertIsNone(PostingIterator(compact, "b").next_geq(0))
+        self.assertEqual(list(PostingIterator(compact, "b", [5, 9])), [5, 9])
+        self.assertEqual(list(PostingIterator(None, "b", [5, 9], {9})), [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
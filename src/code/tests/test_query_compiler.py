@@ -0,0 +1,56 @@
+import re
+import unittest
+
+from src.code.base_model.query_compiler import SYMBOLS, QueryCompiler, QueryTooComplexError, push
+
+
+class WordCompiler(QueryCompiler):
+    """
+    Compilador que toma cada palabra de la consulta como su lema, para probar la DNF sin spaCy.
+    """
+
+    def lex(self, query):
+        tokens = []
+        for word in re.sub(r"([()&|~])", r" \1 ", query).split():
+            push(tokens, word if word in SYMBOLS else ("term", word))
+        return tokens
+
+
+class QueryCompilerTest(unittest.TestCase):
+
+    def test_de_morgan(self):
+        compiler = WordCompiler()
+        self.assertEqual(compiler.compile("~(a & b)"), [["~a"], ["~b"]])
+        self.assertEqual(compiler.compile("~(a | b)"), [["~a", "~b"]])
+        self.assertEqual(compiler.compile("a & ~(b | ~c)"), [["a", "c", "~b"]])
+        self.assertEqual(compiler.compile("~~a"), [["a"]])
+
+    def test_distribution_and_simplification(self):
+        compiler = WordCompiler()
+        self.assertEqual(compiler.compile("(a | b) & c"), [["a", "c"], ["b", "c"]])
+        self.assertEqual(compiler.compile("a b"), [["a", "b"]])
+        self.assertEqual(compiler.compile("a | a & b"), [["a"]])
+        self.assertEqual(compiler.compile("a & ~a"), [])
+        self.assertEqual(compiler.compile("a & ~a | b"), [["b"]])
+        self.assertEqual(compiler.compile("& | ( )"), [])
+
+    def test_max_conjunctions(self):
+        query = "(a | b) & (c | d) & (e | f)"
+        self.assertEqual(len(WordCompiler(max_conjunctions=8).compile(query)), 8)
+        with self.assertRaises(QueryTooComplexError):
+            WordCompiler(max_conjunctions=4).compile(query)
+        with self.assertRaises(QueryTooComplexError):
+            WordCompiler(max_conjunctions=2).compile("a | b | c")
+
+    def test_cache(self):
+        compiler = WordCompiler(cache_size=1)
+        first = compiler.compile("a  &  b")
+        first.append(["x"])
+        self.assertEqual(compiler.compile("a & b"), [["a", "b"]])
+        self.assertEqual(compiler.cache_info()["hits"], 1)
+        compiler.compile("c")
+        self.assertEqual(compiler.cache_info()["size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
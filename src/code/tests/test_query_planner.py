@@ -0,0 +1,44 @@
+import unittest
+
+from src.code.boolean_model.query_planner import plan_query, split_literals
+
+FREQUENCIES = {"a": 50, "b": 5, "c": 5, "d": 0, "e": 500}
+
+
+def plan(query):
+    return plan_query(query, lambda term: FREQUENCIES.get(term, 0))
+
+
+class QueryPlannerTest(unittest.TestCase):
+
+    def test_split_literals(self):
+        self.assertEqual(split_literals(["a", "~b", "c"]), (["a", "c"], ["b"]))
+
+    def test_terms_ordered_by_frequency_then_name(self):
+        conjunction = plan([["a", "c", "b", "a"]]).conjunctions[0]
+        self.assertEqual(conjunction.terms, ["b", "c", "a"])
+        self.assertEqual(conjunction.frequencies, [5, 5, 50])
+        self.assertEqual(conjunction.strategy, "intersect")
+
+    def test_conjunctions_ordered_by_cost_and_subsumed(self):
+        query_plan = plan([["e"], ["a", "b"], ["a"], ["a", "e"]])
+        self.assertEqual([conjunction.terms for conjunction in query_plan.conjunctions], [["a"], ["e"]])
+        self.assertEqual(query_plan.subsumed, [("a", "b"), ("a", "e")])
+        self.assertEqual(query_plan.explain()["estimated_matches"], 550)
+
+    def test_strategies(self):
+        strategies = {tuple(conjunction.terms + ["~" + term for term in conjunction.negated]): conjunction.strategy
+                      for conjunction in plan([["d", "a"], ["b"], ["c", "~e"], ["e", "~e"]]).conjunctions}
+        self.assertEqual(strategies, {("d", "a"): "skip", ("b",): "postings", ("c", "~e"): "bitmap",
+                                      ("e", "~e"): "skip"})
+
+    def test_matches_all(self):
+        query_plan = plan([["a"], []])
+        self.assertTrue(query_plan.matches_all)
+        self.assertEqual(query_plan.conjunctions[0].strategy, "all")
+        self.assertIsNone(query_plan.explain()["estimated_matches"])
+        self.assertIsNone(plan([["~a"]]).explain()["estimated_matches"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.http import JsonResponse
+
+# Los modelos importan el compilador como src.code; importarlo como code daría otra clase de excepción.
+from src.code.base_model.query_compiler import QueryTooComplexError
+
+from .model_cache import MODELS, DatasetNotFoundError, get_cache
+
+DEFAULT_SETTINGS = {
+    "MAX_WORKERS": 4,
+    "MAX_CONCURRENCY": 8,
+    "QUEUE_TIMEOUT": 5,
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
+    "ALLOW_PROFILE": False,
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_limiter = None
+_titles = weakref.WeakKeyDictionary()
+
+
+class ModelLoadError(RuntimeError):
+    """
+    Excepción lanzada cuando falla la carga de un modelo de un conjunto de datos conocido.
+    """
+
+
+def api_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "SRI_SEARCH_API", {})}
+
+
+def get_executor():
+    """
+    Obtiene el pool de hilos acotado en el que se ejecuta la recuperación, que es de uso intensivo de CPU.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=api_settings()["MAX_WORKERS"], thread_name_prefix="sri-search")
+        return _executor
+
+
+def get_limiter():
+    """
+    Obtiene el semáforo del proceso que limita las búsquedas simultáneas.
+
+    Es un semáforo de hilos y no de asyncio porque bajo WSGI cada petición asíncrona corre en su propio bucle
+    de eventos, y un semáforo por bucle no limitaría nada.
+    """
+    global _limiter
+    with _executor_lock:
+        if _limiter is None:
+            _limiter = threading.BoundedSemaphore(api_settings()["MAX_CONCURRENCY"])
+        return _limiter
+
+
+async def acquire(limiter, timeout):
+    """
+    Espera un lugar en el semáforo sin bloquear el bucle de eventos.
+
+    La espera corre en el pool de hilos por defecto del bucle. Si la petición se cancela mientras espera, el
+    lugar obtenido después se libera.
+
+    Args:
+        limiter (threading.BoundedSemaphore): El semáforo.
+        timeout (float): Los segundos máximos de espera.
+
+    Returns:
+        bool: True si se obtuvo un lugar, False si se agotó el tiempo.
+    """
+    if limiter.acquire(blocking=False):
+        return True
+
+    def release(future):
+        if not future.cancelled() and future.exception() is None and future.result():
+            limiter.release()
+
+    waiting = asyncio.get_running_loop().run_in_executor(None, limiter.acquire, True, timeout)
+    try:
+        return await asyncio.shield(waiting)
+    except asyncio.CancelledError:
+        waiting.add_done_callback(release)
+        raise
+
+
+def get_titles(storage):
+    version = storage.get_version()
+    cached = _titles.get(storage)
+    if cached is None or cached[0] != version:
+        cached = (version, dict(storage.get_all_raw_documents()))
+        _titles[storage] = cached
+    return cached[1]
+
+
+def parse_positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def run_search(model_name, data_set, query, relaxation_threshold, trace=False, profile=False):
+    """
+    Carga el modelo y resuelve la consulta; se ejecuta en el pool de hilos.
+
+    Args:
+        model_name (str): El nombre del modelo.
+        data_set (str): El nombre del conjunto de datos.
+        query (str): La consulta.
+        relaxation_threshold (float): El nivel de relajación de la consulta booleana.
+        trace (bool, opcional): Si es True se registran los tiempos y contadores de cada etapa de la consulta.
+        profile (bool, opcional): Si es True la consulta también se perfila con cProfile.
+
+    Returns:
+        tuple: Los identificadores recuperados, los títulos del conjunto de datos, los tiempos de cada etapa
+            y el reporte de la traza, o None si no se pidió.
+
+    Raises:
+        DatasetNotFoundError: Si el conjunto de datos no está registrado en ir_datasets.
+        ModelLoadError: Si falla la carga del modelo.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    try:
+        model = get_cache().get(model_name, data_set)
+    except DatasetNotFoundError:
+        raise
+    except Exception as error:
+        raise ModelLoadError(f"No se pudo cargar el modelo {model_name} sobre {data_set}") from error
+    timings["model"] = time.perf_counter() - start
+
+    parameters = {"relaxation_threshold": relaxation_threshold} if model_name == "Boolean" else {}
+    report = None
+    start = time.perf_counter()
+    if trace or profile:
+        ids, report = model.traced_query(query, profile=profile, **parameters)
+    else:
+        ids = model.query(query, **parameters)
+    timings["retrieval"] = time.perf_counter() - start
+
+    return ids, get_titles(model.storage), timings, report
+
+
+async def search(request, model_name, data_set):
+    """
+    Búsqueda en JSON con paginación.
+
+    La recuperación corre en un pool de hilos acotado. Cuando hay MAX_CONCURRENCY búsquedas en curso, las
+    siguientes esperan hasta QUEUE_TIMEOUT segundos y luego se rechazan con 503. El límite es del proceso,
+    tanto bajo ASGI como bajo WSGI. Un conjunto de datos desconocido se responde con 404 y una falla al
+    cargar el modelo con 503.
+
+    Parámetros GET: query, page, page_size y, para el modelo booleano, relaxation (entre 0 y 1). Con trace=1
+    la respuesta incluye los tiempos y contadores de cada etapa de la consulta y, si ALLOW_PROFILE está
+    activado, profile=1 agrega el perfil de cProfile.
+    """
+    received = time.perf_counter()
+    config = api_settings()
+
+    if model_name not in MODELS:
+        return JsonResponse({"error": f"Modelo desconocido: {model_name}"}, status=404)
+
+    query = request.GET.get("query", "")
+    page = parse_positive_int(request.GET.get("page"), 1)
+    page_size = min(parse_positive_int(request.GET.get("page_size"), config["PAGE_SIZE"]), config["MAX_PAGE_SIZE"])
+    try:
+        relaxation_threshold = float(request.GET.get("relaxation", 1))
+    except ValueError:
+        return JsonResponse({"error": "relaxation debe ser un número"}, status=400)
+    if not math.isfinite(relaxation_threshold) or not 0 <= relaxation_threshold <= 1:
+        return JsonResponse({"error": "relaxation debe estar entre 0 y 1"}, status=400)
+    trace = request.GET.get("trace") in ("1", "true", "on")
+    profile = config["ALLOW_PROFILE"] and request.GET.get("profile") in ("1", "true", "on")
+
+    limiter = get_limiter()
+    if not await acquire(limiter, config["QUEUE_TIMEOUT"]):
+        response = JsonResponse({"error": "Demasiadas búsquedas en curso, intente de nuevo"}, status=503)
+        response["Retry-After"] = str(max(int(config["QUEUE_TIMEOUT"]), 1))
+        return response
+
+    queued = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        ids, titles, timings, report = await loop.run_in_executor(
+            get_executor(), run_search, model_name, data_set, query, relaxation_threshold, trace, profile)
+    except QueryTooComplexError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    except DatasetNotFoundError as error:
+        return JsonResponse({"error": str(error)}, status=404)
+    except ModelLoadError as error:
+        logger.exception("Falló la carga del modelo %s sobre %s", model_name, data_set)
+        return JsonResponse({"error": str(error)}, status=503)
+    finally:
+        limiter.release()
+
+    start = (page - 1) * page_size
+    results = [{"id": id, "title": titles.get(id)} for id in ids[start:start + page_size]]
+
+    timings = {"queue": queued - received, **timings, "total": time.perf_counter() - received}
+    response = {
+        "query": query,
+        "model": model_name,
+        "dataset": data_set,
+        "page": page,
+        "page_size": page_size,
+        "total": len(ids),
+        "results": results,
+        "timings": {stage: round(seconds, 6) for stage, seconds in timings.items()},
+    }
+    if report is not None:
+        stages = {stage: round(seconds, 6) for stage, seconds in report["stages"].items()}
+        response["trace"] = {**report, "stages": stages}
+    return JsonResponse(response)
@@ -0,0 +1,227 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import ir_datasets
+from django.conf import settings
+
+from code.base_model.memory_document_storage import MemoryDocumentStorage
+from code.base_model.nlp_registry import warm_up
+from code.base_model.sharded_storage import ShardedStorage
+from code.boolean_model.boolean_model import BooleanModel
+from code.boolean_model.extended_boolean_model import ExtendedBooleanModel
+
+from .result_cache import get_result_cache
+
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    "Boolean": lambda storage: BooleanModel(storage=storage),
+    "ExtendedBooleanModel": lambda storage: ExtendedBooleanModel(storage=storage, verbose=False),
+}
+
+DEFAULT_SETTINGS = {
+    "MAX_ENTRIES": 4,
+    "MAX_MEMORY_MB": None,
+    "PRELOAD": [],
+    "SHARDS": None,
+    "POSITIONAL": False,
+}
+
+
+class DatasetNotFoundError(LookupError):
+    """
+    Excepción lanzada cuando el conjunto de datos pedido no está registrado en ir_datasets.
+    """
+
+
+def cache_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "SRI_MODEL_CACHE", {})}
+
+
+class ModelCache:
+
+    def __init__(self, max_entries=4, max_memory_mb=None, shards=None, positional=False):
+        """
+        Caché de modelos del proceso indexada por (modelo, conjunto de datos), con desalojo LRU.
+
+        Los modelos de un mismo conjunto de datos comparten su almacenamiento, por lo que la memoria se cuenta
+        por almacenamiento, con su get_memory, y se libera desalojando todos los modelos del conjunto de datos
+        usado hace más tiempo.
+
+        Args:
+            max_entries (int, opcional): Cantidad máxima de modelos cargados. Por defecto es 4.
+            max_memory_mb (float, opcional): Memoria máxima estimada de los almacenamientos cargados, en MB.
+            shards (int, opcional): Si se proporciona, cada corpus se reparte en esa cantidad de procesos de trabajo.
+            positional (bool, opcional): Si es True cada corpus construye su índice posicional, para las frases y
+                proximidades de las consultas booleanas.
+        """
+        self.max_entries = max_entries
+        self.max_memory = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.shards = shards
+        self.positional = positional
+        self.entries = OrderedDict()
+        self.storages = {}
+        self.lock = threading.Lock()
+        self.loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, modelname, dataset):
+        """
+        Obtiene un modelo, cargándolo si no está en la caché.
+
+        Las cargas de un mismo conjunto de datos se hacen de a una, de modo que dos peticiones simultáneas del
+        mismo modelo esperan una única carga y dos modelos distintos comparten el almacenamiento.
+
+        Args:
+            modelname (str): El nombre del modelo.
+            dataset (str): El nombre del conjunto de datos.
+
+        Returns:
+            BaseModel: El modelo, o None si el nombre del modelo no existe.
+
+        Raises:
+            DatasetNotFoundError: Si el conjunto de datos no está registrado en ir_datasets.
+        """
+        if modelname not in MODELS:
+            return None
+        if dataset not in ir_datasets.registry:
+            raise DatasetNotFoundError(f"Conjunto de datos desconocido: {dataset}")
+
+        key = (modelname, dataset)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            dataset_lock = self.loading.setdefault(dataset, threading.Lock())
+
+        with dataset_lock:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return self.entries[key]
+                self.misses += 1
+                storage = self.storages.get(dataset)
+
+            model, storage = self.load(modelname, dataset, storage)
+
+            with self.lock:
+                self.entries[key] = model
+                self.storages[dataset] = storage
+                self.evict()
+            return model
+
+    def load(self, modelname, dataset, storage=None):
+        """
+        Carga un modelo reutilizando el almacenamiento del conjunto de datos si otro modelo ya lo cargó.
+
+        Args:
+            modelname (str): El nombre del modelo.
+            dataset (str): El nombre del conjunto de datos.
+            storage (tuple, opcional): El almacenamiento ya cargado del conjunto de datos y su memoria en bytes.
+
+        Returns:
+            tuple: El modelo y el almacenamiento con su memoria estimada en bytes.
+        """
+        start = time.perf_counter()
+
+        if storage is None:
+            if self.shards:
+                loaded = ShardedStorage.from_dataset(dataset, self.shards, positional=self.positional)
+            else:
+                loaded = MemoryDocumentStorage(dataset, positional=self.positional)
+            storage = (loaded, loaded.get_memory())
+        model = MODELS[modelname](storage[0])
+        model.result_cache = get_result_cache()
+
+        logger.info("Modelo %s sobre %s cargado en %.2fs (almacenamiento de %.1f MB)", modelname, dataset,
+                    time.perf_counter() - start, storage[1] / (1024 * 1024))
+        return model, storage
+
+    def evict(self):
+        """
+        Desaloja modelos usados hace más tiempo mientras se supere max_entries y almacenamientos completos mientras
+        se supere la memoria máxima, sin desalojar nunca el conjunto de datos del modelo usado más recientemente.
+        """
+        while len(self.entries) > max(self.max_entries, 1):
+            self.evict_model(next(iter(self.entries)))
+
+        while self.max_memory is not None and self.memory() > self.max_memory:
+            newest = next(reversed(self.entries))[1]
+            dataset = next((dataset for (_, dataset) in self.entries if dataset != newest), None)
+            if dataset is None:
+                return
+            for key in [key for key in self.entries if key[1] == dataset]:
+                self.evict_model(key)
+
+    def evict_model(self, key):
+        """
+        Desaloja un modelo y, si era el último de su conjunto de datos, también su almacenamiento.
+
+        Args:
+            key (tuple): El par (modelo, conjunto de datos).
+        """
+        del self.entries[key]
+        self.evictions += 1
+        logger.info("Modelo %s sobre %s desalojado de la caché", *key)
+        if all(dataset != key[1] for (_, dataset) in self.entries):
+            self.storages.pop(key[1], None)
+
+    def memory(self):
+        return sum(size for (_, size) in self.storages.values())
+
+    def preload(self, models):
+        """
+        Carga por adelantado los modelos dados.
+
+        Args:
+            models (list): Pares (modelo, conjunto de datos).
+        """
+        for modelname, dataset in models:
+            self.get(modelname, dataset)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": [list(key) for key in self.entries],
+                "max_entries": self.max_entries,
+                "storages": list(self.storages),
+                "memory_bytes": self.memory(),
+                "max_memory_bytes": self.max_memory,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Obtiene la caché de modelos del proceso, creándola con la configuración SRI_MODEL_CACHE la primera vez.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = cache_settings()
+            _cache = ModelCache(max_entries=config["MAX_ENTRIES"], max_memory_mb=config["MAX_MEMORY_MB"],
+                                shards=config["SHARDS"], positional=config["POSITIONAL"])
+        return _cache
+
+
+def preload():
+    """
+    Carga los pipelines de spaCy y los modelos de SRI_MODEL_CACHE['PRELOAD'], pensado para el arranque del servidor.
+    """
+    config = cache_settings()
+    if not config["PRELOAD"]:
+        return
+    warm_up()
+    get_cache().preload(config["PRELOAD"])
@@ -0,0 +1,62 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from code.base_model.result_cache import InProcessBackend, ResultCache
+
+DEFAULT_SETTINGS = {
+    "ENABLED": True,
+    "BACKEND": "memory",
+    "ALIAS": "default",
+    "TTL": 300,
+    "MAX_ENTRIES": 1024,
+}
+
+
+class DjangoCacheBackend:
+
+    def __init__(self, alias="default"):
+        """
+        Almacén de resultados sobre el framework de caché de Django, compartible entre procesos.
+
+        Args:
+            alias (str, opcional): El alias de la caché en CACHES. Por defecto es 'default'.
+        """
+        self.alias = alias
+
+    def get(self, key):
+        return caches[self.alias].get(key)
+
+    def set(self, key, value, ttl):
+        caches[self.alias].set(key, value, timeout=ttl)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+def cache_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, "SRI_RESULT_CACHE", {})}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Obtiene la caché de resultados del proceso según SRI_RESULT_CACHE, o None si está deshabilitada.
+    """
+    global _cache
+    config = cache_settings()
+    if not config["ENABLED"]:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            if config["BACKEND"] == "django":
+                backend = DjangoCacheBackend(config["ALIAS"])
+            else:
+                backend = InProcessBackend(max_entries=config["MAX_ENTRIES"])
+            _cache = ResultCache(backend, ttl=config["TTL"])
+        return _cache
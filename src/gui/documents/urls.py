@@ -1,10 +1,12 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "documents"
 urlpatterns = [
     path("", views.home, name="home"),
     path("model/<str:model_name>/<str:data_set>", views.ModelView.as_view(), name="model"),
     path("choose", views.choose, name="choose"),
+    path("cache/stats", views.cache_stats, name="cache_stats"),
+    path("api/search/<str:model_name>/<str:data_set>", api.search, name="api_search"),
 ]
\ No newline at end of file
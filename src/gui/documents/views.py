@@ -1,71 +1,82 @@
+import time
+
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import redirect, render
 from django.views import View
 
 from code.base_model.query import Query
-from code.boolean_model.boolean_model import BooleanModel
-from code.boolean_model.extended_boolean_model import ExtendedBooleanModel
 
-import time
+from .api import QueryTooComplexError, get_titles
+from .model_cache import MODELS, DatasetNotFoundError, get_cache
+from .result_cache import get_result_cache
 
 class ModelLoader:
-    
-    MODELS = {
-        "Boolean": BooleanModel,
-        "ExtendedBooleanModel": ExtendedBooleanModel,
-    }
 
-    def __init__(self):
-        self.model = None
-        self.modelname = None
-        self.dataset = None
+    MODELS = MODELS
 
     def get_model(self, modelname, dataset):
-        if self.modelname == modelname and self.dataset == dataset:
-            return self.model
-
-        self.modelname = modelname
-        self.dataset = dataset
+        return get_cache().get(modelname, dataset)
 
-        model_class = self.MODELS.get(modelname)
-        self.model = model_class(dataset) if model_class else None
+    def stats(self):
+        return get_cache().stats()
 
-        return self.model
-    
 def home(request):
-    return render(request, "index.html")
+    return render(request, "documents/index.html")
+
+def cache_stats(request):
+    result_cache = get_result_cache()
+    return JsonResponse({
+        "models": ModelLoader().stats(),
+        "results": result_cache.stats() if result_cache is not None else None,
+    })
 
 def choose(request):
     modelname = request.POST.get('model')
     dataset = request.POST.get('dataset')
-    return redirect('model', modelname=modelname, dataset=dataset)
+    return redirect('documents:model', model_name=modelname, data_set=dataset)
 
 class ModelView(View):
-    template_name = 'search_results.html'
+    template_name = 'documents/query_results.html'
 
-    def get(self, request, modelname, dataset):
-        model = ModelLoader().get_model(modelname, dataset)
+    def get(self, request, model_name, data_set):
+        try:
+            model = ModelLoader().get_model(model_name, data_set)
+        except DatasetNotFoundError as error:
+            raise Http404(str(error))
+        if model is None:
+            raise Http404(f"Modelo desconocido: {model_name}")
 
         size = int(request.GET.get("size", 20))
-        query = request.GET.get("query", "")
+        query = request.GET.get("q", "")
         data = {"relaxed": False, "iterations": 1, "retroalimentation": False}
-        data['query'] = query
+        data['q'] = query
         data['size'] = size
-        data['model'] = modelname
-        data['dataset'] = dataset
+        data['model'] = model_name
+        data['dataset'] = data_set
         data['time'] = 0
+        data['trace'] = request.GET.get('trace') == 'on'
 
         if query:
-            query = Query(id=1, content=query)
-            beg_time = time()
-
-            if modelname == "Boolean":
+            parameters = {"size": size}
+            if model_name == "Boolean":
                 relaxed_consult = request.GET.get('relaxed') == 'on'
                 data['relaxed'] = relaxed_consult
-                docs = model.query(query, size=size, relaxed=relaxed_consult)
-            elif modelname == "GeneralizedVectorial":
-               docs = model.query(query, size=size)
-
-            data['docs'] = docs
-            data['time'] = round(time() - beg_time, ndigits=2)
-
-        return render(request, "query-results.html", data)
\ No newline at end of file
+                parameters["relaxation_threshold"] = 0.5 if relaxed_consult else 1
+
+            start = time.perf_counter()
+            try:
+                if data['trace']:
+                    ids, report = model.traced_query(Query(id=1, content=query), **parameters)
+                    data['stages'] = [(stage, round(seconds * 1000, 3))
+                                      for stage, seconds in report["stages"].items()]
+                    data['counters'] = sorted(report["counters"].items())
+                else:
+                    ids = model.query(Query(id=1, content=query), **parameters)
+            except QueryTooComplexError as error:
+                return HttpResponseBadRequest(str(error))
+            data['time'] = round(time.perf_counter() - start, ndigits=4)
+
+            titles = get_titles(model.storage)
+            data['docs'] = [{"id": id, "title": titles.get(id)} for id in ids]
+
+        return render(request, self.template_name, data)
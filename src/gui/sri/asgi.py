@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
-from django.code.asgi import get_asgi_application
+from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sri.settings')
 
 application = get_asgi_application()
+
+from documents.model_cache import preload  # noqa: E402
+
+preload()
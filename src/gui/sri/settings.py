@@ -72,6 +72,47 @@ TEMPLATES = [
 WSGI_APPLICATION = 'sri.wsgi.application'
 
 
+# Retrieval models kept loaded per process. Models in PRELOAD are loaded when the
+# WSGI/ASGI application starts, e.g. [("Boolean", "cranfield")]. With SHARDS set,
+# each corpus is split across that many worker processes and queried in parallel.
+# POSITIONAL builds a positional index per corpus so boolean queries can use
+# exact phrases ("boundary layer") and proximity (wing NEAR/3 tunnel).
+
+SRI_MODEL_CACHE = {
+    'MAX_ENTRIES': 4,
+    'MAX_MEMORY_MB': None,
+    'PRELOAD': [],
+    'SHARDS': None,
+    'POSITIONAL': False,
+}
+
+# Search results cached per compiled query. BACKEND is 'memory' (per process) or
+# 'django', which stores them in the CACHES entry named by ALIAS.
+
+SRI_RESULT_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'memory',
+    'ALIAS': 'default',
+    'TTL': 300,
+    'MAX_ENTRIES': 1024,
+}
+
+
+# JSON search API: retrieval runs in a pool of MAX_WORKERS threads; at most
+# MAX_CONCURRENCY searches run at once and the rest wait up to QUEUE_TIMEOUT
+# seconds before being rejected with 503. ?trace=1 adds per-stage timings to a
+# response; ?profile=1 adds a cProfile report only when ALLOW_PROFILE is set.
+
+SRI_SEARCH_API = {
+    'MAX_WORKERS': 4,
+    'MAX_CONCURRENCY': 8,
+    'QUEUE_TIMEOUT': 5,
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'ALLOW_PROFILE': DEBUG,
+}
+
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
-from django.code.wsgi import get_wsgi_application
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sri.settings')
 
 application = get_wsgi_application()
+
+from documents.model_cache import preload  # noqa: E402
+
+preload()